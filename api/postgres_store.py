@@ -0,0 +1,510 @@
+"""The queries main.py writes per backend: the Postgres side.
+
+main.py imports this module, or sqlite_store in embedded SQLite mode, as
+`backend` and calls one interface whichever it is. Everything here has a
+counterpart of the same name and signature in sqlite_store.py's "QUERIES
+WRITTEN PER BACKEND" section:
+
+- Work the Postgres migrations do in SQL functions (interaction_summary(),
+  finalize_daily_summaries(), compact_change_log(), the trash archive).
+- Statements SQLite cannot run as written: GROUPING SETS, CUBE, LATERAL,
+  generate_series, to_jsonb, data-modifying CTEs, full-text search.
+- Small dialect differences, as SQL fragments (day_after()) and flags
+  (STAMP_UPDATED_AT).
+
+Everything else main.py runs as written on both backends.
+"""
+import json
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+SEARCH_HEADLINE_OPTIONS = "MaxFragments=2, MaxWords=20, MinWords=5"
+
+# Postgres stamps updated_at in a BEFORE UPDATE trigger (migration 002)
+STAMP_UPDATED_AT = False
+
+# Backend-specific pivot expressions over main.PIVOT_DIMENSIONS/PIVOT_MEASURES
+PIVOT_DIMENSIONS: dict = {}
+PIVOT_MEASURES: dict = {}
+
+# Statements the pools warm up on each new connection (main.hot_queries)
+RANGE_SUMMARY_QUERY = "SELECT interaction_summary($1, COALESCE($2::timestamptz, 'infinity'))"
+FIRST_DAY_QUERY = "SELECT (MIN(timestamp) AT TIME ZONE $1)::date FROM interactions"
+
+# Claim the idempotency key and insert in one statement; a taken key inserts
+# nothing and returns the stored response instead. An id that another
+# interaction already has fails the statement with unique_violation
+# (interaction_ids, migrations/022_interaction_id_registry.sql), claim included
+INTERACTION_CLAIM_INSERT_QUERY = """
+    WITH claimed AS (
+        INSERT INTO idempotency_keys (scope, key, response)
+        VALUES ('interactions', $14, $15::jsonb)
+        ON CONFLICT (scope, key) DO NOTHING
+        RETURNING response
+    ), created AS (
+        INSERT INTO interactions (
+            id, staff_device, interaction_type, engaged, persona, hook,
+            sale_type, quantity, unit_price, total_amount,
+            lead_type, objection, seller_id, timestamp
+        )
+        SELECT (response ->> 'id')::uuid, $1::text, $2::text, $3::boolean, $4::text, $5::text,
+               $6::text, $7::int, $8::int, $9::int, $10::text, $11::text, $12::text, $13::timestamptz
+        FROM claimed
+    )
+    SELECT response, FALSE as replayed FROM claimed
+    UNION ALL
+    SELECT response, TRUE FROM idempotency_keys
+    WHERE scope = 'interactions' AND key = $14 AND NOT EXISTS (SELECT 1 FROM claimed)
+"""
+
+
+# ============================================================
+# WRITES
+# ============================================================
+
+async def create_interaction_once(conn, values: list, key: str, created: dict):
+    """Insert the interaction (INTERACTION_INSERT_QUERY's values) unless key is taken.
+
+    Returns the (response, replayed) row main.idempotent_response() takes.
+    """
+    return await conn.fetchrow(INTERACTION_CLAIM_INSERT_QUERY, *values, key, json.dumps(created))
+
+
+async def create_event_once(conn, description: str, staff_device: Optional[str], seller_id: Optional[str], key: str):
+    """Insert the event unless key is taken; the (response, replayed) row."""
+    return await conn.fetchrow("""
+        WITH claimed AS (
+            INSERT INTO idempotency_keys (scope, key, response)
+            VALUES ('events', $4, jsonb_build_object(
+                'id', nextval(pg_get_serial_sequence('events', 'id')),
+                'timestamp', $5::text,
+                'description', $1::text
+            ))
+            ON CONFLICT (scope, key) DO NOTHING
+            RETURNING response
+        ), created AS (
+            INSERT INTO events (id, timestamp, description, staff_device, seller_id)
+            SELECT (response ->> 'id')::int, (response ->> 'timestamp')::timestamptz,
+                   $1::text, $2::text, $3::text
+            FROM claimed
+        )
+        SELECT response, FALSE as replayed FROM claimed
+        UNION ALL
+        SELECT response, TRUE FROM idempotency_keys
+        WHERE scope = 'events' AND key = $4 AND NOT EXISTS (SELECT 1 FROM claimed)
+    """, description, staff_device, seller_id, key, datetime.now(timezone.utc).isoformat())
+
+
+async def insert_journaled_interactions(conn, entries: list):
+    """Insert journal entries once each, keyed through idempotency_keys (one statement).
+
+    The seller is the device's active seller when the entry drains: during
+    an outage that is still the seller at tap time, since switching sellers
+    needs the database too.
+    """
+    await conn.execute("""
+        WITH batch AS (
+            SELECT DISTINCT ON (key) *
+            FROM jsonb_to_recordset($1::jsonb) AS b(
+                key TEXT, id UUID, staff_device TEXT, display_name TEXT,
+                interaction_type TEXT, engaged BOOLEAN, persona TEXT, hook TEXT,
+                sale_type TEXT, quantity INTEGER, unit_price INTEGER, total_amount INTEGER,
+                lead_type TEXT, objection TEXT, timestamp TIMESTAMPTZ, response JSONB
+            )
+            ORDER BY key
+        ), devices AS (
+            INSERT INTO staff (device_name, display_name)
+            SELECT DISTINCT ON (staff_device) staff_device, display_name FROM batch
+            ON CONFLICT DO NOTHING
+        ), claimed AS (
+            INSERT INTO idempotency_keys (scope, key, response)
+            SELECT 'interactions', key, response FROM batch
+            ON CONFLICT (scope, key) DO NOTHING
+            RETURNING key
+        )
+        INSERT INTO interactions (
+            id, staff_device, interaction_type, engaged, persona, hook,
+            sale_type, quantity, unit_price, total_amount,
+            lead_type, objection, seller_id, timestamp
+        )
+        SELECT
+            b.id, b.staff_device, b.interaction_type, b.engaged, b.persona, b.hook,
+            b.sale_type, b.quantity, b.unit_price, b.total_amount,
+            b.lead_type, b.objection,
+            (SELECT active_seller FROM staff s WHERE s.device_name = b.staff_device),
+            b.timestamp
+        FROM batch b
+        JOIN claimed USING (key)
+    """, json.dumps(entries))
+
+
+def bulk_update_query(assignments: list, where_clause: str, limit_param: str) -> str:
+    """UPDATE applying assignments to at most limit_param rows matching where_clause, RETURNING id.
+
+    The target rows are matched on (id, timestamp) so each is found in its
+    partition directly.
+    """
+    return f"""
+        WITH target AS (
+            SELECT id, timestamp FROM interactions
+            WHERE {where_clause}
+            LIMIT {limit_param}
+        )
+        UPDATE interactions i
+        SET {", ".join(assignments)}
+        FROM target t
+        WHERE i.id = t.id AND i.timestamp = t.timestamp
+        RETURNING i.id
+    """
+
+
+def day_after(day: str) -> str:
+    """SQL for the day after the date expression day."""
+    return f"{day}::date + 1"
+
+
+# ============================================================
+# MAINTENANCE: CHANGE LOG, TRASH ARCHIVE
+# ============================================================
+
+async def compact_change_log(conn, retention: timedelta) -> int:
+    """Drop superseded and expired change_log entries (migrations/011_change_log.sql)."""
+    return await conn.fetchval("SELECT compact_change_log($1)", retention)
+
+
+async def interactions_storage(conn) -> dict:
+    """On-disk size of interactions (all partitions) and its trash row count."""
+    sizes = await conn.fetchrow("""
+        SELECT COALESCE(SUM(pg_table_size(relid)), 0)::bigint AS table_bytes,
+               COALESCE(SUM(pg_indexes_size(relid)), 0)::bigint AS index_bytes
+        FROM pg_partition_tree('interactions')
+        WHERE isleaf
+    """)
+    trash_rows = await conn.fetchval("SELECT COUNT(*) FROM interactions WHERE deleted_at IS NOT NULL")
+    return {"table_bytes": sizes["table_bytes"], "index_bytes": sizes["index_bytes"], "trash_rows": trash_rows}
+
+
+async def archive_deleted_interactions(conn, older_than: timedelta, batch_size: int) -> int:
+    """Move one batch of long-deleted interactions to interactions_archive (migration 015)."""
+    return await conn.fetchval("SELECT archive_deleted_interactions($1, $2)", older_than, batch_size)
+
+
+async def vacuum_interactions(conn, timeout_ms: int):
+    """VACUUM after an archive run, so the freed space is reused right away."""
+    await conn.execute(f"SET statement_timeout = {timeout_ms}")
+    await conn.execute("VACUUM (ANALYZE) interactions")
+
+
+async def restore_archived_interaction(conn, interaction_id: UUID) -> bool:
+    """Move an archived interaction back, restored; False if it is not archived."""
+    return await conn.fetchval("SELECT restore_archived_interaction($1)", interaction_id)
+
+
+# ============================================================
+# SUMMARIES AND CLOSED-DAY SNAPSHOTS
+# ============================================================
+
+async def interaction_summary(conn, range_start: datetime, range_end: Optional[datetime]) -> dict:
+    """interaction_summary() (migrations/009_daily_summaries.sql) for [range_start, range_end).
+
+    range_end None means no upper bound.
+    """
+    return json.loads(await conn.fetchval(RANGE_SUMMARY_QUERY, range_start, range_end))
+
+
+async def first_day(conn, booth_tz: str) -> Optional[date]:
+    """Booth-local day of the oldest interaction."""
+    return await conn.fetchval(FIRST_DAY_QUERY, booth_tz)
+
+
+async def finalize_daily_summaries(
+    conn, booth_tz: str, from_day: Optional[date], through_day: date, refinalize: bool = False
+) -> int:
+    """Snapshot booth-local days from_day..through_day; returns the days written."""
+    return await conn.fetchval(
+        "SELECT finalize_daily_summaries($1, $2, $3, $4)", booth_tz, from_day, through_day, refinalize
+    )
+
+
+async def funnel_summary(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """The interaction_summary() counters the sankey uses, for start_dt through end_dt.
+
+    Every funnel number in one scan: the () set gives the totals, the
+    others the sale, objection and lead x outcome breakdowns.
+    """
+    rows = await conn.fetch("""
+        SELECT
+            CASE
+                WHEN GROUPING(sale_type) = 0 THEN 'sale_type'
+                WHEN GROUPING(objection) = 0 THEN 'objection'
+                WHEN GROUPING(lead_type) = 0 THEN 'lead_outcome'
+                ELSE 'total'
+            END as grouping_set,
+            sale_type,
+            objection,
+            lead_type,
+            CASE WHEN is_sale THEN 'sale' ELSE 'no_sale' END as outcome,
+            COUNT(*) as count,
+            COUNT(*) FILTER (WHERE engaged = TRUE) as engaged,
+            COUNT(*) FILTER (WHERE engaged = FALSE) as not_engaged,
+            COALESCE(SUM(total_amount) FILTER (WHERE engaged = TRUE), 0) as engaged_revenue
+        FROM (
+            SELECT engaged, sale_type, objection, lead_type, total_amount,
+                   (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE timestamp >= $1 AND timestamp <= $2 AND deleted_at IS NULL
+        ) live
+        GROUP BY GROUPING SETS ((), (sale_type), (objection), (is_sale, lead_type))
+    """, start_dt, end_dt)
+
+    funnel = {"engaged_sales": {}, "objections": {}, "lead_outcomes": {}}
+    for row in rows:
+        if row["grouping_set"] == "total":
+            funnel["visitors"] = row["count"]
+            funnel["walk_bys"] = row["not_engaged"]
+            funnel["conversations"] = row["engaged"]
+        elif row["grouping_set"] == "sale_type" and row["engaged"]:
+            funnel["engaged_sales"][row["sale_type"] or "unset"] = {
+                "count": row["engaged"], "revenue": row["engaged_revenue"]
+            }
+        elif row["grouping_set"] == "objection" and row["objection"] is not None:
+            funnel["objections"][row["objection"]] = row["count"]
+        elif row["grouping_set"] == "lead_outcome" and row["lead_type"] is not None and row["engaged"]:
+            funnel["lead_outcomes"][f"{row['outcome']}_with_{row['lead_type']}"] = row["engaged"]
+    return funnel
+
+
+async def seller_summaries(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """interaction_summary()["sellers"] for start_dt through end_dt.
+
+    Every seller in one scan: per-seller totals plus hook and persona counts
+    among that seller's sales.
+    """
+    rows = await conn.fetch("""
+        SELECT
+            seller_id,
+            hook,
+            persona,
+            GROUPING(hook) = 0 as by_hook,
+            GROUPING(persona) = 0 as by_persona,
+            COUNT(*) FILTER (WHERE engaged = TRUE) as engaged,
+            COUNT(*) FILTER (WHERE is_sale) as sales,
+            COALESCE(SUM(total_amount) FILTER (WHERE is_sale), 0) as revenue
+        FROM (
+            SELECT seller_id, hook, persona, engaged, total_amount,
+                   (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE seller_id IS NOT NULL
+            AND timestamp >= $1 AND timestamp <= $2
+            AND deleted_at IS NULL
+        ) live
+        GROUP BY GROUPING SETS ((seller_id), (seller_id, hook), (seller_id, persona))
+    """, start_dt, end_dt)
+
+    summaries = {}
+    for row in rows:
+        totals = summaries.setdefault(row["seller_id"], {"hooks": {}, "personas": {}})
+        if row["by_hook"]:
+            if row["hook"] is not None and row["sales"]:
+                totals["hooks"][row["hook"]] = row["sales"]
+        elif row["by_persona"]:
+            if row["persona"] is not None and row["sales"]:
+                totals["personas"][row["persona"]] = row["sales"]
+        else:
+            totals.update(engaged=row["engaged"], sales=row["sales"], revenue=row["revenue"])
+    return summaries
+
+
+# ============================================================
+# NOTES SEARCH
+# ============================================================
+
+def notes_search_param(q: str) -> str:
+    """The bind value notes_match_condition() matches against: the web-search text itself."""
+    return q
+
+
+def notes_match_condition(query_param: str, trigram: bool) -> str:
+    """WHERE condition matching notes against the search text in query_param.
+
+    Web-search syntax ("garden kit" -price) against the notes_tsv index,
+    plus trigram word similarity when pg_trgm is installed (trigram), which
+    catches typos and partial words (migrations/014_notes_search.sql).
+    """
+    match = f"notes_tsv(notes) @@ websearch_to_tsquery('english', {query_param})"
+    if trigram:
+        match += f" OR {query_param} <% notes"
+    return f"(notes IS NOT NULL AND ({match}))"
+
+
+def notes_search_query(keyset: str, limit_param: str, include_deleted: bool, trigram: bool) -> str:
+    """Ranked notes search for the text in $1: one page after keyset, with snippets.
+
+    Rows carry score (full-text rank, plus trigram similarity with trigram)
+    and snippet, with matched words between chr(2) and chr(3).
+    """
+    rank = "ts_rank_cd(notes_tsv(notes), websearch_to_tsquery('english', $1))::float8"
+    if trigram:
+        rank += " + word_similarity($1, notes)::float8"
+    conditions = [notes_match_condition("$1", trigram)]
+    if not include_deleted:
+        conditions.append("deleted_at IS NULL")
+    return f"""
+        WITH page AS (
+            SELECT * FROM (
+                SELECT id, timestamp, interaction_type, engaged, persona, hook,
+                       sale_type, total_amount, staff_device, seller_id, notes, deleted_at,
+                       {rank} AS score
+                FROM interactions
+                WHERE {" AND ".join(conditions)}
+            ) matches
+            {keyset}
+            ORDER BY score DESC, timestamp DESC, id DESC
+            LIMIT {limit_param}
+        )
+        SELECT p.*,
+               ts_headline('english', p.notes, websearch_to_tsquery('english', $1),
+                           'StartSel=' || chr(2) || ', StopSel=' || chr(3) || ', {SEARCH_HEADLINE_OPTIONS}') AS snippet,
+               s.display_name as staff_name,
+               sl.display_name as seller_name
+        FROM page p
+        LEFT JOIN staff s ON p.staff_device = s.device_name
+        LEFT JOIN sellers sl ON p.seller_id = sl.id
+        ORDER BY p.score DESC, p.timestamp DESC, p.id DESC
+    """
+
+
+# ============================================================
+# ANALYTICS: PIVOT, TIME SERIES, EVENT IMPACT
+# ============================================================
+
+def pivot_query(dims: dict, measures: dict, cube: bool, where: str, limit_param: str) -> str:
+    """One GROUP BY (CUBE with cube) of live interactions in [$1, $2].
+
+    dims and measures map output names to SQL expressions. Rolled-up
+    dimensions have rollup_<dim> = 1 (GROUPING()).
+    """
+    select = [f"{expr} AS {name}" for name, expr in dims.items()]
+    if cube:
+        select += [f"GROUPING({expr}) AS rollup_{name}" for name, expr in dims.items()]
+    select += [f"{expr} AS {name}" for name, expr in measures.items()]
+
+    group_by = order_by = ""
+    if dims:
+        group_by = f"GROUP BY {'CUBE' if cube else ''}({', '.join(dims.values())})"
+        order_by = f"ORDER BY {', '.join(str(i) for i in range(1, len(dims) + 1))}"
+
+    return f"""
+        SELECT {', '.join(select)}
+        FROM (
+            SELECT *, (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE timestamp >= $1 AND timestamp <= $2
+            AND deleted_at IS NULL{where}
+        ) live
+        {group_by}
+        {order_by}
+        LIMIT {limit_param}
+    """
+
+
+async def timeseries_rows(
+    conn, step: timedelta, booth_tz: ZoneInfo, origin: datetime,
+    first_bin: datetime, last_bin: datetime, measures: dict
+) -> list:
+    """Rows (bin_start, starts_at, ends_at, *measures) for the booth-local bins first_bin..last_bin.
+
+    Bins are date_bin(step) from origin; empty bins have NULL measures.
+    """
+    return await conn.fetch(f"""
+        SELECT
+            b.bin_start,
+            b.bin_start AT TIME ZONE $2 AS starts_at,
+            (b.bin_start + $1) AT TIME ZONE $2 AS ends_at,
+            {', '.join(f'counts.{m}' for m in measures)}
+        FROM generate_series($3::timestamp, $4::timestamp, $1::interval) AS b(bin_start)
+        LEFT JOIN (
+            SELECT
+                date_bin($1::interval, timestamp AT TIME ZONE $2, $5::timestamp) AS bin_start,
+                {', '.join(f'{expr} AS {m}' for m, expr in measures.items())}
+            FROM (
+                SELECT *, (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+                FROM interactions
+                WHERE timestamp >= $3::timestamp AT TIME ZONE $2
+                AND timestamp < ($4::timestamp + $1::interval) AT TIME ZONE $2
+                AND deleted_at IS NULL
+            ) live
+            GROUP BY 1
+        ) counts USING (bin_start)
+        ORDER BY b.bin_start
+    """, step, booth_tz.key, first_bin, last_bin, origin)
+
+
+async def event_impact_rows(
+    conn, start_dt: datetime, end_dt: datetime, before_minutes: int, after_minutes: int,
+    description: Optional[str], limit: int, measures: dict
+) -> list:
+    """Rows (id, timestamp, description, side, *measures) for each event's two windows.
+
+    Each window is an index range scan on interactions via LATERAL.
+    """
+    return await conn.fetch(f"""
+        SELECT e.id, e.timestamp, e.description, w.side,
+               {', '.join(f'm.{c}' for c in measures)}
+        FROM (
+            SELECT id, timestamp, description
+            FROM events
+            WHERE timestamp >= $1 AND timestamp <= $2
+            AND ($5::text IS NULL OR description = $5)
+            ORDER BY timestamp DESC
+            LIMIT $6
+        ) e
+        CROSS JOIN LATERAL (
+            VALUES ('before', e.timestamp - $3::interval, e.timestamp),
+                   ('after', e.timestamp, e.timestamp + $4::interval)
+        ) AS w(side, window_start, window_end)
+        CROSS JOIN LATERAL (
+            SELECT {', '.join(f'{expr} AS {c}' for c, expr in measures.items())}
+            FROM (
+                SELECT engaged, total_amount,
+                       (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+                FROM interactions
+                WHERE timestamp >= w.window_start AND timestamp < w.window_end
+                AND deleted_at IS NULL
+            ) live
+        ) m
+        ORDER BY e.timestamp DESC, e.id
+    """, start_dt, end_dt, timedelta(minutes=before_minutes),
+        timedelta(minutes=after_minutes), description, limit)
+
+
+# ============================================================
+# CHANGE FEED
+# ============================================================
+
+async def change_rows(conn, since: int, limit: int) -> list:
+    """change_log entries after since, each upsert with its row's current contents as JSON."""
+    return await conn.fetch("""
+        SELECT
+            c.seq,
+            c.table_name,
+            c.row_key,
+            CASE WHEN c.op = 'U' THEN
+                CASE c.table_name
+                    WHEN 'interactions' THEN
+                        (SELECT to_jsonb(i) FROM interactions i WHERE i.id = c.row_key::uuid)
+                    WHEN 'events' THEN
+                        (SELECT to_jsonb(e) FROM events e WHERE e.id = c.row_key::int)
+                    WHEN 'sellers' THEN
+                        (SELECT to_jsonb(s) FROM sellers s WHERE s.id = c.row_key)
+                    WHEN 'staff' THEN
+                        (SELECT to_jsonb(st) FROM staff st WHERE st.device_name = c.row_key)
+                END
+            END as row
+        FROM change_log c
+        WHERE c.seq > $1
+        ORDER BY c.seq
+        LIMIT $2
+    """, since, limit)
@@ -0,0 +1,183 @@
+"""End-of-day reports, rendered in a worker process.
+
+main.py streams a day's interactions and event tags into an input file and
+hands its path to render() on a ProcessPoolExecutor, so aggregating and
+drawing never run on the event loop that serves booth writes and the SSE
+stream. Only the standard library is used: spawned workers start quickly
+and share nothing with the API process.
+
+The input file holds one JSON array per line, events before rows, both in
+timestamp order:
+
+    ["meta", {"start": iso, "end": iso, "timezone": "Asia/Bangkok", "sellers": {id: name}}]
+    ["event", id, iso timestamp, description]
+    ["row", iso timestamp, seller_id, sale_type, quantity, total_amount, lead_type, objection, engaged]
+
+render() writes into out_dir:
+
+    sellers.csv    one line per seller (and unassigned), then the total
+    events.csv     per event tag, the traffic from it until the next tag
+    chart.svg      visitors and sales per hour (per day past two days), event tags marked
+    summary.json   the totals, as returned
+"""
+import bisect
+import csv
+import json
+import os
+from datetime import datetime, timedelta
+from html import escape
+from zoneinfo import ZoneInfo
+
+COUNTS = ["visitors", "walk_bys", "conversations", "sales", "boxes", "revenue", "leads", "objections"]
+COLUMNS = [*COUNTS, "conversion", "avg_per_sale"]
+
+BOXES_PER_SALE = {"bundle_3": 3, "full_year": 12}
+HOURLY_MAX_DAYS = 2  # Longer reports chart one bar per day
+
+CHART_WIDTH = 960
+CHART_HEIGHT = 360
+CHART_MARGIN = 40
+VISITOR_COLOR = "#9ab8d8"
+SALE_COLOR = "#2f6f3e"
+EVENT_COLOR = "#c0392b"
+
+
+def new_totals() -> dict:
+    return dict.fromkeys(COUNTS, 0)
+
+
+def add(totals: dict, sale_type, quantity, total_amount, lead_type, objection, engaged):
+    """Count one interaction, with the definitions of PIVOT_MEASURES."""
+    totals["visitors"] += 1
+    totals["conversations" if engaged else "walk_bys"] += 1
+    if sale_type is not None and sale_type != "none":
+        totals["sales"] += 1
+        totals["boxes"] += (quantity or 0) if sale_type == "single" else BOXES_PER_SALE.get(sale_type, 0)
+        totals["revenue"] += total_amount or 0
+    if lead_type is not None:
+        totals["leads"] += 1
+    if objection is not None:
+        totals["objections"] += 1
+
+
+def finish(totals: dict) -> dict:
+    """Counts plus the ratios (None where undefined), rounded half up like the pivot."""
+    conversations, sales, revenue = totals["conversations"], totals["sales"], totals["revenue"]
+    return {
+        **totals,
+        "conversion": (200 * sales + conversations) // (2 * conversations) / 100 if conversations else None,
+        "avg_per_sale": (2 * revenue + sales) // (2 * sales) if sales else None,
+    }
+
+
+def write_csv(path: str, key_columns: list, lines: list):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([*key_columns, *COLUMNS])
+        for keys, totals in lines:
+            values = finish(totals)
+            writer.writerow([*keys, *("" if values[c] is None else values[c] for c in COLUMNS)])
+
+
+def render_chart(path: str, buckets: list, labels: list, markers: list, title: str):
+    """Bars of visitors with sales overlaid; markers are (bucket position, label)."""
+    plot_width = CHART_WIDTH - 2 * CHART_MARGIN
+    plot_height = CHART_HEIGHT - 2 * CHART_MARGIN
+    top = max([b["visitors"] for b in buckets] + [1])
+    slot = plot_width / max(len(buckets), 1)
+    baseline = CHART_MARGIN + plot_height
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{CHART_WIDTH}" height="{CHART_HEIGHT}" '
+        f'font-family="sans-serif" font-size="11">',
+        f'<text x="{CHART_MARGIN}" y="{CHART_MARGIN - 16}" font-size="14">{escape(title)}</text>',
+        f'<text x="{CHART_WIDTH - CHART_MARGIN}" y="{CHART_MARGIN - 16}" text-anchor="end">'
+        f'<tspan fill="{VISITOR_COLOR}">■ visitors</tspan> <tspan fill="{SALE_COLOR}">■ sales</tspan> '
+        f'(max {top})</text>',
+        f'<line x1="{CHART_MARGIN}" y1="{baseline}" x2="{CHART_WIDTH - CHART_MARGIN}" y2="{baseline}" stroke="#444"/>',
+    ]
+    label_every = max(1, round(len(buckets) / 24))
+    for i, (bucket, label) in enumerate(zip(buckets, labels)):
+        x = CHART_MARGIN + i * slot
+        for value, color, inset in ((bucket["visitors"], VISITOR_COLOR, 0.1), (bucket["sales"], SALE_COLOR, 0.3)):
+            height = plot_height * value / top
+            parts.append(
+                f'<rect x="{x + slot * inset:.1f}" y="{baseline - height:.1f}" '
+                f'width="{slot * (1 - 2 * inset):.1f}" height="{height:.1f}" fill="{color}"/>'
+            )
+        if i % label_every == 0:
+            parts.append(f'<text x="{x + slot / 2:.1f}" y="{baseline + 14}" text-anchor="middle">{escape(label)}</text>')
+    for position, label in markers:
+        x = CHART_MARGIN + position * slot
+        parts.append(
+            f'<line x1="{x:.1f}" y1="{CHART_MARGIN}" x2="{x:.1f}" y2="{baseline}" '
+            f'stroke="{EVENT_COLOR}" stroke-dasharray="4 3"/>'
+        )
+        parts.append(
+            f'<text x="{x + 3:.1f}" y="{CHART_MARGIN + 10}" fill="{EVENT_COLOR}" '
+            f'transform="rotate(90 {x + 3:.1f} {CHART_MARGIN + 10})">{escape(label)}</text>'
+        )
+    parts.append("</svg>")
+    with open(path, "w") as f:
+        f.write("\n".join(parts))
+
+
+def render(input_path: str, out_dir: str) -> dict:
+    """Aggregate input_path and write the artifacts into out_dir; returns the totals."""
+    sellers, events, event_times = {}, [], []
+    total = new_totals()
+    segments = [new_totals()]  # [0] is before the first event tag
+
+    with open(input_path) as f:
+        meta = json.loads(next(f))[1]
+        tz = ZoneInfo(meta["timezone"])
+        start = datetime.fromisoformat(meta["start"]).astimezone(tz)
+        end = datetime.fromisoformat(meta["end"]).astimezone(tz)
+        hourly = end - start <= timedelta(days=HOURLY_MAX_DAYS)
+        step = timedelta(hours=1) if hourly else timedelta(days=1)
+        buckets = [new_totals() for _ in range(-(-(end - start) // step))]
+
+        for line in f:
+            record = json.loads(line)
+            if record[0] == "event":
+                events.append((datetime.fromisoformat(record[2]).astimezone(tz), record[3]))
+                event_times.append(events[-1][0])
+                segments.append(new_totals())
+                continue
+            _, timestamp, seller_id, *outcome = record
+            local = datetime.fromisoformat(timestamp).astimezone(tz)
+            seller = sellers.setdefault(seller_id, new_totals())
+            # Every event tag is read by now; a tag counts from its own instant
+            segment = segments[bisect.bisect_right(event_times, local)]
+            bucket = buckets[min(int((local - start) // step), len(buckets) - 1)]
+            for totals in (total, seller, segment, bucket):
+                add(totals, *outcome)
+
+    names = meta["sellers"]
+    seller_lines = [
+        ((seller_id or "", names.get(seller_id, "unassigned" if seller_id is None else seller_id)), totals)
+        for seller_id, totals in sorted(sellers.items(), key=lambda item: (item[0] is None, item[0] or ""))
+    ]
+    write_csv(os.path.join(out_dir, "sellers.csv"), ["seller_id", "seller"],
+              seller_lines + [(("", "total"), total)])
+
+    event_lines = [(("", "(before the first event tag)"), segments[0])] if segments[0]["visitors"] else []
+    event_lines += [
+        ((event_time.isoformat(), description), totals)
+        for (event_time, description), totals in zip(events, segments[1:])
+    ]
+    write_csv(os.path.join(out_dir, "events.csv"), ["from", "event"], event_lines)
+
+    labels = [
+        (start + i * step).strftime("%H:00" if hourly else "%m-%d") for i in range(len(buckets))
+    ]
+    markers = [((event_time - start) / step, description) for event_time, description in events]
+    last_day = (end - timedelta(microseconds=1)).date()
+    period = start.date().isoformat() + ("" if last_day == start.date() else f" to {last_day.isoformat()}")
+    render_chart(os.path.join(out_dir, "chart.svg"), buckets, labels, markers,
+                 f"Booth traffic {period} ({meta['timezone']})")
+
+    summary = {"totals": finish(total), "sellers": len(sellers), "events": len(events)}
+    with open(os.path.join(out_dir, "summary.json"), "w") as f:
+        json.dump(summary, f)
+    return summary
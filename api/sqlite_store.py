@@ -0,0 +1,1230 @@
+"""Embedded SQLite storage for single-laptop booths.
+
+With DATABASE_URL=sqlite:///path/to/insights.db the API runs on one SQLite
+file (WAL mode) instead of Postgres. This module stands in for the slice of
+asyncpg that main.py uses, so the db_pool call sites stay as they are:
+
+- create_pool() / connect() return pools and connections with acquire(),
+  fetch/fetchrow/fetchval/execute/executemany and transaction().
+- Queries keep asyncpg's $n placeholders. Postgres casts (::type) are
+  dropped and "= ANY($n)" becomes a json_each() lookup; anything else that
+  differs (GROUPING SETS, LATERAL, time zones, full-text search) is written
+  per backend: the last section of this module, with the Postgres versions
+  in postgres_store.py.
+- Values are stored as Postgres would hand them back: TIMESTAMPTZ columns
+  as fixed-width UTC text (so text order is time order), BOOLEAN as 0/1,
+  UUID as text. Columns are converted back by declared type, and an
+  expression can name its type as asyncpg would see it with an alias like
+  "first [date]".
+- sqlite3 errors are raised as the matching asyncpg exceptions
+  (UniqueViolationError, UndefinedFunctionError, QueryCanceledError, ...).
+- LISTEN/NOTIFY is replaced by in-process change events: the schema's
+  triggers call notify_change() for every row, each statement's rows are
+  folded into one data_change payload (the contract of
+  migrations/016_statement_notify_triggers.sql) and delivered to
+  add_listener() callbacks when the transaction commits. Writes made by
+  another process (the sqlite3 shell) raise no events.
+
+The schema is migrations/sqlite/, applied by migrate() on startup and
+tracked in PRAGMA user_version.
+"""
+import asyncio
+import functools
+import itertools
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+import asyncpg
+
+NOTIFY_MAX_IDS = 100  # As migration 016: ids only for small statements
+PROGRESS_CHECK_INSTRUCTIONS = 10000  # VM steps between statement timeout checks
+
+LoggedQuery = namedtuple("LoggedQuery", "query args elapsed exception")
+
+
+# ============================================================
+# VALUES: PYTHON <-> SQLITE
+# ============================================================
+
+def format_timestamp(value: datetime) -> str:
+    """Stored form of a TIMESTAMPTZ: UTC, fixed width."""
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
+
+
+def to_sqlite(value):
+    """Bind a query argument the way the schema stores it."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.strftime("%Y-%m-%d %H:%M:%S.%f")  # Booth-local wall time
+        return format_timestamp(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return json.dumps([to_sqlite(v) for v in value])
+    return value
+
+
+def parse_timestamp(raw: bytes) -> datetime:
+    value = datetime.fromisoformat(raw.decode())
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+sqlite3.register_converter("TIMESTAMPTZ", parse_timestamp)
+sqlite3.register_converter("TIMESTAMP", lambda raw: datetime.fromisoformat(raw.decode()))
+sqlite3.register_converter("DATE", lambda raw: date.fromisoformat(raw.decode()))
+sqlite3.register_converter("BOOLEAN", lambda raw: raw not in (b"0", b""))
+sqlite3.register_converter("UUID", lambda raw: UUID(raw.decode()))
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(query: str) -> str:
+    """asyncpg query text to SQLite: ?n placeholders, no casts, ANY via json_each."""
+    query = re.sub(r"\$(\d+)", r"?\1", query)
+    query = re.sub(r"::\w+(\[\])?", "", query)
+    return re.sub(r"=\s*ANY\((\?\d+)\)", r"IN (SELECT value FROM json_each(\1))", query)
+
+
+def websearch_to_fts5(text: str) -> str:
+    """FTS5 MATCH expression for web-search syntax, as websearch_to_tsquery reads it.
+
+    Quoted phrases, -term to exclude and "or" between alternatives; every
+    other word is required. Terms are quoted, so no input is a syntax error.
+    An input with no searchable words gives "" (matches nothing).
+    """
+    groups, group, negated = [], [], []
+    for quoted, word in re.findall(r'(-?"[^"]*"?)|(\S+)', text):
+        token = quoted or word
+        exclude = token.startswith("-")
+        terms = re.findall(r"\w+", token)
+        if not terms:
+            continue
+        if not quoted and not exclude and token.lower() == "or":
+            if group:
+                groups.append(group)
+                group = []
+            continue
+        phrase = '"' + " ".join(terms) + '"'
+        (negated if exclude else group).append(phrase)
+    if group:
+        groups.append(group)
+    if not groups:
+        return '""'
+    match = " OR ".join("(" + " AND ".join(g) + ")" for g in groups)
+    for phrase in negated:
+        match = f"({match}) NOT {phrase}"
+    return match
+
+
+# ============================================================
+# SQL FUNCTIONS THE SCHEMA AND QUERIES USE
+# ============================================================
+
+def sql_now() -> str:
+    return format_timestamp(datetime.now(timezone.utc))
+
+
+@functools.lru_cache(maxsize=65536)
+def utc_offset(tz: str, utc_hour: str) -> Optional[timedelta]:
+    """UTC offset of tz throughout the UTC hour 'YYYY-MM-DD HH', or None if it changes in it."""
+    start = datetime.fromisoformat(f"{utc_hour}:00+00:00")
+    offset = start.astimezone(ZoneInfo(tz)).utcoffset()
+    end = start + timedelta(hours=1) - timedelta(microseconds=1)
+    return offset if end.astimezone(ZoneInfo(tz)).utcoffset() == offset else None
+
+
+def sql_at_time_zone(value: str, tz: str):
+    """Postgres AT TIME ZONE: UTC instant -> booth wall time, or wall time -> UTC instant.
+
+    Called per row by the analytics queries, so stored (UTC) values take a
+    cached offset rather than a zone conversion.
+    """
+    if value is None or tz is None:
+        return None
+    offset = utc_offset(tz, value[:13]) if value.endswith("+00:00") else None
+    if offset is not None:
+        return (datetime.fromisoformat(value[:-6]) + offset).isoformat(" ", "microseconds")
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        return format_timestamp(parsed.replace(tzinfo=ZoneInfo(tz)))
+    return parsed.astimezone(ZoneInfo(tz)).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+@functools.lru_cache(maxsize=64)
+def bin_origin(seconds: float, origin: str) -> tuple:
+    return timedelta(seconds=seconds), datetime.fromisoformat(origin)
+
+
+def sql_date_bin(seconds: float, value: str, origin: str):
+    """Postgres date_bin() on wall times: start of the seconds-wide bin holding value."""
+    if value is None:
+        return None
+    step, start = bin_origin(seconds, origin)
+    parsed = datetime.fromisoformat(value)
+    return (start + (parsed - start) // step * step).isoformat(" ", "seconds")
+
+
+def sql_shift_timestamp(value: str, seconds: float):
+    """A TIMESTAMPTZ plus seconds (timestamp + interval)."""
+    if value is None:
+        return None
+    return format_timestamp(datetime.fromisoformat(value) + timedelta(seconds=seconds))
+
+
+# ============================================================
+# ERRORS
+# ============================================================
+
+ERROR_MAP = [
+    ("UNIQUE constraint failed", asyncpg.UniqueViolationError),
+    ("FOREIGN KEY constraint failed", asyncpg.ForeignKeyViolationError),
+    ("CHECK constraint failed", asyncpg.CheckViolationError),
+    ("NOT NULL constraint failed", asyncpg.NotNullViolationError),
+    ("no such function", asyncpg.UndefinedFunctionError),
+    ("no such table", asyncpg.UndefinedTableError),
+    ("no such column", asyncpg.UndefinedColumnError),
+    ("datatype mismatch", asyncpg.DataError),
+    ("interrupted", asyncpg.QueryCanceledError),
+    ("database is locked", asyncpg.QueryCanceledError),  # Waited out the statement timeout
+]
+
+
+def postgres_error(error: sqlite3.Error) -> Exception:
+    """The asyncpg exception main.py handles for this sqlite3 error."""
+    message = str(error)
+    for prefix, error_class in ERROR_MAP:
+        if message.startswith(prefix):
+            return error_class(message)
+    return error
+
+
+# ============================================================
+# CHANGE EVENTS (LISTEN/NOTIFY)
+# ============================================================
+
+class ChangeHub:
+    """add_listener() callbacks for one database file, shared by its connections."""
+
+    def __init__(self):
+        self.listeners = []  # (channel, connection, callback)
+
+    def publish(self, channel: str, payloads: list):
+        loop = asyncio.get_running_loop()
+        for payload in payloads:
+            for listened, conn, callback in list(self.listeners):
+                if listened == channel:
+                    loop.call_soon(callback, conn, os.getpid(), channel, payload)
+
+
+_hubs: dict = {}
+
+
+def change_hub(path: str) -> ChangeHub:
+    return _hubs.setdefault(os.path.abspath(path), ChangeHub())
+
+
+def database_path(url: str) -> str:
+    """sqlite:///relative.db or sqlite:////absolute/path.db -> file path."""
+    if not url.startswith("sqlite:///"):
+        raise ValueError(f"Not a SQLite URL: {url}")
+    return url[len("sqlite:///"):]
+
+
+# ============================================================
+# CONNECTIONS AND POOLS
+# ============================================================
+
+class Transaction:
+    def __init__(self, conn: "Connection", readonly: bool = False):
+        self._conn = conn
+        self._readonly = readonly
+
+    async def __aenter__(self):
+        # IMMEDIATE takes the write lock up front: a read that later writes
+        # cannot deadlock against another writer. A read-only transaction
+        # must not hold it: a deferred BEGIN reads one WAL snapshot without
+        # blocking writers, which is what repeatable_read asks for
+        await self._conn._run_sql("BEGIN" if self._readonly else "BEGIN IMMEDIATE")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self._conn._run_sql("COMMIT")
+            self._conn._publish()
+        else:
+            await self._conn._run_sql("ROLLBACK")
+            self._conn._pending.clear()
+        return False
+
+
+class Cursor:
+    def __init__(self, conn: "Connection", cursor: sqlite3.Cursor):
+        self._conn = conn
+        self._cursor = cursor
+
+    async def fetch(self, n: int) -> list:
+        """The next n rows (fewer at the end, [] when exhausted)."""
+        try:
+            return await asyncio.to_thread(self._conn._timed, self._cursor.fetchmany, n)
+        except sqlite3.Error as e:
+            raise postgres_error(e) from e
+
+
+class Connection:
+    """One sqlite3 connection; calls run in a worker thread, one at a time."""
+
+    def __init__(self, path: str, statement_timeout_ms: int = 0):
+        self._path = path
+        self._timeout = statement_timeout_ms / 1000
+        self._deadline = None
+        self._hub = change_hub(path)
+        self._changes: dict = {}  # (table, action) -> rows the running statement changed
+        self._pending: list = []  # data_change payloads awaiting commit
+        self._query_loggers = []
+        self._db = sqlite3.connect(
+            path,
+            timeout=self._timeout or 5.0,  # Busy wait for the write lock
+            isolation_level=None,  # Autocommit; transaction() issues BEGIN/COMMIT
+            check_same_thread=False,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+        )
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = FULL")  # An acknowledged tap is on disk, as with Postgres
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.create_function("now", 0, sql_now)
+        self._db.create_function("at_time_zone", 2, sql_at_time_zone, deterministic=True)
+        self._db.create_function("date_bin", 3, sql_date_bin, deterministic=True)
+        self._db.create_function("shift_timestamp", 2, sql_shift_timestamp, deterministic=True)
+        self._db.create_function("notify_change", 5, self._record_change)
+        if self._timeout:
+            self._db.set_progress_handler(self._past_deadline, PROGRESS_CHECK_INSTRUCTIONS)
+
+    def _past_deadline(self) -> bool:
+        return self._deadline is not None and time.monotonic() > self._deadline
+
+    def _record_change(self, table, action, row_id, ts, old_ts):
+        """Trigger hook: fold one changed row into its statement's payload."""
+        change = self._changes.setdefault((table, action), {"count": 0, "ts_min": None, "ts_max": None, "ids": []})
+        change["count"] += 1
+        for value in (ts, old_ts):
+            if value is not None:
+                change["ts_min"] = min(change["ts_min"] or value, value)
+                change["ts_max"] = max(change["ts_max"] or value, value)
+        if len(change["ids"]) <= NOTIFY_MAX_IDS:
+            change["ids"].append(row_id)
+
+    def _end_statement(self, failed: bool = False):
+        """Turn the finished statement's changes into payloads; publish if committed."""
+        changes, self._changes = self._changes, {}
+        if not failed:
+            now = datetime.now(timezone.utc).isoformat()
+            for (table, action), change in changes.items():
+                payload = {"table": table, "action": action, "timestamp": now}
+                for key in ("ts_min", "ts_max"):
+                    if change[key] is not None:
+                        payload[key] = datetime.fromisoformat(change[key]).isoformat()
+                payload["count"] = change["count"]
+                if change["count"] <= NOTIFY_MAX_IDS:
+                    payload["ids"] = change["ids"]
+                self._pending.append(json.dumps(payload))
+        if not self._db.in_transaction:
+            if failed:
+                self._pending.clear()
+            self._publish()
+
+    def _publish(self):
+        if self._pending:
+            payloads, self._pending = self._pending, []
+            self._hub.publish("data_change", payloads)
+
+    def _execute(self, sql: str, params: list, many: bool):
+        self._deadline = time.monotonic() + self._timeout if self._timeout else None
+        try:
+            if many:
+                cursor = self._db.executemany(sql, params)
+            else:
+                cursor = self._db.execute(sql, params)
+            return cursor.fetchall(), cursor.rowcount
+        finally:
+            self._deadline = None
+
+    async def _run_sql(self, sql: str, params=(), many: bool = False):
+        try:
+            return await asyncio.to_thread(self._execute, sql, params, many)
+        except sqlite3.Error as e:
+            raise postgres_error(e) from e
+
+    async def _run(self, query: str, args: tuple, many: bool = False):
+        sql = translate(query)
+        params = [[to_sqlite(v) for v in row] for row in args] if many else [to_sqlite(v) for v in args]
+        started = time.monotonic()
+        try:
+            result = await self._run_sql(sql, params, many)
+        except Exception as e:
+            self._end_statement(failed=True)
+            self._log(query, args, started, e)
+            raise
+        self._end_statement()
+        self._log(query, args, started, None)
+        return result
+
+    def _log(self, query, args, started, exception):
+        for logger in self._query_loggers:
+            logger(LoggedQuery(query, args, time.monotonic() - started, exception))
+
+    async def fetch(self, query: str, *args) -> list:
+        rows, _ = await self._run(query, args)
+        return rows
+
+    async def fetchrow(self, query: str, *args):
+        rows, _ = await self._run(query, args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, query: str, *args, column: int = 0):
+        rows, _ = await self._run(query, args)
+        return rows[0][column] if rows else None
+
+    async def execute(self, query: str, *args) -> str:
+        """Run a statement; returns a Postgres-style status ("DELETE 3")."""
+        rows, rowcount = await self._run(query, args)
+        command = translate(query).split(None, 1)[0].upper() if query.strip() else ""
+        if command == "INSERT":
+            return f"INSERT 0 {rowcount}"
+        if command in ("UPDATE", "DELETE"):
+            return f"{command} {rowcount}"
+        if command in ("SELECT", "WITH"):
+            return f"SELECT {len(rows)}"
+        return command
+
+    async def executemany(self, query: str, args) -> None:
+        await self._run(query, list(args), many=True)
+
+    def transaction(self, isolation: Optional[str] = None, readonly: bool = False) -> Transaction:
+        """Every SQLite transaction is serializable; isolation is accepted for asyncpg parity."""
+        return Transaction(self, readonly)
+
+    async def cursor(self, query: str, *args) -> "Cursor":
+        """asyncpg's `await conn.cursor(...)`: rows are read in fetch(n) chunks."""
+        sql = translate(query)
+        params = [to_sqlite(v) for v in args]
+        try:
+            cursor = await asyncio.to_thread(self._timed, self._db.execute, sql, params)
+        except sqlite3.Error as e:
+            raise postgres_error(e) from e
+        return Cursor(self, cursor)
+
+    def _timed(self, call, *args):
+        """call(*args) under the statement timeout, as _execute runs a statement."""
+        self._deadline = time.monotonic() + self._timeout if self._timeout else None
+        try:
+            return call(*args)
+        finally:
+            self._deadline = None
+
+    def add_query_logger(self, callback):
+        self._query_loggers.append(callback)
+
+    async def add_listener(self, channel: str, callback):
+        self._hub.listeners.append((channel, self, callback))
+
+    async def remove_listener(self, channel: str, callback):
+        self._hub.listeners = [
+            entry for entry in self._hub.listeners if entry != (channel, self, callback)
+        ]
+
+    def is_closed(self) -> bool:
+        return self._db is None
+
+    async def close(self):
+        if self._db is not None:
+            self._hub.listeners = [entry for entry in self._hub.listeners if entry[1] is not self]
+            db, self._db = self._db, None
+            await asyncio.to_thread(db.close)
+
+
+class PoolAcquireContext:
+    """pool.acquire(): awaitable, or an async context manager that releases."""
+
+    def __init__(self, pool: "Pool", timeout: float = None):
+        self._pool = pool
+        self._timeout = timeout
+        self._conn = None
+
+    def __await__(self):
+        return self._pool._acquire(self._timeout).__await__()
+
+    async def __aenter__(self) -> Connection:
+        self._conn = await self._pool._acquire(self._timeout)
+        return self._conn
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._pool.release(self._conn)
+
+
+class Pool:
+    """Up to max_size connections to one database file."""
+
+    def __init__(self, path: str, min_size: int, max_size: int, statement_timeout_ms: int, init=None):
+        self._path = path
+        self._min_size = min_size
+        self._max_size = max_size
+        self._statement_timeout_ms = statement_timeout_ms
+        self._init = init
+        self._slots = asyncio.Semaphore(max_size)
+        self._idle: list = []
+        self._size = 0
+
+    async def _connect(self) -> Connection:
+        self._size += 1
+        try:
+            conn = await asyncio.to_thread(Connection, self._path, self._statement_timeout_ms)
+            if self._init is not None:
+                await self._init(conn)
+            return conn
+        except BaseException:
+            self._size -= 1
+            raise
+
+    async def _open(self):
+        for _ in range(self._min_size):
+            self._idle.append(await self._connect())
+        return self
+
+    async def _acquire(self, timeout: float = None) -> Connection:
+        await asyncio.wait_for(self._slots.acquire(), timeout)
+        try:
+            return self._idle.pop() if self._idle else await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def acquire(self, *, timeout: float = None) -> PoolAcquireContext:
+        return PoolAcquireContext(self, timeout)
+
+    async def release(self, conn: Connection):
+        if conn._db.in_transaction:
+            # Left open by a failed caller: drop it rather than reuse it
+            await conn._run_sql("ROLLBACK")
+            conn._pending.clear()
+        self._idle.append(conn)
+        self._slots.release()
+
+    async def close(self):
+        while self._idle:
+            await self._idle.pop().close()
+            self._size -= 1
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return len(self._idle)
+
+    def get_max_size(self) -> int:
+        return self._max_size
+
+
+async def connect(url: str, server_settings: dict = None) -> Connection:
+    """A single connection (the SSE listener uses it for add_listener)."""
+    timeout_ms = int((server_settings or {}).get("statement_timeout", 0))
+    return await asyncio.to_thread(Connection, database_path(url), timeout_ms)
+
+
+async def create_pool(
+    url: str, min_size: int = 1, max_size: int = 10, server_settings: dict = None, init=None, **_
+) -> Pool:
+    """Pool of connections to url; server_settings may set statement_timeout (ms).
+
+    init, as in asyncpg, is awaited with each new connection.
+    """
+    timeout_ms = int((server_settings or {}).get("statement_timeout", 0))
+    return await Pool(database_path(url), min_size, max_size, timeout_ms, init)._open()
+
+
+async def migrate(url: str, directory: str) -> list:
+    """Apply NNN_name.sql files in directory newer than PRAGMA user_version.
+
+    Each file runs in its own transaction together with the version bump.
+    Returns the names of the files applied.
+    """
+    conn = await connect(url)
+    applied = []
+    try:
+        version = await conn.fetchval("PRAGMA user_version")
+        for name in sorted(os.listdir(directory)):
+            match = re.match(r"(\d+)_\w+\.sql$", name)
+            if not match or name.endswith("_rollback.sql") or int(match[1]) <= version:
+                continue
+            with open(os.path.join(directory, name)) as f:
+                script = f.read()
+            try:
+                await asyncio.to_thread(
+                    conn._db.executescript,
+                    f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version = {int(match[1])};\nCOMMIT;"
+                )
+            except sqlite3.Error as e:
+                if conn._db.in_transaction:
+                    conn._db.execute("ROLLBACK")
+                raise RuntimeError(f"SQLite migration {name} failed: {e}") from e
+            applied.append(name)
+    finally:
+        await conn.close()
+    return applied
+
+
+# ============================================================
+# QUERIES WRITTEN PER BACKEND (same interface as postgres_store.py)
+# ============================================================
+# What the Postgres migrations do in SQL functions, and the queries SQLite
+# cannot run as written (GROUPING SETS, CUBE, LATERAL, generate_series,
+# to_jsonb, data-modifying CTEs). Schema: migrations/sqlite/001_schema.sql.
+
+SNIPPET_TOKENS = 20  # Words per FTS5 snippet()
+
+# SQLite has no updated_at trigger: UPDATEs set it themselves
+STAMP_UPDATED_AT = True
+
+# Pivot time buckets through at_time_zone() and ratios in floating point,
+# SQLite having no numeric type (over main.PIVOT_DIMENSIONS/PIVOT_MEASURES).
+# Dimensions read back as dates carry their type in the column alias
+# ("day [date]").
+PIVOT_DIMENSIONS = {
+    "hour": "strftime('%Y-%m-%d %H:00:00', at_time_zone(timestamp, {tz}))",
+    "day": "date(at_time_zone(timestamp, {tz}))",
+    "hour_of_day": "CAST(strftime('%H', at_time_zone(timestamp, {tz})) AS INTEGER)",
+    "weekday": "(CAST(strftime('%w', at_time_zone(timestamp, {tz})) AS INTEGER) + 6) % 7 + 1",  # 1 = Monday
+}
+PIVOT_DIMENSION_TYPES = {"hour": "timestamp", "day": "date"}
+PIVOT_MEASURES = {
+    "engaged_rate": """COALESCE(ROUND(
+        1.0 * COUNT(*) FILTER (WHERE engaged = TRUE) / NULLIF(COUNT(*), 0), 2), 0.0)""",
+    "conversion": """COALESCE(ROUND(
+        1.0 * COUNT(*) FILTER (WHERE is_sale)
+        / NULLIF(COUNT(*) FILTER (WHERE engaged = TRUE), 0), 2), 0.0)""",
+    "overall_conversion": """COALESCE(ROUND(
+        1.0 * COUNT(*) FILTER (WHERE is_sale) / NULLIF(COUNT(*), 0), 2), 0.0)""",
+    "avg_per_sale": """CAST(COALESCE(ROUND(
+        1.0 * SUM(total_amount) FILTER (WHERE is_sale)
+        / NULLIF(COUNT(*) FILTER (WHERE is_sale), 0)), 0) AS INTEGER)""",
+}
+
+# Counters interaction_summary() aggregates per group
+SUMMARY_COUNTERS = [
+    "n", "n_engaged", "n_walk_by", "n_sale", "sale_revenue", "engaged_revenue", "boxes", "price_990", "price_1290"
+]
+
+# The GROUPING SETS of interaction_summary(): name -> grouped columns
+SUMMARY_GROUPING_SETS = {
+    "total": [],
+    "sale_type": ["sale_type"],
+    "persona": ["persona"],
+    "hook": ["hook"],
+    "objection": ["objection"],
+    "lead_type": ["lead_type"],
+    "lead_outcome": ["is_sale", "lead_type"],
+    "seller": ["seller_id"],
+    "seller_hook": ["seller_id", "hook"],
+    "seller_persona": ["seller_id", "persona"],
+}
+
+# Primary key per change_log table_name
+CHANGE_KEYS = {"interactions": "id", "events": "id", "sellers": "id", "staff": "device_name"}
+
+
+def booth_midnight(day: date, booth_tz: str) -> datetime:
+    """Start of a booth-local day, as (day::timestamp AT TIME ZONE booth_tz) gives it."""
+    return datetime.combine(day, datetime.min.time(), ZoneInfo(booth_tz))
+
+
+def json_value(value):
+    """json.dumps default for row values, formatted as to_jsonb() and the API do."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+# Writes
+
+async def idempotent_create(conn, scope: str, key: str, create) -> dict:
+    """Claim key and create the row, or find the response stored for it.
+
+    Postgres does this in one statement. Here one write transaction does,
+    and SQLite runs write transactions one at a time, so a concurrent retry
+    cannot slip in between. create() inserts the row and returns the
+    response to store. Returns the (response, replayed) row that
+    main.idempotent_response() takes.
+    """
+    async with conn.transaction():
+        row = await conn.fetchrow(
+            "SELECT response, TRUE as replayed FROM idempotency_keys WHERE scope = $1 AND key = $2",
+            scope, key
+        )
+        if row is None:
+            response = json.dumps(await create())
+            await conn.execute(
+                "INSERT INTO idempotency_keys (scope, key, response) VALUES ($1, $2, $3)",
+                scope, key, response
+            )
+            row = {"response": response, "replayed": False}
+    return row
+
+
+async def create_interaction_once(conn, values: list, key: str, created: dict):
+    """Insert the interaction (main.INTERACTION_INSERT_QUERY's values) unless key is taken."""
+    async def insert():
+        await conn.execute("""
+            INSERT INTO interactions (
+                staff_device, interaction_type, engaged, persona, hook,
+                sale_type, quantity, unit_price, total_amount,
+                lead_type, objection, seller_id, timestamp, id, updated_at
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, NOW())
+        """, *values, created["id"])
+        return created
+    return await idempotent_create(conn, "interactions", key, insert)
+
+
+async def create_event_once(conn, description: str, staff_device: Optional[str], seller_id: Optional[str], key: str):
+    """Insert the event unless key is taken; the (response, replayed) row."""
+    async def insert():
+        created = await conn.fetchrow("""
+            INSERT INTO events (description, staff_device, seller_id)
+            VALUES ($1, $2, $3)
+            RETURNING id, timestamp
+        """, description, staff_device, seller_id)
+        return {"id": created["id"], "timestamp": created["timestamp"].isoformat(), "description": description}
+    return await idempotent_create(conn, "events", key, insert)
+
+
+async def insert_journaled_interactions(conn, entries: list):
+    """Insert journal entries once each: three batched statements in one transaction.
+
+    Interactions whose key is already in idempotency_keys are skipped, then
+    the keys are claimed; no other writer can run in between.
+    """
+    batch = {}
+    for entry in entries:
+        batch.setdefault(entry["key"], entry)
+    async with conn.transaction():
+        await conn.executemany(
+            "INSERT INTO staff (device_name, display_name) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+            [(e["staff_device"], e["display_name"]) for e in batch.values()]
+        )
+        await conn.executemany("""
+            INSERT INTO interactions (
+                id, staff_device, interaction_type, engaged, persona, hook,
+                sale_type, quantity, unit_price, total_amount,
+                lead_type, objection, seller_id, timestamp, updated_at
+            )
+            SELECT $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13,
+                   (SELECT active_seller FROM staff s WHERE s.device_name = $3),
+                   $14, NOW()
+            WHERE NOT EXISTS (
+                SELECT 1 FROM idempotency_keys WHERE scope = 'interactions' AND key = $1
+            )
+        """, [
+            (
+                e["key"], e["id"], e["staff_device"], e["interaction_type"], e["engaged"],
+                e["persona"], e["hook"], e["sale_type"], e["quantity"], e["unit_price"],
+                e["total_amount"], e["lead_type"], e["objection"], datetime.fromisoformat(e["timestamp"])
+            )
+            for e in batch.values()
+        ])
+        await conn.executemany("""
+            INSERT INTO idempotency_keys (scope, key, response) VALUES ('interactions', $1, $2)
+            ON CONFLICT (scope, key) DO NOTHING
+        """, [(e["key"], json.dumps(e["response"])) for e in batch.values()])
+
+
+def bulk_update_query(assignments: list, where_clause: str, limit_param: str) -> str:
+    """UPDATE applying assignments to at most limit_param rows matching where_clause, RETURNING id.
+
+    SQLite's RETURNING cannot name an aliased target: the ids are selected inline.
+    """
+    return f"""
+        UPDATE interactions
+        SET {", ".join(assignments)}
+        WHERE id IN (
+            SELECT id FROM interactions
+            WHERE {where_clause}
+            LIMIT {limit_param}
+        )
+        RETURNING id
+    """
+
+
+def day_after(day: str) -> str:
+    """SQL for the day after the date expression day."""
+    return f"date({day}, '+1 day')"
+
+
+# Maintenance: change log, trash archive
+
+async def compact_change_log(conn, retention: timedelta) -> int:
+    """compact_change_log() (migrations/011_change_log.sql)."""
+    async with conn.transaction():
+        superseded = await conn.fetch("""
+            DELETE FROM change_log
+            WHERE EXISTS (
+                SELECT 1 FROM change_log n
+                WHERE n.table_name = change_log.table_name AND n.row_key = change_log.row_key
+                  AND n.seq > change_log.seq
+            )
+            RETURNING seq
+        """)
+        expired = await conn.fetch(
+            "DELETE FROM change_log WHERE changed_at < $1 RETURNING seq",
+            datetime.now(timezone.utc) - retention
+        )
+        if expired:
+            await conn.execute(
+                "UPDATE change_log_horizon SET pruned_through = MAX(pruned_through, $1)",
+                max(row["seq"] for row in expired)
+            )
+    return len(superseded) + len(expired)
+
+
+async def interactions_storage(conn) -> dict:
+    """interactions_storage() from dbstat: bytes of pages used by the table and its indexes."""
+    sizes = await conn.fetchrow("""
+        SELECT COALESCE(SUM(pgsize) FILTER (WHERE name = 'interactions'), 0) AS table_bytes,
+               COALESCE(SUM(pgsize) FILTER (WHERE name <> 'interactions'), 0) AS index_bytes
+        FROM dbstat
+        WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = 'interactions')
+    """)
+    trash_rows = await conn.fetchval("SELECT COUNT(*) FROM interactions WHERE deleted_at IS NOT NULL")
+    return {"table_bytes": sizes["table_bytes"], "index_bytes": sizes["index_bytes"], "trash_rows": trash_rows}
+
+
+async def archive_deleted_interactions(conn, older_than: timedelta, batch_size: int) -> int:
+    """archive_deleted_interactions() (migrations/015_interactions_archive.sql).
+
+    The batch leaves interactions in one DELETE, so it raises a single
+    data_change (action DELETE rather than ARCHIVE).
+    """
+    async with conn.transaction():
+        ids = [row["id"] for row in await conn.fetch(
+            "SELECT id FROM interactions WHERE deleted_at < $1 ORDER BY deleted_at LIMIT $2",
+            datetime.now(timezone.utc) - older_than, batch_size
+        )]
+        if ids:
+            await conn.execute("""
+                INSERT INTO interactions_archive (
+                    id, timestamp, staff_device, interaction_type, persona, hook,
+                    sale_type, quantity, unit_price, total_amount, lead_type, objection,
+                    engaged, deleted_at, notes, updated_at, seller_id
+                )
+                SELECT
+                    id, timestamp, staff_device, interaction_type, persona, hook,
+                    sale_type, quantity, unit_price, total_amount, lead_type, objection,
+                    engaged, deleted_at, notes, updated_at, seller_id
+                FROM interactions
+                WHERE id = ANY($1::uuid[])
+            """, ids)
+            await conn.execute("DELETE FROM interactions WHERE id = ANY($1::uuid[])", ids)
+    return len(ids)
+
+
+async def vacuum_interactions(conn, timeout_ms: int):
+    """Nothing to do: SQLite reuses freed pages by itself."""
+
+
+async def restore_archived_interaction(conn, interaction_id: UUID) -> bool:
+    """restore_archived_interaction() (migrations/015_interactions_archive.sql).
+
+    The row leaves the archive before it goes back into interactions, whose
+    insert trigger refuses archived ids (migrations/sqlite/004).
+    """
+    async with conn.transaction():
+        row = await conn.fetchrow("DELETE FROM interactions_archive WHERE id = $1 RETURNING *", interaction_id)
+        if row is None:
+            return False
+        await conn.execute("""
+            INSERT INTO interactions (
+                id, timestamp, staff_device, interaction_type, persona, hook,
+                sale_type, quantity, unit_price, total_amount, lead_type, objection,
+                engaged, deleted_at, notes, updated_at, seller_id
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, NULL, $14, NOW(), $15)
+        """, *(row[column] for column in (
+            "id", "timestamp", "staff_device", "interaction_type", "persona", "hook",
+            "sale_type", "quantity", "unit_price", "total_amount", "lead_type", "objection",
+            "engaged", "notes", "seller_id"
+        )))
+    return True
+
+
+# Summaries and closed-day snapshots
+
+async def interaction_summary(conn, range_start: datetime, range_end: Optional[datetime]) -> dict:
+    """interaction_summary() (migrations/009_daily_summaries.sql) for [range_start, range_end).
+
+    Without GROUPING SETS, one scan groups by every breakdown column at
+    once, and each grouping set is summed from those (few) groups in a
+    UNION ALL. range_end None means no upper bound.
+    """
+    sums = ", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in SUMMARY_COUNTERS)
+    grouping_sets = " UNION ALL ".join(
+        f"SELECT '{name}' AS grouping_set, "
+        f"{columns[0] if columns else 'NULL'} AS key1, {columns[1] if len(columns) > 1 else 'NULL'} AS key2, "
+        f"{sums} FROM g {'GROUP BY ' + ', '.join(columns) if columns else ''}"
+        for name, columns in SUMMARY_GROUPING_SETS.items()
+    )
+    rows = await conn.fetch(f"""
+        WITH g AS MATERIALIZED (
+            SELECT
+                sale_type, persona, hook, objection, lead_type, seller_id, is_sale,
+                COUNT(*) AS n,
+                COUNT(*) FILTER (WHERE engaged = TRUE) AS n_engaged,
+                COUNT(*) FILTER (WHERE engaged = FALSE) AS n_walk_by,
+                COUNT(*) FILTER (WHERE is_sale) AS n_sale,
+                COALESCE(SUM(total_amount) FILTER (WHERE is_sale), 0) AS sale_revenue,
+                COALESCE(SUM(total_amount) FILTER (WHERE engaged = TRUE), 0) AS engaged_revenue,
+                COALESCE(SUM(
+                    CASE
+                        WHEN sale_type = 'single' THEN quantity
+                        WHEN sale_type = 'bundle_3' THEN 3
+                        WHEN sale_type = 'full_year' THEN 12
+                        ELSE 0
+                    END
+                ) FILTER (WHERE is_sale), 0) AS boxes,
+                COUNT(*) FILTER (WHERE unit_price = 990) AS price_990,
+                COUNT(*) FILTER (WHERE unit_price = 1290) AS price_1290
+            FROM (
+                SELECT engaged, persona, hook, sale_type, quantity, unit_price,
+                       total_amount, lead_type, objection, seller_id,
+                       (sale_type IS NOT NULL AND sale_type <> 'none') AS is_sale
+                FROM interactions
+                WHERE timestamp >= $1 AND ($2 IS NULL OR timestamp < $2)
+                  AND deleted_at IS NULL
+            ) live
+            GROUP BY sale_type, persona, hook, objection, lead_type, seller_id, is_sale
+        )
+        {grouping_sets}
+    """, range_start, range_end)
+
+    groups = {}
+    for row in rows:
+        columns = SUMMARY_GROUPING_SETS[row["grouping_set"]]
+        key = (row["grouping_set"], row["key1"], row["key2"])[:1 + len(columns)]
+        groups[key] = {c: row[c] for c in SUMMARY_COUNTERS}
+
+    def grouping_set(name: str) -> list:
+        return [(key[1:], group) for key, group in groups.items() if key[0] == name]
+
+    def seller_breakdown(name: str, seller_id: str) -> dict:
+        return {
+            value: group["n_sale"] for (seller, value), group in grouping_set(name)
+            if seller == seller_id and value is not None and group["n_sale"] > 0
+        }
+
+    total = groups[("total",)]
+    return {
+        "visitors": total["n"],
+        "conversations": total["n_engaged"],
+        "walk_bys": total["n_walk_by"],
+        "sales_count": total["n_sale"],
+        "revenue": total["sale_revenue"],
+        "boxes": total["boxes"],
+        "price_990": total["price_990"],
+        "price_1290": total["price_1290"],
+        "product_mix": {
+            sale_type: group["n_sale"] for (sale_type,), group in grouping_set("sale_type") if group["n_sale"] > 0
+        },
+        "personas": {
+            persona: group["n_sale"] for (persona,), group in grouping_set("persona")
+            if persona is not None and group["n_sale"] > 0
+        },
+        "hooks": {hook: group["n"] for (hook,), group in grouping_set("hook") if hook is not None},
+        "objections": {
+            objection: group["n"] for (objection,), group in grouping_set("objection") if objection is not None
+        },
+        "leads": {lead: group["n"] for (lead,), group in grouping_set("lead_type") if lead is not None},
+        "engaged_sales": {
+            sale_type or "unset": {"count": group["n_engaged"], "revenue": group["engaged_revenue"]}
+            for (sale_type,), group in grouping_set("sale_type") if group["n_engaged"] > 0
+        },
+        "lead_outcomes": {
+            f"{'sale' if is_sale else 'no_sale'}_with_{lead}": group["n_engaged"]
+            for (is_sale, lead), group in grouping_set("lead_outcome")
+            if lead is not None and group["n_engaged"] > 0
+        },
+        "sellers": {
+            seller_id: {
+                "engaged": group["n_engaged"],
+                "sales": group["n_sale"],
+                "revenue": group["sale_revenue"],
+                "hooks": seller_breakdown("seller_hook", seller_id),
+                "personas": seller_breakdown("seller_persona", seller_id)
+            }
+            for (seller_id,), group in grouping_set("seller") if seller_id is not None
+        }
+    }
+
+
+async def first_day(conn, booth_tz: str) -> Optional[date]:
+    """Booth-local day of the oldest interaction."""
+    return await conn.fetchval(
+        'SELECT date(at_time_zone(MIN(timestamp), $1)) AS "first_day [date]" FROM interactions', booth_tz
+    )
+
+
+async def finalize_daily_summaries(
+    conn, booth_tz: str, from_day: Optional[date], through_day: date, refinalize: bool = False
+) -> int:
+    """finalize_daily_summaries() (migrations/009_daily_summaries.sql).
+
+    The write transaction stands in for its table lock: no edit can drop a
+    snapshot while these are being written. Returns the days written.
+    """
+    finalized = 0
+    async with conn.transaction():
+        await conn.execute("DELETE FROM daily_summaries WHERE timezone <> $1", booth_tz)
+        if from_day is None:
+            from_day = await first_day(conn, booth_tz)
+        if from_day is None or from_day > through_day:
+            return 0
+
+        if refinalize:
+            await conn.execute("DELETE FROM daily_summaries WHERE day BETWEEN $1 AND $2", from_day, through_day)
+        existing = {
+            row["day"] for row in await conn.fetch(
+                "SELECT day FROM daily_summaries WHERE day BETWEEN $1 AND $2", from_day, through_day
+            )
+        }
+
+        day = from_day
+        while day <= through_day:
+            if day not in existing:
+                summary = await interaction_summary(
+                    conn, booth_midnight(day, booth_tz), booth_midnight(day + timedelta(days=1), booth_tz)
+                )
+                await conn.execute(
+                    "INSERT INTO daily_summaries (day, timezone, summary) VALUES ($1, $2, $3)",
+                    day, booth_tz, json.dumps(summary)
+                )
+                finalized += 1
+            day += timedelta(days=1)
+    return finalized
+
+
+async def funnel_summary(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """The sankey's funnel counters for start_dt through end_dt: without
+    GROUPING SETS, the full interaction_summary()."""
+    return await interaction_summary(conn, start_dt, end_dt + timedelta(microseconds=1))
+
+
+async def seller_summaries(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """interaction_summary()["sellers"] for start_dt through end_dt."""
+    return (await interaction_summary(conn, start_dt, end_dt + timedelta(microseconds=1)))["sellers"]
+
+
+# Notes search
+
+def notes_search_param(q: str) -> str:
+    """The bind value notes_match_condition() matches against: an FTS5 expression."""
+    return websearch_to_fts5(q)
+
+
+def notes_match_condition(query_param: str, trigram: bool) -> str:
+    """WHERE condition matching notes against the FTS5 expression in query_param.
+
+    The interaction_notes_fts index has no trigram matching (trigram is
+    ignored). Matches are joined back on the notes text, the one column
+    callers' joins cannot make ambiguous.
+    """
+    return f"""(notes IN (
+        SELECT n.notes FROM interaction_notes n WHERE n.note_id IN (
+            SELECT rowid FROM interaction_notes_fts WHERE interaction_notes_fts MATCH {query_param})))"""
+
+
+def notes_search_query(keyset: str, limit_param: str, include_deleted: bool, trigram: bool) -> str:
+    """Ranked notes search for the FTS5 expression in $1: one page after keyset, with snippets.
+
+    bm25() and snippet() only exist in a query on the FTS5 table itself.
+    """
+    return f"""
+        SELECT * FROM (
+            SELECT i.id, i.timestamp, i.interaction_type, i.engaged, i.persona, i.hook,
+                   i.sale_type, i.total_amount, i.staff_device, i.seller_id, i.notes, i.deleted_at,
+                   -bm25(interaction_notes_fts) AS score,
+                   snippet(interaction_notes_fts, 0, char(2), char(3), '…', {SNIPPET_TOKENS}) AS snippet,
+                   s.display_name as staff_name,
+                   sl.display_name as seller_name
+            FROM interaction_notes_fts
+            JOIN interaction_notes n ON n.note_id = interaction_notes_fts.rowid
+            JOIN interactions i ON i.id = n.interaction_id
+            LEFT JOIN staff s ON i.staff_device = s.device_name
+            LEFT JOIN sellers sl ON i.seller_id = sl.id
+            WHERE interaction_notes_fts MATCH $1
+            {"" if include_deleted else "AND i.deleted_at IS NULL"}
+        ) matches
+        {keyset}
+        ORDER BY score DESC, timestamp DESC, id DESC
+        LIMIT {limit_param}
+    """
+
+
+# Analytics: pivot, time series, event impact
+
+def pivot_query(dims: dict, measures: dict, cube: bool, where: str, limit_param: str) -> str:
+    """The pivot without CUBE: one GROUP BY per dimension subset, UNION ALL'd.
+
+    Without cube the only subset is all dimensions. Rolled-up dimensions
+    are NULL with rollup_<dim> = 1, as GROUPING() reports them, and NULLs
+    sort last as in Postgres.
+    """
+    dim_names = list(dims)
+    if cube:
+        subsets = [s for n in range(len(dim_names), -1, -1) for s in itertools.combinations(dim_names, n)]
+    else:
+        subsets = [tuple(dim_names)]
+
+    selects = []
+    for subset in subsets:
+        columns = []
+        for name in dim_names:
+            column_type = PIVOT_DIMENSION_TYPES.get(name)
+            alias = f'"{name} [{column_type}]"' if column_type else name
+            columns.append(f"{dims[name] if name in subset else 'NULL'} AS {alias}")
+        if cube:
+            columns += [f"{0 if name in subset else 1} AS rollup_{name}" for name in dim_names]
+        columns += [f"{expr} AS {name}" for name, expr in measures.items()]
+        group_by = f"GROUP BY {', '.join(dims[name] for name in subset)}" if subset else ""
+        selects.append(f"SELECT {', '.join(columns)} FROM live {group_by}")
+
+    order_by = ""
+    if dim_names:
+        order_by = f"ORDER BY {', '.join(f'{i} NULLS LAST' for i in range(1, len(dim_names) + 1))}"
+
+    return f"""
+        WITH live AS (
+            SELECT *, (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE timestamp >= $1 AND timestamp <= $2
+            AND deleted_at IS NULL{where}
+        )
+        {" UNION ALL ".join(selects)}
+        {order_by}
+        LIMIT {limit_param}
+    """
+
+
+async def timeseries_rows(
+    conn, step: timedelta, booth_tz: ZoneInfo, origin: datetime,
+    first_bin: datetime, last_bin: datetime, measures: dict
+) -> list:
+    """Rows (bin_start, starts_at, ends_at, *measures) for the booth-local bins first_bin..last_bin.
+
+    Interactions are counted per date_bin() in SQL; the bins themselves
+    (generate_series) and their UTC bounds are listed here.
+    """
+    def utc(local: datetime) -> datetime:
+        return local.replace(tzinfo=booth_tz).astimezone(timezone.utc)
+
+    counts = await conn.fetch(f"""
+        SELECT
+            date_bin($1, at_time_zone(timestamp, $2), $3) AS "bin_start [timestamp]",
+            {', '.join(f'{expr} AS {m}' for m, expr in measures.items())}
+        FROM (
+            SELECT *, (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE timestamp >= $4 AND timestamp < $5
+            AND deleted_at IS NULL
+        ) live
+        GROUP BY 1
+    """, step, booth_tz.key, origin, utc(first_bin), utc(last_bin + step))
+    by_bin = {row["bin_start"]: row for row in counts}
+
+    rows = []
+    bin_start = first_bin
+    while bin_start <= last_bin:
+        row = by_bin.get(bin_start)
+        rows.append({
+            "bin_start": bin_start,
+            "starts_at": utc(bin_start),
+            "ends_at": utc(bin_start + step),
+            **{m: row[m] if row else None for m in measures}
+        })
+        bin_start += step
+    return rows
+
+
+async def event_impact_rows(
+    conn, start_dt: datetime, end_dt: datetime, before_minutes: int, after_minutes: int,
+    description: Optional[str], limit: int, measures: dict
+) -> list:
+    """Rows (id, timestamp, description, side, *measures) for each event's two windows, without LATERAL.
+
+    Each event's two windows are joined to the interactions inside them and
+    counted per window; windows with no interactions still get a row.
+    """
+    if "visitors" in measures:
+        measures = {**measures, "visitors": "COUNT(live.id)"}  # Not the empty window's NULL row
+    return await conn.fetch(f"""
+        WITH e AS (
+            SELECT id, timestamp, description
+            FROM events
+            WHERE timestamp >= $1 AND timestamp <= $2
+            AND ($5 IS NULL OR description = $5)
+            ORDER BY timestamp DESC
+            LIMIT $6
+        ), w AS (
+            SELECT id, 'before' AS side, shift_timestamp(timestamp, -$3) AS window_start, timestamp AS window_end
+            FROM e
+            UNION ALL
+            SELECT id, 'after', timestamp, shift_timestamp(timestamp, $4)
+            FROM e
+        )
+        SELECT e.id, e.timestamp, e.description, w.side,
+               {', '.join(f'{expr} AS {c}' for c, expr in measures.items())}
+        FROM e
+        JOIN w ON w.id = e.id
+        LEFT JOIN (
+            SELECT id, timestamp, engaged, total_amount,
+                   (sale_type IS NOT NULL AND sale_type != 'none') as is_sale
+            FROM interactions
+            WHERE deleted_at IS NULL
+        ) live ON live.timestamp >= w.window_start AND live.timestamp < w.window_end
+        GROUP BY e.id, w.side
+        ORDER BY e.timestamp DESC, e.id
+    """, start_dt, end_dt, timedelta(minutes=before_minutes),
+        timedelta(minutes=after_minutes), description, limit)
+
+
+# Change feed
+
+async def change_rows(conn, since: int, limit: int) -> list:
+    """change_log entries after since, each upsert with its row's current
+    contents as JSON (to_jsonb() in Postgres)."""
+    entries = await conn.fetch(
+        "SELECT seq, table_name, row_key, op FROM change_log WHERE seq > $1 ORDER BY seq LIMIT $2",
+        since, limit
+    )
+    current = {}
+    for table, key_column in CHANGE_KEYS.items():
+        keys = sorted({e["row_key"] for e in entries if e["table_name"] == table and e["op"] == "U"})
+        if keys:
+            for row in await conn.fetch(f"SELECT * FROM {table} WHERE {key_column} = ANY($1::text[])", keys):
+                current[(table, str(row[key_column]))] = json.dumps(dict(row), default=json_value)
+    return [
+        {
+            "seq": e["seq"],
+            "table_name": e["table_name"],
+            "row_key": e["row_key"],
+            "row": current.get((e["table_name"], e["row_key"])) if e["op"] == "U" else None
+        }
+        for e in entries
+    ]
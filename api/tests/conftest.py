@@ -0,0 +1,77 @@
+"""Fixtures for the API tests: the app, started against each test database.
+
+Every test runs once per backend in TEST_DATABASE_URLS (space separated).
+The default, "sqlite", is a new SQLite file in a temporary directory, which
+the API migrates itself on startup. A postgresql:// URL must name a scratch
+database with migrations/ applied: the tests empty its tables.
+
+    python -m pytest api/tests
+    TEST_DATABASE_URLS="sqlite postgresql://postgres:pw@localhost:5432/insights_test" \\
+        python -m pytest api/tests
+"""
+import importlib
+import os
+import sys
+
+import httpx
+import pytest
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..")
+BACKENDS = os.environ.get("TEST_DATABASE_URLS", "sqlite").split()
+
+TABLES = [
+    "interactions", "interactions_archive", "events", "daily_summaries", "change_log",
+    "idempotency_keys", "staff", "sellers",
+]
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+def load_main(database_url: str):
+    """Import api/main.py configured for database_url (again, if already imported)."""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("TAILSCALE_SOCKET", "/nonexistent/tailscaled.sock")  # No device lookups
+    if API_DIR not in sys.path:
+        sys.path.insert(0, API_DIR)
+    if "main" in sys.modules:
+        return importlib.reload(sys.modules["main"])
+    import main
+    return main
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+async def app_module(request, tmp_path_factory):
+    """api/main.py, started (lifespan entered) against one test backend."""
+    url = request.param
+    if url == "sqlite":
+        url = f"sqlite:///{tmp_path_factory.mktemp('db') / 'insights.db'}"
+    main = load_main(url)
+    async with main.app.router.lifespan_context(main.app):
+        yield main
+
+
+@pytest.fixture
+async def main(app_module):
+    """The started app module, with every table empty and every cache cleared."""
+    async with app_module.db_pool.acquire() as conn:
+        if app_module.SQLITE_MODE:
+            for table in TABLES:
+                await conn.execute(f"DELETE FROM {table}")
+        else:
+            await conn.execute(f"TRUNCATE {', '.join(TABLES)} CASCADE")
+    app_module.result_cache.invalidate()
+    app_module.bucket_cache.invalidate()
+    app_module.interaction_columns.store = None
+    app_module.closed_days["version"] = None
+    return app_module
+
+
+@pytest.fixture
+async def client(main):
+    """HTTP client calling the app in-process."""
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
@@ -0,0 +1,252 @@
+"""Sankey and by-seller answers match the queries they replaced (user-031).
+
+get_sankey_data used to run six queries over the date window and
+get_seller_analytics three per active seller. Those implementations are
+kept below as the reference, and every period of both endpoints is
+compared with them on random datasets, with and without closed-day
+snapshots. build_sankey(range_summary(...)), the path the dashboard and
+SQLite mode use, is compared too.
+
+The reference breaks top hook/persona ties alphabetically, as the current
+code does; before, the pick among ties was arbitrary.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+SELLERS = ["s1", "s2", "s3"]  # s3 is inactive
+PERSONAS = ["parent", "gift_buyer", "expat", "future_parent", None]
+HOOKS = ["physical_kits", "big_garden", "signage", None]
+SALE_TYPES = ["none", "single", "bundle_3", "full_year", None]
+LEAD_TYPES = ["line", "email", "instagram", None]
+OBJECTIONS = ["too_expensive", "no_time", "other", None]
+HISTORY_DAYS = 80
+
+
+async def legacy_sankey(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """get_sankey_data before the GROUPING SETS rewrite, for a date range."""
+    total_paused = await conn.fetchval("""
+        SELECT COUNT(*) FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2 AND deleted_at IS NULL
+    """, start_dt, end_dt)
+    not_engaged = await conn.fetchval("""
+        SELECT COUNT(*) FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2
+        AND engaged = FALSE AND deleted_at IS NULL
+    """, start_dt, end_dt)
+    engaged_count = await conn.fetchval("""
+        SELECT COUNT(*) FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2
+        AND engaged = TRUE AND deleted_at IS NULL
+    """, start_dt, end_dt)
+    sale_data = await conn.fetch("""
+        SELECT
+            sale_type,
+            COUNT(*) as count,
+            COALESCE(SUM(total_amount), 0) as revenue
+        FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2
+        AND engaged = TRUE AND deleted_at IS NULL
+        GROUP BY sale_type
+    """, start_dt, end_dt)
+    objection_data = await conn.fetch("""
+        SELECT objection, COUNT(*) as count
+        FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2
+        AND objection IS NOT NULL AND deleted_at IS NULL
+        GROUP BY objection
+    """, start_dt, end_dt)
+    lead_data = await conn.fetch("""
+        SELECT
+            CASE WHEN sale_type IS NOT NULL AND sale_type != 'none' THEN 'sale' ELSE 'no_sale' END as outcome,
+            lead_type,
+            COUNT(*) as count
+        FROM interactions
+        WHERE timestamp >= $1 AND timestamp <= $2
+        AND engaged = TRUE AND lead_type IS NOT NULL AND deleted_at IS NULL
+        GROUP BY outcome, lead_type
+    """, start_dt, end_dt)
+
+    sale_breakdown = {row["sale_type"]: {"count": row["count"], "revenue": row["revenue"]} for row in sale_data}
+    objection_breakdown = {row["objection"]: row["count"] for row in objection_data}
+    lead_breakdown = {f"{row['outcome']}_with_{row['lead_type']}": row["count"] for row in lead_data}
+
+    no_sale_count = sale_breakdown.get("none", {}).get("count", 0)
+    single_count = sale_breakdown.get("single", {}).get("count", 0)
+    bundle_count = sale_breakdown.get("bundle_3", {}).get("count", 0)
+    full_year_count = sale_breakdown.get("full_year", {}).get("count", 0)
+
+    total_sales = single_count + bundle_count + full_year_count
+    total_revenue = sum(s.get("revenue", 0) for k, s in sale_breakdown.items() if k != "none")
+
+    engaged_rate = engaged_count / total_paused if total_paused > 0 else 0
+    conversion_rate = total_sales / engaged_count if engaged_count > 0 else 0
+    overall_conversion = total_sales / total_paused if total_paused > 0 else 0
+
+    nodes = [
+        {"id": "all_paused", "label": "All Paused", "value": total_paused},
+        {"id": "not_engaged", "label": "Left w/o Engage", "value": not_engaged},
+        {"id": "engaged", "label": "Engaged", "value": engaged_count},
+        {"id": "no_sale", "label": "No Sale", "value": no_sale_count},
+        {"id": "single", "label": "Single", "value": single_count, "revenue": sale_breakdown.get("single", {}).get("revenue", 0)},
+        {"id": "bundle_3", "label": "Bundle 3", "value": bundle_count, "revenue": sale_breakdown.get("bundle_3", {}).get("revenue", 0)},
+        {"id": "full_year", "label": "Full Year", "value": full_year_count, "revenue": sale_breakdown.get("full_year", {}).get("revenue", 0)},
+    ]
+    links = [
+        {"source": "all_paused", "target": "not_engaged", "value": not_engaged},
+        {"source": "all_paused", "target": "engaged", "value": engaged_count},
+        {"source": "engaged", "target": "no_sale", "value": no_sale_count},
+        {"source": "engaged", "target": "single", "value": single_count},
+        {"source": "engaged", "target": "bundle_3", "value": bundle_count},
+        {"source": "engaged", "target": "full_year", "value": full_year_count},
+    ]
+    return {
+        "nodes": nodes,
+        "links": links,
+        "metrics": {
+            "total_paused": total_paused,
+            "engaged_count": engaged_count,
+            "not_engaged": not_engaged,
+            "total_sales": total_sales,
+            "no_sale_count": no_sale_count,
+            "engaged_rate": round(engaged_rate, 2),
+            "conversion_rate": round(conversion_rate, 2),
+            "overall_conversion": round(overall_conversion, 2),
+            "total_revenue": total_revenue
+        },
+        "objection_breakdown": objection_breakdown,
+        "lead_breakdown": lead_breakdown,
+        "period": {"start": start_dt.isoformat(), "end": end_dt.isoformat()}
+    }
+
+
+async def legacy_by_seller(conn, start_dt: datetime, end_dt: datetime) -> dict:
+    """get_seller_analytics before the GROUPING SETS rewrite, for a date range."""
+    sellers = await conn.fetch("SELECT id, display_name FROM sellers WHERE is_active = TRUE")
+    results = []
+    for seller in sellers:
+        seller_id = seller["id"]
+        metrics = await conn.fetchrow("""
+            SELECT
+                COUNT(*) FILTER (WHERE engaged = TRUE) as total_engaged,
+                COUNT(*) FILTER (WHERE sale_type IS NOT NULL AND sale_type != 'none') as total_sales,
+                COALESCE(SUM(total_amount) FILTER (WHERE sale_type IS NOT NULL AND sale_type != 'none'), 0) as total_revenue
+            FROM interactions
+            WHERE seller_id = $1
+            AND timestamp >= $2 AND timestamp <= $3
+            AND deleted_at IS NULL
+        """, seller_id, start_dt, end_dt)
+        total_engaged = metrics["total_engaged"] or 0
+        total_sales = metrics["total_sales"] or 0
+        total_revenue = metrics["total_revenue"] or 0
+
+        hook_row = await conn.fetchrow("""
+            SELECT hook, COUNT(*) as count
+            FROM interactions
+            WHERE seller_id = $1 AND hook IS NOT NULL
+            AND timestamp >= $2 AND timestamp <= $3
+            AND sale_type IS NOT NULL AND sale_type != 'none'
+            AND deleted_at IS NULL
+            GROUP BY hook ORDER BY count DESC, hook LIMIT 1
+        """, seller_id, start_dt, end_dt)
+        persona_row = await conn.fetchrow("""
+            SELECT persona, COUNT(*) as count
+            FROM interactions
+            WHERE seller_id = $1 AND persona IS NOT NULL
+            AND timestamp >= $2 AND timestamp <= $3
+            AND sale_type IS NOT NULL AND sale_type != 'none'
+            AND deleted_at IS NULL
+            GROUP BY persona ORDER BY count DESC, persona LIMIT 1
+        """, seller_id, start_dt, end_dt)
+
+        results.append({
+            "seller_id": seller_id,
+            "display_name": seller["display_name"],
+            "metrics": {
+                "total_engaged": total_engaged,
+                "total_sales": total_sales,
+                "total_revenue": total_revenue,
+                "conversion_rate": round(total_sales / total_engaged, 2) if total_engaged > 0 else 0,
+                "avg_sale_value": round(total_revenue / total_sales) if total_sales > 0 else 0,
+                "top_hook": hook_row["hook"] if hook_row else None,
+                "top_persona": persona_row["persona"] if persona_row else None
+            }
+        })
+    return {"sellers": results, "period": {"start": start_dt.isoformat(), "end": end_dt.isoformat()}}
+
+
+async def seed(main, rng: random.Random, count: int) -> datetime:
+    """count random interactions over the last HISTORY_DAYS, some deleted; returns now."""
+    now = datetime.now(timezone.utc)
+    rows = []
+    for _ in range(count):
+        timestamp = now - timedelta(seconds=rng.random() * HISTORY_DAYS * 86400)
+        interaction_type = rng.choice(["walk_by", "conversation"])
+        rows.append((
+            "booth-phone", interaction_type,
+            # A few rows whose engaged flag disagrees with their type
+            (interaction_type == "conversation") != (rng.random() < 0.05),
+            rng.choice(PERSONAS), rng.choice(HOOKS), rng.choice(SALE_TYPES),
+            rng.choice([1, 2, 3, None]), rng.choice([990, 1290, None]),
+            rng.choice([None, 0, 990, 2690, 4990]),
+            rng.choice(LEAD_TYPES), rng.choice(OBJECTIONS), rng.choice(SELLERS + [None]),
+            timestamp, timestamp + timedelta(hours=1) if rng.random() < 0.1 else None,
+        ))
+    async with main.db_pool.acquire() as conn:
+        await conn.execute("INSERT INTO staff (device_name, display_name) VALUES ('booth-phone', 'Booth Phone')")
+        for seller_id in SELLERS:
+            await conn.execute(
+                "INSERT INTO sellers (id, display_name, is_active) VALUES ($1, $2, $3)",
+                seller_id, seller_id.upper(), seller_id != "s3"
+            )
+        await conn.executemany("""
+            INSERT INTO interactions (
+                staff_device, interaction_type, engaged, persona, hook, sale_type, quantity,
+                unit_price, total_amount, lead_type, objection, seller_id, timestamp, deleted_at
+            ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+        """, rows)
+    return now
+
+
+def parse_period(payload: dict) -> tuple:
+    return (datetime.fromisoformat(payload["period"]["start"]),
+            datetime.fromisoformat(payload["period"]["end"]))
+
+
+def as_json(payload: dict) -> dict:
+    return json.loads(json.dumps(payload))
+
+
+@pytest.mark.parametrize("seed_value", range(8))
+async def test_matches_previous_queries(main, client, seed_value):
+    rng = random.Random(seed_value)
+    now = await seed(main, rng, rng.randint(0, 400))
+    if seed_value % 2:
+        # Closed days answered from daily_summaries rather than live
+        await main.finalize_closed_days()
+
+    range_start = (now - timedelta(days=rng.randint(4, HISTORY_DAYS))).isoformat()
+    range_end = (now - timedelta(days=rng.randint(0, 3))).isoformat()
+    queries = [
+        {"period": "today"}, {"period": "week"}, {"period": "all"}, {},
+        {"start_date": range_start, "end_date": range_end}, {"start_date": range_start},
+    ]
+    for path, legacy in (("/api/analytics/sankey", legacy_sankey), ("/api/analytics/by-seller", legacy_by_seller)):
+        for params in queries:
+            response = await client.get(path, params=params)
+            assert response.status_code == 200, response.text
+            payload = response.json()
+            async with main.analytics_connection() as conn:
+                expected = await legacy(conn, *parse_period(payload))
+            assert payload == as_json(expected), (path, params)
+
+    # The summary path (dashboard, SQLite mode) over the same custom range
+    start_dt, end_dt = datetime.fromisoformat(range_start), datetime.fromisoformat(range_end)
+    async with main.analytics_connection() as conn:
+        expected = await legacy_sankey(conn, start_dt, end_dt)
+        summary = await main.range_summary(conn, start_dt, end_dt)
+    assert as_json(main.build_sankey(summary, start_dt, end_dt)) == as_json(expected)
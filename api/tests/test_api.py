@@ -0,0 +1,386 @@
+"""The API's endpoints, run unchanged against every backend (user-046).
+
+Each test goes through HTTP (plus the odd direct statement to set up rows
+the API will not write, like long-deleted trash), and expects the same
+answer from Postgres and SQLite. Between them they reach every query that
+is written per backend (postgres_store.py / sqlite_store.py).
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import asyncpg
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+DEVICE = {"hostname": "booth-1", "display_name": "Booth 1"}
+SALE = {"interaction_type": "conversation", "persona": "parent", "hook": "big_garden",
+        "sale_type": "single", "quantity": 2, "unit_price": 990}
+
+
+@pytest.fixture(autouse=True)
+def booth_device(main, monkeypatch):
+    """Every request comes from one known booth device."""
+    async def lookup(client_ip):
+        return DEVICE
+    monkeypatch.setattr(main, "get_tailscale_device", lookup)
+
+
+async def tap(client, **fields) -> dict:
+    response = await client.post("/api/interactions", json={"interaction_type": "walk_by", **fields})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+async def test_create_and_read_interaction(client):
+    created = await tap(client, **SALE)
+    await tap(client)
+
+    row = (await client.get(f"/api/interactions/{created['id']}")).json()
+    assert row["total_amount"] == 1980
+    assert row["engaged"] is True
+    assert row["staff_device"] == "booth-1"
+
+    today = datetime.now(timezone.utc).date().isoformat()
+    listed = (await client.get("/api/interactions", params={"date_filter": today})).json()
+    assert len(listed) == 2
+    assert [s["device_name"] for s in (await client.get("/api/staff")).json()] == ["booth-1"]
+
+
+async def test_create_is_idempotent_by_client_id(client):
+    body = {**SALE, "client_id": str(uuid4())}
+    first = await client.post("/api/interactions", json=body)
+    again = await client.post("/api/interactions", json=body)
+
+    assert first.json() == again.json()
+    assert "Idempotent-Replayed" not in first.headers
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert (await client.get("/api/interactions/browse")).json()["total"] == 1
+
+
+async def test_client_id_of_another_interaction_is_rejected(main, client):
+    existing = await tap(client, **SALE)
+    clash = await client.post("/api/interactions", json={**SALE, "client_id": existing["id"]})
+    assert clash.status_code == 409
+
+    # Resent after its idempotency key expired
+    body = {**SALE, "client_id": str(uuid4())}
+    assert (await client.post("/api/interactions", json=body)).status_code == 200
+    async with main.db_pool.acquire() as conn:
+        await conn.execute("DELETE FROM idempotency_keys")
+    assert (await client.post("/api/interactions", json=body)).status_code == 409
+
+    # The id of an archived interaction is taken too
+    async with main.db_pool.acquire() as conn:
+        await conn.execute(
+            "UPDATE interactions SET deleted_at = $1 WHERE id = $2",
+            datetime.now(timezone.utc) - timedelta(days=main.TRASH_RETENTION_DAYS + 1), existing["id"]
+        )
+    assert (await client.post("/api/admin/trash/archive")).json()["moved"] == 1
+    clash = await client.post("/api/interactions", json={**SALE, "client_id": existing["id"]})
+    assert clash.status_code == 409
+    assert (await client.post(f"/api/interactions/{existing['id']}/restore")).status_code == 200
+
+    # The ingest journal's drain sets such an entry aside
+    entry = {
+        "key": str(uuid4()), "id": existing["id"], "staff_device": "booth-1", "display_name": "Booth 1",
+        "interaction_type": "walk_by", "engaged": False, "persona": None, "hook": None,
+        "sale_type": None, "quantity": 1, "unit_price": None, "total_amount": None,
+        "lead_type": None, "objection": None, "timestamp": datetime.now(timezone.utc).isoformat(),
+        "response": {"ok": True},
+    }
+    async with main.db_pool.acquire() as conn:
+        with pytest.raises(asyncpg.UniqueViolationError):
+            await main.backend.insert_journaled_interactions(conn, [entry])
+    assert (await client.get("/api/interactions/browse")).json()["total"] == 2
+
+
+async def test_event_create_is_idempotent_by_header(client):
+    headers = {"Idempotency-Key": "rain-1"}
+    first = await client.post("/api/events", json={"description": "rain started"}, headers=headers)
+    again = await client.post("/api/events", json={"description": "rain started"}, headers=headers)
+
+    assert first.status_code == again.status_code == 200
+    assert first.json() == again.json()
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert len((await client.get("/api/events")).json()) == 1
+
+
+async def test_journaled_entries_are_inserted_once(main):
+    entry = {
+        "key": str(uuid4()), "id": None, "staff_device": "booth-1", "display_name": "Booth 1",
+        "interaction_type": "walk_by", "engaged": False, "persona": None, "hook": None,
+        "sale_type": None, "quantity": 1, "unit_price": None, "total_amount": None,
+        "lead_type": None, "objection": None, "timestamp": datetime.now(timezone.utc).isoformat(),
+        "response": {"ok": True},
+    }
+    entry["id"] = entry["key"]
+    async with main.db_pool.acquire() as conn:
+        await main.backend.insert_journaled_interactions(conn, [entry, entry])
+        await main.backend.insert_journaled_interactions(conn, [entry])
+        assert await conn.fetchval("SELECT COUNT(*) FROM interactions") == 1
+
+
+async def test_update_checks_if_match(client):
+    created = await tap(client, **SALE)
+    url = f"/api/interactions/{created['id']}"
+
+    updated = await client.patch(url, json={"notes": "asked about the garden kit"})
+    assert updated.status_code == 200
+    etag = updated.headers["ETag"]
+    assert updated.json()["updated_at"] is not None
+
+    assert (await client.patch(url, json={"notes": "second"}, headers={"If-Match": etag})).status_code == 200
+    stale = await client.patch(url, json={"notes": "third"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert (await client.get(url)).json()["notes"] == "second"
+
+
+async def test_walk_by_clears_conversation_fields(client):
+    created = await tap(client, **SALE)
+    row = (await client.patch(f"/api/interactions/{created['id']}", json={"interaction_type": "walk_by"})).json()
+    assert (row["engaged"], row["persona"], row["sale_type"], row["total_amount"]) == (False, None, None, None)
+
+
+async def test_soft_delete_and_restore(client):
+    created = await tap(client, **SALE)
+    url = f"/api/interactions/{created['id']}"
+
+    await client.patch(url, json={"deleted": True})
+    assert (await client.get("/api/interactions/trash")).json()["total"] == 1
+    assert (await client.post(f"{url}/restore")).json() == {"restored": True, "id": created["id"]}
+    assert (await client.post(f"{url}/restore")).status_code == 404
+    assert (await client.get("/api/interactions/trash")).json()["total"] == 0
+
+
+async def test_archive_and_restore_from_archive(main, client):
+    created = await tap(client, **SALE)
+    await tap(client)
+    async with main.db_pool.acquire() as conn:
+        await conn.execute(
+            "UPDATE interactions SET deleted_at = $1 WHERE id = $2",
+            datetime.now(timezone.utc) - timedelta(days=main.TRASH_RETENTION_DAYS + 1), created["id"]
+        )
+
+    report = (await client.post("/api/admin/trash/archive")).json()
+    assert report["moved"] == 1
+    assert report["archived_rows"] == 1
+    assert report["after"]["trash_rows"] == 0
+    archived = (await client.get("/api/interactions/trash", params={"archived": True})).json()
+    assert [r["id"] for r in archived["records"]] == [created["id"]]
+
+    assert (await client.post(f"/api/interactions/{created['id']}/restore")).status_code == 200
+    assert (await client.get(f"/api/interactions/{created['id']}")).json()["deleted_at"] is None
+    assert (await client.get("/api/interactions/trash", params={"archived": True})).json()["total"] == 0
+
+
+async def test_bulk_update_by_filter_and_ids(client):
+    parents = [await tap(client, interaction_type="conversation", persona="parent") for _ in range(3)]
+    other = await tap(client, interaction_type="conversation", persona="expat")
+
+    by_filter = await client.patch("/api/interactions/bulk", json={
+        "filter": {"personas": "parent"}, "update": {"hook": "signage"}
+    })
+    assert by_filter.json()["updated"] == 3
+    by_ids = await client.patch("/api/interactions/bulk", json={
+        "ids": [other["id"], str(uuid4())], "update": {"deleted": True}
+    })
+    assert by_ids.json()["updated"] == 1
+    assert len(by_ids.json()["not_found"]) == 1
+
+    browse = (await client.get("/api/interactions/browse", params={"hooks": "signage"})).json()
+    assert sorted(r["id"] for r in browse["records"]) == sorted(p["id"] for p in parents)
+    assert all(r["updated_at"] for r in browse["records"])
+
+
+async def test_notes_search(client):
+    garden = await tap(client, interaction_type="conversation")
+    await client.patch(f"/api/interactions/{garden['id']}", json={"notes": "Loved the big garden kit"})
+    price = await tap(client, interaction_type="conversation")
+    await client.patch(f"/api/interactions/{price['id']}", json={"notes": "Garden tour, price too high for now"})
+
+    found = (await client.get("/api/interactions/search", params={"q": "kit"})).json()
+    assert [r["id"] for r in found["records"]] == [garden["id"]]
+    assert "<mark>" in found["records"][0]["snippet"]
+
+    excluded = (await client.get("/api/interactions/browse", params={"q": "garden -kit"})).json()
+    assert [r["id"] for r in excluded["records"]] == [price["id"]]
+    phrase = (await client.get("/api/interactions/browse", params={"q": '"too high"'})).json()
+    assert [r["id"] for r in phrase["records"]] == [price["id"]]
+
+
+async def test_search_pages_with_cursor(client):
+    for i in range(5):
+        created = await tap(client, interaction_type="conversation")
+        await client.patch(f"/api/interactions/{created['id']}", json={"notes": f"garden visit {i}"})
+
+    seen, cursor = [], None
+    while True:
+        params = {"q": "garden", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get("/api/interactions/search", params=params)).json()
+        seen += [r["id"] for r in page["records"]]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+async def test_sellers_count_todays_sales(client):
+    await client.post("/api/sellers", json={"display_name": "Tanwa"})
+    await tap(client)  # Registers the device
+    await client.post("/api/session/select-seller", json={"seller_id": "tanwa"})
+    await tap(client, **SALE)
+    await tap(client, timestamp=(datetime.now(timezone.utc) - timedelta(days=2)).isoformat())
+
+    sellers = (await client.get("/api/sellers")).json()
+    assert [(s["id"], s["today_count"], s["last_device"]) for s in sellers] == [("tanwa", 1, "booth-1")]
+
+    by_seller = (await client.get("/api/analytics/by-seller", params={"period": "week"})).json()
+    metrics = by_seller["sellers"][0]["metrics"]
+    assert (metrics["total_sales"], metrics["total_revenue"], metrics["top_hook"]) == (1, 1980, "big_garden")
+
+
+async def test_sankey_and_stats(client):
+    await tap(client, **SALE)
+    await tap(client, interaction_type="conversation", objection="no_time", lead_type="line")
+    await tap(client)
+
+    sankey = (await client.get("/api/analytics/sankey", params={"period": "today"})).json()
+    links = {(link["source"], link["target"]): link["value"] for link in sankey["links"]}
+    assert links[("all_paused", "engaged")] == 2
+    assert links[("all_paused", "not_engaged")] == 1
+    assert links[("engaged", "single")] == 1
+
+    stats = (await client.get("/api/stats", params={"period": "all"})).json()
+    assert (stats["visitors"], stats["sales"]["revenue"], stats["leads"]["line"]) == (3, 1980, 1)
+
+
+async def test_closed_days_are_snapshot(main, client):
+    await tap(client)
+    old = datetime.now(timezone.utc) - timedelta(days=main.MAX_BACKDATE_DAYS + 5)
+    async with main.db_pool.acquire() as conn:
+        await conn.execute(
+            "INSERT INTO interactions (id, staff_device, interaction_type, engaged, timestamp, updated_at) "
+            "VALUES ($1, 'booth-1', 'walk_by', FALSE, $2, $2)", uuid4(), old
+        )
+
+    assert await main.finalize_closed_days() > 0
+    assert await main.finalize_closed_days() == 0
+    assert (await client.get("/api/stats", params={"period": "all"})).json()["visitors"] == 2
+
+    day = old.astimezone(main.ZoneInfo(main.BOOTH_TIMEZONE)).date().isoformat()
+    snapshot = (await client.post(f"/api/admin/daily-summaries/{day}/finalize")).json()
+    assert snapshot["summary"]["visitors"] == 1
+
+
+async def test_pivot_cube(client):
+    await tap(client, **SALE)
+    await tap(client, interaction_type="conversation", persona="expat", hook="big_garden")
+    await tap(client, interaction_type="conversation", persona="parent", hook="signage")
+
+    pivot = (await client.get("/api/analytics/pivot", params={
+        "dims": "persona,hook", "measures": "visitors,sales,revenue,conversion", "cube": "true", "period": "today"
+    })).json()
+    rows = {(r["persona"], r["hook"]): r for r in pivot["rows"]}
+    assert rows[("parent", None)]["rollup"] == ["hook"]
+    assert rows[("parent", None)]["visitors"] == 2
+    assert rows[(None, None)]["rollup"] == ["persona", "hook"]
+    assert (rows[(None, None)]["sales"], rows[(None, None)]["revenue"]) == (1, 1980)
+    assert rows[("parent", "big_garden")]["conversion"] == 1.0
+
+    by_day = (await client.get("/api/analytics/pivot", params={"dims": "day", "period": "today"})).json()
+    assert sum(r["visitors"] for r in by_day["rows"]) == 3
+    filtered = (await client.get("/api/analytics/pivot", params={
+        "dims": "hook", "filters": "persona:parent", "period": "today"
+    })).json()
+    assert sum(r["visitors"] for r in filtered["rows"]) == 2
+
+
+async def test_timeseries_buckets(client):
+    await tap(client, **SALE)
+    await tap(client)
+
+    series = (await client.get("/api/analytics/timeseries", params={"bucket": "1h", "period": "today"})).json()
+    assert sum(p["walk_bys"] for p in series["points"]) == 1
+    assert sum(p["revenue"] for p in series["points"]) == 1980
+    assert series["points"][-1]["start"] == series["live_bucket"]
+
+    again = (await client.get("/api/analytics/timeseries", params={"bucket": "1h", "period": "today"})).json()
+    assert again["points"] == series["points"]
+
+
+async def test_event_impact(client):
+    earlier = (datetime.now(timezone.utc) - timedelta(minutes=20)).isoformat()
+    await tap(client, timestamp=earlier)
+    await client.post("/api/events", json={"description": "demo started"})
+    await tap(client, **SALE)
+
+    impact = (await client.get("/api/analytics/event-impact", params={"period": "today"})).json()
+    event = impact["events"][0]
+    assert (event["before"]["visitors"], event["after"]["visitors"]) == (1, 1)
+    assert event["after"]["revenue"] == 1980
+
+
+async def test_change_feed(main, client):
+    cursor = (await client.get("/api/changes")).json()["next"]
+    created = await tap(client, **SALE)
+    await client.patch(f"/api/interactions/{created['id']}", json={"notes": "follow up"})
+    await client.post("/api/sellers", json={"display_name": "Tanwa"})
+
+    page = (await client.get("/api/changes", params={"since": cursor})).json()
+    changes = {(c["table"], c["key"]): c for c in page["changes"]}
+    assert changes[("interactions", created["id"])]["row"]["notes"] == "follow up"
+    assert changes[("sellers", "tanwa")]["op"] == "upsert"
+    assert changes[("staff", "booth-1")]["row"]["display_name"] == "Booth 1"
+
+    await client.delete(f"/api/interactions/{created['id']}", params={"confirm": True})
+    page = (await client.get("/api/changes", params={"since": page["next"]})).json()
+    assert [(c["table"], c["op"]) for c in page["changes"]] == [("interactions", "delete")]
+
+    async with main.db_pool.acquire() as conn:
+        assert await main.backend.compact_change_log(conn, timedelta(days=1)) > 0  # Superseded upserts
+        rows = await conn.fetch("SELECT table_name, row_key FROM change_log")
+        assert len(rows) == len({(row["table_name"], row["row_key"]) for row in rows})
+
+
+async def test_column_store_catch_up_leaves_served_store_unchanged(main, client):
+    await tap(client, **SALE)
+    await tap(client)
+    crosstab = (await client.get("/api/analytics/crosstab", params={"dims": "interaction_type"})).json()
+    assert crosstab["interactions"] == 2
+    served = await main.interaction_columns.current()
+
+    await tap(client, **SALE)
+    main.interaction_columns.invalidate()
+    caught_up = await main.interaction_columns.current()
+    assert caught_up is not served
+    assert (len(served), len(caught_up)) == (2, 3)
+
+
+async def test_conversion_ci_caps_resamples(main, client):
+    await tap(client, **SALE)
+    params = {"resamples": main.MAX_BOOTSTRAP_RESAMPLES}
+    assert (await client.get("/api/analytics/conversion-ci", params=params)).status_code == 200
+    params = {"resamples": main.MAX_BOOTSTRAP_RESAMPLES + 1}
+    assert (await client.get("/api/analytics/conversion-ci", params=params)).status_code == 422
+
+
+async def test_database_reachable_when_the_write_pool_is_busy(main, monkeypatch):
+    monkeypatch.setattr(main, "READY_PING_TIMEOUT", 0.2)
+    held = [await main.db_pool.acquire() for _ in range(main.db_pool.get_max_size())]
+    try:
+        # Pinged on a dedicated connection instead
+        assert await main.database_reachable() is True
+
+        class Unreachable:
+            @staticmethod
+            async def connect(url):
+                await asyncio.sleep(10)
+
+        monkeypatch.setattr(main, "database", Unreachable)
+        assert await main.database_reachable() is False
+    finally:
+        for conn in held:
+            await main.db_pool.release(conn)
+    assert await main.database_reachable() is True
@@ -0,0 +1,62 @@
+-- ============================================================
+-- INDEX REVIEW: MATCH INDEXES TO THE REAL QUERY MIX
+-- File: migrations/007_query_indexes.sql
+-- ============================================================
+--
+-- Every read endpoint filters on "deleted_at IS NULL" plus a timestamp range,
+-- then narrows by sale outcome or lead type. The phase 2 indexes were built
+-- for a filter combination the planner never picks: on a 200k-row synthetic
+-- dataset (scripts/bench.py) idx_interactions_browser, idx_interactions_engaged
+-- and idx_interactions_sale_type were never used, while each insert still had
+-- to maintain them.
+--
+-- Run with psql outside a transaction block (CONCURRENTLY cannot run inside
+-- one), so the live booth keeps writing while indexes build.
+
+-- 1. Live (non-deleted) rows by time. Serves every "timestamp >= $1 AND
+--    deleted_at IS NULL" range; engaged is included so the visitor and
+--    conversation/walk-by counts are index-only. Kept narrow on purpose:
+--    wider INCLUDE lists made the unfiltered browse COUNT(*) fall back to a
+--    sequential scan.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_interactions_live
+ON interactions (timestamp)
+INCLUDE (engaged)
+WHERE deleted_at IS NULL;
+
+-- 2. Sales only (sale_type != 'none'): revenue, boxes, product mix, buyer
+--    personas and the by-seller top hook/persona lookups.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_interactions_sales
+ON interactions (timestamp)
+INCLUDE (sale_type, quantity, total_amount, persona, hook, seller_id)
+WHERE deleted_at IS NULL AND sale_type IS NOT NULL AND sale_type <> 'none';
+
+-- 3. Lead capture: stats lead counts and the sankey lead x outcome breakdown.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_interactions_leads
+ON interactions (lead_type, timestamp)
+INCLUDE (engaged, sale_type)
+WHERE deleted_at IS NULL AND lead_type IS NOT NULL;
+
+-- 4. Trash listing: "deleted_at IS NOT NULL ORDER BY deleted_at DESC".
+--    Only deleted rows are indexed, so normal inserts never touch it.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_interactions_trash
+ON interactions (deleted_at DESC)
+WHERE deleted_at IS NOT NULL;
+
+-- 5. Drop indexes that only add write amplification.
+--    - browser: six-column composite the planner never chooses over (1)
+--    - engaged: boolean, never selective enough to beat a range scan
+--    - date: expression index; list_sellers/list_interactions now use ranges
+--    - sale_type: low cardinality, superseded by the partial sales index (2)
+--    - deleted_at: whole-table index, superseded by (1) and (4); the
+--      unfiltered browse count still needed it, see 020_live_rows_index.sql
+DROP INDEX CONCURRENTLY IF EXISTS idx_interactions_browser;
+DROP INDEX CONCURRENTLY IF EXISTS idx_interactions_engaged;
+DROP INDEX CONCURRENTLY IF EXISTS idx_interactions_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_interactions_sale_type;
+DROP INDEX CONCURRENTLY IF EXISTS idx_interactions_deleted_at;
+
+-- Kept: idx_interactions_timestamp (include_deleted browse, list_interactions),
+-- idx_interactions_seller (by-seller and today_count per seller),
+-- idx_interactions_staff (staff FK), idx_interactions_notes (has_notes).
+
+ANALYZE interactions;
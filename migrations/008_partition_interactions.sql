@@ -0,0 +1,257 @@
+-- ============================================================
+-- MONTHLY PARTITIONING FOR INTERACTIONS
+-- File: migrations/008_partition_interactions.sql
+-- ============================================================
+--
+-- interactions is never pruned, so every range query and index keeps growing
+-- with each fair. This converts it to a table partitioned by month on
+-- timestamp, so "today"/"week"/custom ranges only touch the partitions they
+-- cover.
+--
+-- Online path, run top to bottom with psql (NOT inside a single transaction):
+--   1. Build interactions_partitioned alongside the live table.
+--   2. Mirror every write on interactions into it with a trigger.
+--   3. Backfill history in committed batches (CALL below) while the booth
+--      keeps writing.
+--   4. Swap the tables in one short transaction that also reconciles any
+--      row the backfill raced with.
+-- The old table is kept as interactions_unpartitioned for rollback
+-- (008_partition_interactions_rollback.sql); drop it once you are happy.
+--
+-- The primary key becomes (id, timestamp) because a partitioned table's
+-- unique constraints must include the partition key, so it no longer
+-- guarantees one row per id: 022_interaction_id_registry.sql restores that
+-- across partitions and the archive. A plan over the partitioned table also
+-- costs more to build, which 023_interaction_summary_plan_cache.sql keeps
+-- off the stats path.
+
+-- 0. Rows without a timestamp cannot be placed in a partition.
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM interactions WHERE timestamp IS NULL) THEN
+        RAISE EXCEPTION 'interactions has rows with NULL timestamp; set them (e.g. from updated_at) before partitioning';
+    END IF;
+END $$;
+
+-- 1. Partitioned copy of the table
+CREATE TABLE IF NOT EXISTS interactions_partitioned (
+    LIKE interactions INCLUDING DEFAULTS INCLUDING CONSTRAINTS
+) PARTITION BY RANGE (timestamp);
+
+ALTER TABLE interactions_partitioned ALTER COLUMN timestamp SET NOT NULL;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint WHERE conname = 'interactions_partitioned_pkey'
+    ) THEN
+        ALTER TABLE interactions_partitioned
+        ADD CONSTRAINT interactions_partitioned_pkey PRIMARY KEY (id, timestamp);
+        ALTER TABLE interactions_partitioned
+        ADD CONSTRAINT interactions_partitioned_staff_device_fkey
+        FOREIGN KEY (staff_device) REFERENCES staff(device_name);
+        ALTER TABLE interactions_partitioned
+        ADD CONSTRAINT interactions_partitioned_seller_id_fkey
+        FOREIGN KEY (seller_id) REFERENCES sellers(id);
+    END IF;
+END $$;
+
+-- Catch-all so an insert never fails because a month is missing. It should
+-- stay empty: ensure_interaction_partitions() runs ahead of the calendar.
+CREATE TABLE IF NOT EXISTS interactions_default
+PARTITION OF interactions_partitioned DEFAULT;
+
+-- 2. Monthly partitions (UTC month boundaries), named interactions_yYYYYmMM.
+--    Creates every month from start_month through months_ahead months past
+--    the current one. Safe to call repeatedly; the API calls it daily.
+CREATE OR REPLACE FUNCTION ensure_interaction_partitions(
+    months_ahead INTEGER DEFAULT 3,
+    parent TEXT DEFAULT 'interactions',
+    start_month TIMESTAMPTZ DEFAULT NOW()
+)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start TIMESTAMPTZ;
+    last_month TIMESTAMPTZ;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    month_start := date_trunc('month', start_month AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    last_month := date_trunc('month', (NOW() AT TIME ZONE 'UTC') + make_interval(months => months_ahead)) AT TIME ZONE 'UTC';
+
+    WHILE month_start <= last_month LOOP
+        partition_name := 'interactions_' || to_char(month_start AT TIME ZONE 'UTC', '"y"YYYY"m"MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, month_start, month_start + INTERVAL '1 month'
+            );
+            created := created + 1;
+        END IF;
+        month_start := month_start + INTERVAL '1 month';
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_interaction_partitions(
+    3,
+    'interactions_partitioned',
+    COALESCE((SELECT MIN(timestamp) FROM interactions), NOW())
+);
+
+-- 3. Indexes (same set as 007). Named *_p until the swap renames them.
+CREATE INDEX IF NOT EXISTS idx_interactions_timestamp_p ON interactions_partitioned (timestamp);
+CREATE INDEX IF NOT EXISTS idx_interactions_staff_p ON interactions_partitioned (staff_device);
+CREATE INDEX IF NOT EXISTS idx_interactions_notes_p ON interactions_partitioned (id) WHERE notes IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_seller_p ON interactions_partitioned (seller_id, timestamp)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_live_p ON interactions_partitioned (timestamp)
+    INCLUDE (engaged) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_sales_p ON interactions_partitioned (timestamp)
+    INCLUDE (sale_type, quantity, total_amount, persona, hook, seller_id)
+    WHERE deleted_at IS NULL AND sale_type IS NOT NULL AND sale_type <> 'none';
+CREATE INDEX IF NOT EXISTS idx_interactions_leads_p ON interactions_partitioned (lead_type, timestamp)
+    INCLUDE (engaged, sale_type) WHERE deleted_at IS NULL AND lead_type IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_trash_p ON interactions_partitioned (deleted_at DESC)
+    WHERE deleted_at IS NOT NULL;
+
+-- 4. Mirror live writes into the partitioned copy during the backfill.
+--    An UPDATE may move a row to another month, so it is replayed as
+--    delete + upsert; the upsert wins over a concurrent backfill batch.
+CREATE OR REPLACE FUNCTION mirror_interaction_to_partitioned()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM interactions_partitioned WHERE id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO interactions_partitioned SELECT NEW.*
+        ON CONFLICT (id, timestamp) DO UPDATE SET
+            staff_device = EXCLUDED.staff_device,
+            interaction_type = EXCLUDED.interaction_type,
+            engaged = EXCLUDED.engaged,
+            persona = EXCLUDED.persona,
+            hook = EXCLUDED.hook,
+            sale_type = EXCLUDED.sale_type,
+            quantity = EXCLUDED.quantity,
+            unit_price = EXCLUDED.unit_price,
+            total_amount = EXCLUDED.total_amount,
+            lead_type = EXCLUDED.lead_type,
+            objection = EXCLUDED.objection,
+            seller_id = EXCLUDED.seller_id,
+            notes = EXCLUDED.notes,
+            deleted_at = EXCLUDED.deleted_at,
+            updated_at = EXCLUDED.updated_at;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS interactions_partition_mirror ON interactions;
+CREATE TRIGGER interactions_partition_mirror
+AFTER INSERT OR UPDATE OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION mirror_interaction_to_partitioned();
+
+-- 5. Backfill history in keyset-ordered batches, committing after each one
+--    so locks and WAL stay small.
+CREATE OR REPLACE PROCEDURE backfill_partitioned_interactions(batch_size INTEGER DEFAULT 5000)
+LANGUAGE plpgsql AS $$
+DECLARE
+    last_ts TIMESTAMPTZ := '-infinity';
+    last_id UUID := '00000000-0000-0000-0000-000000000000';
+    copied INTEGER;
+    total INTEGER := 0;
+BEGIN
+    LOOP
+        WITH batch AS (
+            SELECT * FROM interactions
+            WHERE (timestamp, id) > (last_ts, last_id)
+            ORDER BY timestamp, id
+            LIMIT batch_size
+        ), inserted AS (
+            INSERT INTO interactions_partitioned
+            SELECT * FROM batch
+            ON CONFLICT (id, timestamp) DO NOTHING
+        )
+        SELECT COUNT(*),
+               (array_agg(timestamp ORDER BY timestamp DESC, id DESC))[1],
+               (array_agg(id ORDER BY timestamp DESC, id DESC))[1]
+        INTO copied, last_ts, last_id
+        FROM batch;
+
+        EXIT WHEN copied = 0;
+        total := total + copied;
+        COMMIT;
+        RAISE NOTICE 'backfilled % rows (through %)', total, last_ts;
+    END LOOP;
+END;
+$$;
+
+CALL backfill_partitioned_interactions(5000);
+
+-- 6. Swap. Holds an exclusive lock only for the reconciliation and renames.
+BEGIN;
+
+LOCK TABLE interactions IN ACCESS EXCLUSIVE MODE;
+
+-- Reconcile anything the backfill raced with (e.g. an edit that moved a row)
+DELETE FROM interactions_partitioned p
+WHERE NOT EXISTS (
+    SELECT 1 FROM interactions o
+    WHERE o.id = p.id AND o.timestamp = p.timestamp AND ROW(o.*) IS NOT DISTINCT FROM ROW(p.*)
+);
+INSERT INTO interactions_partitioned
+SELECT o.* FROM interactions o
+WHERE NOT EXISTS (
+    SELECT 1 FROM interactions_partitioned p WHERE p.id = o.id AND p.timestamp = o.timestamp
+);
+
+DROP TRIGGER IF EXISTS interactions_partition_mirror ON interactions;
+DROP TRIGGER IF EXISTS interaction_notify_trigger ON interactions;
+DROP TRIGGER IF EXISTS update_interactions_updated_at ON interactions;
+
+ALTER TABLE interactions RENAME TO interactions_unpartitioned;
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = 'interactions_unpartitioned' AND indexname NOT LIKE '%\_unpartitioned'
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, left(idx.indexname, 48) || '_unpartitioned');
+    END LOOP;
+END $$;
+
+ALTER TABLE interactions_partitioned RENAME TO interactions;
+ALTER TABLE interactions RENAME CONSTRAINT interactions_partitioned_pkey TO interactions_pkey;
+ALTER TABLE interactions RENAME CONSTRAINT interactions_partitioned_staff_device_fkey TO interactions_staff_device_fkey;
+ALTER TABLE interactions RENAME CONSTRAINT interactions_partitioned_seller_id_fkey TO interactions_seller_id_fkey;
+ALTER INDEX idx_interactions_timestamp_p RENAME TO idx_interactions_timestamp;
+ALTER INDEX idx_interactions_staff_p RENAME TO idx_interactions_staff;
+ALTER INDEX idx_interactions_notes_p RENAME TO idx_interactions_notes;
+ALTER INDEX idx_interactions_seller_p RENAME TO idx_interactions_seller;
+ALTER INDEX idx_interactions_live_p RENAME TO idx_interactions_live;
+ALTER INDEX idx_interactions_sales_p RENAME TO idx_interactions_sales;
+ALTER INDEX idx_interactions_leads_p RENAME TO idx_interactions_leads;
+ALTER INDEX idx_interactions_trash_p RENAME TO idx_interactions_trash;
+
+-- Row triggers on a partitioned table are cloned onto every partition,
+-- including the ones ensure_interaction_partitions() creates later.
+CREATE TRIGGER update_interactions_updated_at
+    BEFORE UPDATE ON interactions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER interaction_notify_trigger
+AFTER INSERT OR UPDATE OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION notify_interaction_change();
+
+COMMIT;
+
+DROP FUNCTION IF EXISTS mirror_interaction_to_partitioned();
+DROP PROCEDURE IF EXISTS backfill_partitioned_interactions(INTEGER);
+
+ANALYZE interactions;
@@ -0,0 +1,48 @@
+-- Rollback: Return interactions to a single unpartitioned table
+-- Run this to undo migrations/008_partition_interactions.sql
+-- Requires interactions_unpartitioned, which 008 keeps for this purpose.
+-- Rows written since the migration are copied back before the swap.
+
+BEGIN;
+
+LOCK TABLE interactions IN ACCESS EXCLUSIVE MODE;
+LOCK TABLE interactions_unpartitioned IN ACCESS EXCLUSIVE MODE;
+
+-- Bring the old table up to date with everything written since the swap
+TRUNCATE interactions_unpartitioned;
+INSERT INTO interactions_unpartitioned SELECT * FROM interactions;
+
+-- Drop the partitioned table (and all of its partitions)
+DROP TABLE interactions;
+
+ALTER TABLE interactions_unpartitioned RENAME TO interactions;
+DO $$
+DECLARE
+    idx RECORD;
+BEGIN
+    FOR idx IN
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = 'interactions' AND indexname LIKE '%\_unpartitioned'
+    LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', idx.indexname, left(idx.indexname, -length('_unpartitioned')));
+    END LOOP;
+END $$;
+
+CREATE TRIGGER update_interactions_updated_at
+    BEFORE UPDATE ON interactions
+    FOR EACH ROW
+    EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER interaction_notify_trigger
+AFTER INSERT OR UPDATE OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION notify_interaction_change();
+
+DROP FUNCTION IF EXISTS ensure_interaction_partitions(INTEGER, TEXT, TIMESTAMPTZ);
+
+COMMIT;
+
+-- Verify cleanup
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. interactions is no longer partitioned.';
+END $$;
@@ -0,0 +1,226 @@
+-- ============================================================
+-- CLOSED-DAY SNAPSHOTS FOR ALL-TIME ANALYTICS
+-- File: migrations/009_daily_summaries.sql
+-- ============================================================
+--
+-- period=all re-aggregated every interaction ever logged on each dashboard
+-- refresh. Interactions cannot be created or moved more than
+-- MAX_BACKDATE_DAYS (30) into the past through the API, so every booth-local
+-- day older than that is effectively closed. Each closed day is aggregated
+-- once into daily_summaries; all-time analytics sums those rows and only
+-- aggregates the editable window live.
+--
+-- Snapshots are finalized lazily by the API (finalize_daily_summaries) in the
+-- booth timezone (BOOTH_TIMEZONE). Edits to old rows that still happen
+-- (notes aside: soft delete, field corrections, manual SQL) drop the affected
+-- snapshots through a trigger, and the API re-finalizes them on next use.
+-- POST /api/admin/daily-summaries/{day}/finalize forces a rebuild.
+--
+-- Rollback: 009_daily_summaries_rollback.sql
+
+-- 1. One row per closed booth-local day
+CREATE TABLE IF NOT EXISTS daily_summaries (
+    day DATE PRIMARY KEY,
+    timezone TEXT NOT NULL,         -- BOOTH_TIMEZONE the day boundaries used
+    summary JSONB NOT NULL,         -- interaction_summary() for that day
+    finalized_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- 2. Every counter the dashboards need, for non-deleted rows in
+--    [range_start, range_end). Counters are plain numbers or nested objects
+--    of numbers, so summaries for adjacent ranges add up key by key.
+--    One scan: each breakdown is a grouping set, told apart by grouping_set.
+CREATE OR REPLACE FUNCTION interaction_summary(range_start TIMESTAMPTZ, range_end TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    WITH grouped AS (
+        SELECT
+            CASE
+                WHEN GROUPING(seller_id) = 0 AND GROUPING(hook) = 0 THEN 'seller_hook'
+                WHEN GROUPING(seller_id) = 0 AND GROUPING(persona) = 0 THEN 'seller_persona'
+                WHEN GROUPING(seller_id) = 0 THEN 'seller'
+                WHEN GROUPING(is_sale) = 0 THEN 'lead_outcome'
+                WHEN GROUPING(sale_type) = 0 THEN 'sale_type'
+                WHEN GROUPING(persona) = 0 THEN 'persona'
+                WHEN GROUPING(hook) = 0 THEN 'hook'
+                WHEN GROUPING(objection) = 0 THEN 'objection'
+                WHEN GROUPING(lead_type) = 0 THEN 'lead_type'
+                ELSE 'total'
+            END AS grouping_set,
+            sale_type, persona, hook, objection, lead_type, is_sale, seller_id,
+            COUNT(*) AS n,
+            COUNT(*) FILTER (WHERE engaged = TRUE) AS n_engaged,
+            COUNT(*) FILTER (WHERE engaged = FALSE) AS n_walk_by,
+            COUNT(*) FILTER (WHERE is_sale) AS n_sale,
+            COALESCE(SUM(total_amount) FILTER (WHERE is_sale), 0) AS sale_revenue,
+            COALESCE(SUM(total_amount) FILTER (WHERE engaged = TRUE), 0) AS engaged_revenue,
+            COALESCE(SUM(
+                CASE
+                    WHEN sale_type = 'single' THEN quantity
+                    WHEN sale_type = 'bundle_3' THEN 3
+                    WHEN sale_type = 'full_year' THEN 12
+                    ELSE 0
+                END
+            ) FILTER (WHERE is_sale), 0) AS boxes,
+            COUNT(*) FILTER (WHERE unit_price = 990) AS price_990,
+            COUNT(*) FILTER (WHERE unit_price = 1290) AS price_1290
+        FROM (
+            SELECT engaged, persona, hook, sale_type, quantity, unit_price,
+                   total_amount, lead_type, objection, seller_id,
+                   (sale_type IS NOT NULL AND sale_type <> 'none') AS is_sale
+            FROM interactions
+            WHERE timestamp >= range_start AND timestamp < range_end
+              AND deleted_at IS NULL
+        ) live
+        GROUP BY GROUPING SETS (
+            (), (sale_type), (persona), (hook), (objection), (lead_type),
+            (is_sale, lead_type), (seller_id), (seller_id, hook), (seller_id, persona)
+        )
+    )
+    SELECT jsonb_build_object(
+        'visitors', t.n,
+        'conversations', t.n_engaged,
+        'walk_bys', t.n_walk_by,
+        'sales_count', t.n_sale,
+        'revenue', t.sale_revenue,
+        'boxes', t.boxes,
+        'price_990', t.price_990,
+        'price_1290', t.price_1290,
+        'product_mix', COALESCE((
+            SELECT jsonb_object_agg(sale_type, n_sale) FROM grouped
+            WHERE grouping_set = 'sale_type' AND n_sale > 0), '{}'::jsonb),
+        'personas', COALESCE((
+            SELECT jsonb_object_agg(persona, n_sale) FROM grouped
+            WHERE grouping_set = 'persona' AND persona IS NOT NULL AND n_sale > 0), '{}'::jsonb),
+        'hooks', COALESCE((
+            SELECT jsonb_object_agg(hook, n) FROM grouped
+            WHERE grouping_set = 'hook' AND hook IS NOT NULL), '{}'::jsonb),
+        'objections', COALESCE((
+            SELECT jsonb_object_agg(objection, n) FROM grouped
+            WHERE grouping_set = 'objection' AND objection IS NOT NULL), '{}'::jsonb),
+        'leads', COALESCE((
+            SELECT jsonb_object_agg(lead_type, n) FROM grouped
+            WHERE grouping_set = 'lead_type' AND lead_type IS NOT NULL), '{}'::jsonb),
+        -- Sankey: engaged rows by outcome ('unset' = conversation with no sale_type)
+        'engaged_sales', COALESCE((
+            SELECT jsonb_object_agg(
+                COALESCE(sale_type, 'unset'),
+                jsonb_build_object('count', n_engaged, 'revenue', engaged_revenue)
+            ) FROM grouped
+            WHERE grouping_set = 'sale_type' AND n_engaged > 0), '{}'::jsonb),
+        -- Sankey: "sale_with_line", "no_sale_with_email", ...
+        'lead_outcomes', COALESCE((
+            SELECT jsonb_object_agg(
+                CASE WHEN is_sale THEN 'sale' ELSE 'no_sale' END || '_with_' || lead_type, n_engaged
+            ) FROM grouped
+            WHERE grouping_set = 'lead_outcome' AND lead_type IS NOT NULL AND n_engaged > 0), '{}'::jsonb),
+        -- By-seller: totals plus hook/persona counts among that seller's sales
+        'sellers', COALESCE((
+            SELECT jsonb_object_agg(s.seller_id, jsonb_build_object(
+                'engaged', s.n_engaged,
+                'sales', s.n_sale,
+                'revenue', s.sale_revenue,
+                'hooks', COALESCE((
+                    SELECT jsonb_object_agg(h.hook, h.n_sale) FROM grouped h
+                    WHERE h.grouping_set = 'seller_hook' AND h.seller_id = s.seller_id
+                      AND h.hook IS NOT NULL AND h.n_sale > 0), '{}'::jsonb),
+                'personas', COALESCE((
+                    SELECT jsonb_object_agg(p.persona, p.n_sale) FROM grouped p
+                    WHERE p.grouping_set = 'seller_persona' AND p.seller_id = s.seller_id
+                      AND p.persona IS NOT NULL AND p.n_sale > 0), '{}'::jsonb)
+            ))
+            FROM grouped s
+            WHERE s.grouping_set = 'seller' AND s.seller_id IS NOT NULL), '{}'::jsonb)
+    )
+    FROM grouped t
+    WHERE t.grouping_set = 'total'
+$$;
+
+-- 3. Snapshot booth-local days from_day..through_day (from_day NULL = the
+--    day of the oldest interaction). Only missing days are computed unless
+--    refinalize is set. Returns the number of days written.
+CREATE OR REPLACE FUNCTION finalize_daily_summaries(
+    booth_tz TEXT,
+    from_day DATE,
+    through_day DATE,
+    refinalize BOOLEAN DEFAULT FALSE
+) RETURNS INTEGER AS $$
+DECLARE
+    finalized INTEGER;
+BEGIN
+    -- Wait for in-flight edits that invalidated a snapshot (the trigger below
+    -- holds ROW EXCLUSIVE on this table until they commit), and hold off new
+    -- ones until these snapshots are written, so none can miss an edit.
+    LOCK TABLE daily_summaries IN SHARE ROW EXCLUSIVE MODE;
+
+    -- Snapshots cut in another timezone have the wrong day boundaries
+    DELETE FROM daily_summaries WHERE timezone <> booth_tz;
+
+    IF from_day IS NULL THEN
+        SELECT (MIN(timestamp) AT TIME ZONE booth_tz)::date INTO from_day FROM interactions;
+    END IF;
+    IF from_day IS NULL OR from_day > through_day THEN
+        RETURN 0;
+    END IF;
+
+    IF refinalize THEN
+        DELETE FROM daily_summaries WHERE day BETWEEN from_day AND through_day;
+    END IF;
+
+    INSERT INTO daily_summaries (day, timezone, summary)
+    SELECT
+        d::date,
+        booth_tz,
+        interaction_summary(d AT TIME ZONE booth_tz, (d + INTERVAL '1 day') AT TIME ZONE booth_tz)
+    FROM generate_series(from_day::timestamp, through_day::timestamp, INTERVAL '1 day') AS d
+    WHERE NOT EXISTS (SELECT 1 FROM daily_summaries ds WHERE ds.day = d::date);
+
+    GET DIAGNOSTICS finalized = ROW_COUNT;
+    RETURN finalized;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 4. Drop snapshots an edit could have changed. The trigger does not know the
+--    booth timezone, so it clears the UTC day of the row plus one day either
+--    side (covers every UTC offset). Rows newer than the editable window
+--    (MAX_BACKDATE_DAYS in api/main.py) can never be in a snapshot, so normal
+--    booth logging never touches daily_summaries; neither do deleted rows,
+--    which no snapshot counts, or notes-only edits.
+CREATE OR REPLACE FUNCTION invalidate_daily_summaries()
+RETURNS TRIGGER AS $$
+DECLARE
+    horizon TIMESTAMPTZ := NOW() - INTERVAL '30 days';
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.timestamp, OLD.deleted_at IS NULL, OLD.engaged, OLD.persona, OLD.hook,
+        OLD.sale_type, OLD.quantity, OLD.unit_price, OLD.total_amount,
+        OLD.lead_type, OLD.objection, OLD.seller_id)
+       IS NOT DISTINCT FROM
+       (NEW.timestamp, NEW.deleted_at IS NULL, NEW.engaged, NEW.persona, NEW.hook,
+        NEW.sale_type, NEW.quantity, NEW.unit_price, NEW.total_amount,
+        NEW.lead_type, NEW.objection, NEW.seller_id) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL AND OLD.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (OLD.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (OLD.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'INSERT') AND NEW.deleted_at IS NULL AND NEW.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (NEW.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (NEW.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS interactions_invalidate_daily_summaries ON interactions;
+CREATE TRIGGER interactions_invalidate_daily_summaries
+    AFTER INSERT OR UPDATE OR DELETE ON interactions
+    FOR EACH ROW
+    EXECUTE FUNCTION invalidate_daily_summaries();
@@ -0,0 +1,16 @@
+-- Rollback: Remove closed-day snapshots
+-- Run this to undo migrations/009_daily_summaries.sql
+-- (the API needs interaction_summary(); roll the API back first)
+
+DROP TRIGGER IF EXISTS interactions_invalidate_daily_summaries ON interactions;
+
+DROP FUNCTION IF EXISTS invalidate_daily_summaries();
+DROP FUNCTION IF EXISTS finalize_daily_summaries(TEXT, DATE, DATE, BOOLEAN);
+DROP FUNCTION IF EXISTS interaction_summary(TIMESTAMPTZ, TIMESTAMPTZ);
+
+DROP TABLE IF EXISTS daily_summaries;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. daily_summaries and its functions removed.';
+END $$;
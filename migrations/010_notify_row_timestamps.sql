@@ -0,0 +1,28 @@
+-- ============================================================
+-- ROW TIMESTAMPS IN data_change NOTIFICATIONS
+-- File: migrations/010_notify_row_timestamps.sql
+-- ============================================================
+--
+-- The API caches closed time-series buckets (GET /api/analytics/timeseries).
+-- A change can only affect the buckets its row's timestamp falls in, so the
+-- interaction notification now carries the row's old and new timestamp as
+-- ts_min/ts_max and the API drops just those buckets instead of all of them.
+-- Existing keys (table, action, timestamp) are unchanged; the triggers from
+-- 005/008 keep calling the same function.
+--
+-- Rollback: 010_notify_row_timestamps_rollback.sql
+
+CREATE OR REPLACE FUNCTION notify_interaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- OLD is NULL on INSERT and NEW on DELETE; LEAST/GREATEST skip NULLs
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'interactions',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP,
+        'ts_min', LEAST(OLD.timestamp, NEW.timestamp),
+        'ts_max', GREATEST(OLD.timestamp, NEW.timestamp)
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,21 @@
+-- Rollback: Drop row timestamps from interaction notifications
+-- Run this to undo migrations/010_notify_row_timestamps.sql
+-- (the API falls back to clearing every cached bucket on each change)
+
+CREATE OR REPLACE FUNCTION notify_interaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Notify with the change type and table
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'interactions',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. Interaction notifications no longer carry ts_min/ts_max.';
+END $$;
@@ -0,0 +1,127 @@
+-- ============================================================
+-- CHANGE LOG FOR INCREMENTAL CLIENT SYNC
+-- File: migrations/011_change_log.sql
+-- ============================================================
+--
+-- Every insert, update and delete on interactions, events, sellers and
+-- staff appends (table, key, op) to change_log under a monotonically
+-- increasing seq. GET /api/changes?since=<seq> replays the log as upserts
+-- (with the row's current contents) and tombstones, so dashboards and
+-- tablets sync deltas instead of re-downloading pages.
+--
+-- seq must never become visible out of order, or a client that has read
+-- past a gap would skip the late row for good. The trigger therefore takes
+-- a transaction-level advisory lock before drawing seq, so log entries
+-- commit in seq order. Booth writes are single short statements; the lock is
+-- held from the trigger to commit.
+--
+-- compact_change_log() (run by the API's maintenance loop) drops entries
+-- superseded by a newer entry for the same row, and entries older than the
+-- retention period. change_log_horizon remembers the highest seq removed by
+-- retention: a client whose cursor is below it must do a full resync.
+--
+-- Rollback: 011_change_log_rollback.sql
+
+-- 1. The log
+CREATE TABLE IF NOT EXISTS change_log (
+    seq BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,       -- interactions, events, sellers, staff
+    row_key TEXT NOT NULL,          -- the row's primary key (interactions: id)
+    op CHAR(1) NOT NULL CHECK (op IN ('U', 'D')),  -- upsert / tombstone
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Compaction looks up newer entries for the same row
+CREATE INDEX IF NOT EXISTS idx_change_log_row
+ON change_log (table_name, row_key, seq);
+
+-- 2. Highest seq dropped by retention (single row)
+CREATE TABLE IF NOT EXISTS change_log_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    pruned_through BIGINT NOT NULL DEFAULT 0
+);
+
+INSERT INTO change_log_horizon (id, pruned_through) VALUES (TRUE, 0)
+ON CONFLICT (id) DO NOTHING;
+
+-- 3. Trigger: TG_ARGV[0] = table name as clients see it (TG_TABLE_NAME is
+--    the partition for interactions), TG_ARGV[1] = key column
+CREATE OR REPLACE FUNCTION record_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_key TEXT;
+    old_key TEXT;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_key := to_jsonb(OLD) ->> TG_ARGV[1];
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_key := to_jsonb(NEW) ->> TG_ARGV[1];
+    END IF;
+
+    -- Serialize log writers until commit so seq order = commit order
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    -- A delete, or an update that changed the key, leaves a tombstone
+    IF old_key IS NOT NULL AND old_key IS DISTINCT FROM new_key THEN
+        INSERT INTO change_log (table_name, row_key, op) VALUES (TG_ARGV[0], old_key, 'D');
+    END IF;
+    IF new_key IS NOT NULL THEN
+        INSERT INTO change_log (table_name, row_key, op) VALUES (TG_ARGV[0], new_key, 'U');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS interactions_change_log ON interactions;
+CREATE TRIGGER interactions_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON interactions
+    FOR EACH ROW EXECUTE FUNCTION record_change('interactions', 'id');
+
+DROP TRIGGER IF EXISTS events_change_log ON events;
+CREATE TRIGGER events_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON events
+    FOR EACH ROW EXECUTE FUNCTION record_change('events', 'id');
+
+DROP TRIGGER IF EXISTS sellers_change_log ON sellers;
+CREATE TRIGGER sellers_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON sellers
+    FOR EACH ROW EXECUTE FUNCTION record_change('sellers', 'id');
+
+DROP TRIGGER IF EXISTS staff_change_log ON staff;
+CREATE TRIGGER staff_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON staff
+    FOR EACH ROW EXECUTE FUNCTION record_change('staff', 'device_name');
+
+-- 4. Compaction and retention. Returns the number of entries removed.
+CREATE OR REPLACE FUNCTION compact_change_log(retention INTERVAL)
+RETURNS INTEGER AS $$
+DECLARE
+    superseded INTEGER;
+    expired INTEGER;
+    expired_through BIGINT;
+BEGIN
+    -- Only the newest entry per row matters: an upsert is served with the
+    -- row's current contents, and a tombstone ends the row
+    DELETE FROM change_log c
+    WHERE EXISTS (
+        SELECT 1 FROM change_log n
+        WHERE n.table_name = c.table_name AND n.row_key = c.row_key AND n.seq > c.seq
+    );
+    GET DIAGNOSTICS superseded = ROW_COUNT;
+
+    WITH pruned AS (
+        DELETE FROM change_log
+        WHERE changed_at < NOW() - retention
+        RETURNING seq
+    )
+    SELECT COUNT(*), MAX(seq) INTO expired, expired_through FROM pruned;
+
+    IF expired_through IS NOT NULL THEN
+        UPDATE change_log_horizon
+        SET pruned_through = GREATEST(pruned_through, expired_through);
+    END IF;
+
+    RETURN superseded + expired;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,19 @@
+-- Rollback: Remove the change log
+-- Run this to undo migrations/011_change_log.sql
+-- (GET /api/changes needs change_log; roll the API back first)
+
+DROP TRIGGER IF EXISTS interactions_change_log ON interactions;
+DROP TRIGGER IF EXISTS events_change_log ON events;
+DROP TRIGGER IF EXISTS sellers_change_log ON sellers;
+DROP TRIGGER IF EXISTS staff_change_log ON staff;
+
+DROP FUNCTION IF EXISTS record_change();
+DROP FUNCTION IF EXISTS compact_change_log(INTERVAL);
+
+DROP TABLE IF EXISTS change_log_horizon;
+DROP TABLE IF EXISTS change_log;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. change_log and its triggers removed.';
+END $$;
@@ -0,0 +1,30 @@
+-- ============================================================
+-- IDEMPOTENT CREATES
+-- File: migrations/012_idempotency_keys.sql
+-- ============================================================
+--
+-- Flaky venue Wi-Fi makes clients retry POST /api/interactions and
+-- POST /api/events. A retry carries the same client-generated key (client_id
+-- in the body, or an Idempotency-Key header). The API claims the key and
+-- inserts the row in one statement; when the key is already taken nothing
+-- is inserted and the original response stored with the key is returned,
+-- so a retry costs one primary key probe. interactions cannot enforce this
+-- itself: its primary key is (id, timestamp) since migration 008, and a
+-- retry has a new timestamp.
+--
+-- Keys are only needed while a client may still retry; the API deletes
+-- keys older than IDEMPOTENCY_KEY_RETENTION_HOURS.
+--
+-- Rollback: 012_idempotency_keys_rollback.sql
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,            -- interactions, events
+    key TEXT NOT NULL,              -- client_id or Idempotency-Key header
+    response JSONB NOT NULL,        -- what the create returned (includes the row id)
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (scope, key)
+);
+
+-- Expiry sweep
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at
+ON idempotency_keys (created_at);
@@ -0,0 +1,10 @@
+-- Rollback: Remove idempotency keys
+-- Run this to undo migrations/012_idempotency_keys.sql
+-- (client_id / Idempotency-Key need this table; roll the API back first)
+
+DROP TABLE IF EXISTS idempotency_keys;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. idempotency_keys removed.';
+END $$;
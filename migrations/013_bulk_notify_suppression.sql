@@ -0,0 +1,33 @@
+-- ============================================================
+-- ONE NOTIFICATION PER BULK EDIT
+-- File: migrations/013_bulk_notify_suppression.sql
+-- ============================================================
+--
+-- PATCH /api/interactions/bulk can touch thousands of rows in one statement.
+-- The row trigger would send one data_change notification per row, and every
+-- dashboard would refetch once per notification. The bulk endpoint sets the
+-- transaction-local setting insights.suppress_row_notify to 'on' and sends a
+-- single BULK notification itself (same keys plus count, ts_min/ts_max
+-- spanning every old and new row timestamp). All other writes are unchanged.
+--
+-- Rollback: 013_bulk_notify_suppression_rollback.sql
+
+CREATE OR REPLACE FUNCTION notify_interaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Bulk edits notify once for the whole statement (missing_ok: unset = '')
+    IF current_setting('insights.suppress_row_notify', true) = 'on' THEN
+        RETURN COALESCE(NEW, OLD);
+    END IF;
+
+    -- OLD is NULL on INSERT and NEW on DELETE; LEAST/GREATEST skip NULLs
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'interactions',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP,
+        'ts_min', LEAST(OLD.timestamp, NEW.timestamp),
+        'ts_max', GREATEST(OLD.timestamp, NEW.timestamp)
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
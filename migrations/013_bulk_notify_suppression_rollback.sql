@@ -0,0 +1,23 @@
+-- Rollback: Remove row notification suppression for bulk edits
+-- Run this to undo migrations/013_bulk_notify_suppression.sql
+-- (bulk edits then notify once per row as well as once for the batch)
+
+CREATE OR REPLACE FUNCTION notify_interaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- OLD is NULL on INSERT and NEW on DELETE; LEAST/GREATEST skip NULLs
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'interactions',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP,
+        'ts_min', LEAST(OLD.timestamp, NEW.timestamp),
+        'ts_max', GREATEST(OLD.timestamp, NEW.timestamp)
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. Bulk edits no longer suppress row notifications.';
+END $$;
@@ -0,0 +1,57 @@
+-- ============================================================
+-- FULL-TEXT AND FUZZY SEARCH OVER INTERACTION NOTES
+-- File: migrations/014_notes_search.sql
+-- ============================================================
+--
+-- Browsing could only filter on has_notes. GET /api/interactions/search
+-- (ranked, highlighted, keyset-paginated) and the q= filter on
+-- GET /api/interactions/browse and PATCH /api/interactions/bulk match notes
+-- through two indexes:
+--
+--   * GIN over notes_tsv(notes): English full-text search ("asks" finds
+--     "asked about the garden kit"). An expression index rather than a
+--     stored tsvector column: the browse/detail endpoints return i.*, and
+--     adding a stored column would rewrite every partition.
+--   * GIN trigram index over notes (pg_trgm) for typo-tolerant matching
+--     ("gardn kit"). pg_trgm ships with the official postgres images; where
+--     the extension is not installed the index is skipped and the API
+--     (which checks pg_extension at startup) searches full-text only.
+--
+-- Both are partial on notes IS NOT NULL, so walk-bys without notes cost no
+-- index space. Indexes on the partitioned table cascade to every monthly
+-- partition (and to partitions created later). CREATE INDEX on a partitioned
+-- table cannot run CONCURRENTLY: run this outside booth hours.
+--
+-- Rollback: 014_notes_search_rollback.sql
+
+-- 1. The indexed document. Queries must use this same function so the
+--    planner can match the index.
+CREATE OR REPLACE FUNCTION notes_tsv(notes TEXT)
+RETURNS tsvector
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT to_tsvector('english'::regconfig, COALESCE(notes, ''))
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_interactions_notes_tsv
+ON interactions USING GIN (notes_tsv(notes))
+WHERE notes IS NOT NULL;
+
+-- 2. Optional trigram index
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'pg_trgm is not available (%); notes search will be full-text only.', SQLERRM;
+END $$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_interactions_notes_trgm
+        ON interactions USING GIN (notes gin_trgm_ops)
+        WHERE notes IS NOT NULL;
+    END IF;
+END $$;
+
+ANALYZE interactions;
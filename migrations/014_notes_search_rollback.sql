@@ -0,0 +1,14 @@
+-- Rollback: Remove notes search indexes
+-- Run this to undo migrations/014_notes_search.sql
+-- (roll the API back first: search and q= call notes_tsv(); the pg_trgm
+-- extension is left installed in case anything else uses it)
+
+DROP INDEX IF EXISTS idx_interactions_notes_trgm;
+DROP INDEX IF EXISTS idx_interactions_notes_tsv;
+
+DROP FUNCTION IF EXISTS notes_tsv(TEXT);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. Notes search indexes removed.';
+END $$;
@@ -0,0 +1,130 @@
+-- ============================================================
+-- TRASH RETENTION: ARCHIVE LONG-DELETED INTERACTIONS
+-- File: migrations/015_interactions_archive.sql
+-- ============================================================
+--
+-- Soft-deleted rows stayed in interactions forever: every partial index on
+-- deleted_at IS NULL still has to skip them in the heap, the trash index and
+-- the trash COUNT(*) grow without bound, and autovacuum keeps visiting them.
+-- The API now moves rows deleted more than TRASH_RETENTION_DAYS ago into
+-- interactions_archive in small batches (archive_deleted_interactions), so
+-- the trash in the hot table stays bounded and its count stays an index-only
+-- scan over a small partial index (idx_interactions_trash, migration 007).
+--
+-- POST /api/interactions/{id}/restore still works for archived rows: it
+-- moves the row back (restore_archived_interaction) and un-deletes it.
+-- GET /api/interactions/trash?archived=true lists the archive.
+--
+-- Rollback: 015_interactions_archive_rollback.sql (moves archived rows back)
+
+-- 1. Same columns as interactions, plus when the row was archived. A plain
+--    table: it is append-mostly and only read by id or by deleted_at.
+CREATE TABLE IF NOT EXISTS interactions_archive (
+    id UUID PRIMARY KEY,
+    timestamp TIMESTAMPTZ NOT NULL,
+    staff_device VARCHAR(100) NOT NULL,
+    interaction_type VARCHAR(20) NOT NULL,
+    persona VARCHAR(20),
+    hook VARCHAR(20),
+    sale_type VARCHAR(20),
+    quantity INTEGER,
+    unit_price INTEGER,
+    total_amount INTEGER,
+    lead_type VARCHAR(20),
+    objection VARCHAR(50),
+    engaged BOOLEAN,
+    deleted_at TIMESTAMPTZ NOT NULL,
+    notes TEXT,
+    updated_at TIMESTAMPTZ,
+    seller_id VARCHAR(50),
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Archive listing, newest deletions first
+CREATE INDEX IF NOT EXISTS idx_interactions_archive_deleted_at
+ON interactions_archive (deleted_at DESC);
+
+-- 2. Move up to batch_size rows deleted more than older_than ago, oldest
+--    deletion first. SKIP LOCKED: rows being restored or edited right now
+--    are left for the next batch. Sends one data_change notification for
+--    the batch. Returns the number of rows moved.
+CREATE OR REPLACE FUNCTION archive_deleted_interactions(older_than INTERVAL, batch_size INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+    first_ts TIMESTAMPTZ;
+    last_ts TIMESTAMPTZ;
+BEGIN
+    -- Rows leaving the table notify once below, not once each (migration 013)
+    PERFORM set_config('insights.suppress_row_notify', 'on', true);
+
+    WITH batch AS (
+        SELECT id, timestamp FROM interactions
+        WHERE deleted_at < NOW() - older_than
+        ORDER BY deleted_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM interactions i
+        USING batch b
+        WHERE i.id = b.id AND i.timestamp = b.timestamp
+        RETURNING i.*
+    ), archived AS (
+        INSERT INTO interactions_archive (
+            id, timestamp, staff_device, interaction_type, persona, hook,
+            sale_type, quantity, unit_price, total_amount, lead_type, objection,
+            engaged, deleted_at, notes, updated_at, seller_id
+        )
+        SELECT
+            id, timestamp, staff_device, interaction_type, persona, hook,
+            sale_type, quantity, unit_price, total_amount, lead_type, objection,
+            engaged, deleted_at, notes, updated_at, seller_id
+        FROM removed
+        RETURNING timestamp
+    )
+    SELECT COUNT(*), MIN(timestamp), MAX(timestamp) INTO moved, first_ts, last_ts
+    FROM archived;
+
+    PERFORM set_config('insights.suppress_row_notify', 'off', true);
+
+    IF moved > 0 THEN
+        PERFORM pg_notify('data_change', json_build_object(
+            'table', 'interactions',
+            'action', 'ARCHIVE',
+            'timestamp', CURRENT_TIMESTAMP,
+            'ts_min', first_ts,
+            'ts_max', last_ts,
+            'count', moved
+        )::text);
+    END IF;
+
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Move one archived row back into interactions, un-deleted. The insert
+--    fires the usual triggers (notification, change log, daily summaries).
+--    Returns FALSE if the id is not archived.
+CREATE OR REPLACE FUNCTION restore_archived_interaction(target UUID)
+RETURNS BOOLEAN AS $$
+DECLARE
+    restored INTEGER;
+BEGIN
+    WITH removed AS (
+        DELETE FROM interactions_archive WHERE id = target RETURNING *
+    )
+    INSERT INTO interactions (
+        id, timestamp, staff_device, interaction_type, persona, hook,
+        sale_type, quantity, unit_price, total_amount, lead_type, objection,
+        engaged, deleted_at, notes, updated_at, seller_id
+    )
+    SELECT
+        id, timestamp, staff_device, interaction_type, persona, hook,
+        sale_type, quantity, unit_price, total_amount, lead_type, objection,
+        engaged, NULL, notes, NOW(), seller_id
+    FROM removed;
+
+    GET DIAGNOSTICS restored = ROW_COUNT;
+    RETURN restored > 0;
+END;
+$$ LANGUAGE plpgsql;
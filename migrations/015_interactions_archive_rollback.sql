@@ -0,0 +1,25 @@
+-- Rollback: Remove trash archival
+-- Run this to undo migrations/015_interactions_archive.sql
+-- (roll the API back first; archived rows go back into interactions,
+-- still soft-deleted)
+
+INSERT INTO interactions (
+    id, timestamp, staff_device, interaction_type, persona, hook,
+    sale_type, quantity, unit_price, total_amount, lead_type, objection,
+    engaged, deleted_at, notes, updated_at, seller_id
+)
+SELECT
+    id, timestamp, staff_device, interaction_type, persona, hook,
+    sale_type, quantity, unit_price, total_amount, lead_type, objection,
+    engaged, deleted_at, notes, updated_at, seller_id
+FROM interactions_archive;
+
+DROP FUNCTION IF EXISTS restore_archived_interaction(UUID);
+DROP FUNCTION IF EXISTS archive_deleted_interactions(INTERVAL, INTEGER);
+
+DROP TABLE IF EXISTS interactions_archive;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. Archived interactions moved back to interactions (still deleted).';
+END $$;
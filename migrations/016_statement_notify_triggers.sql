@@ -0,0 +1,149 @@
+-- ============================================================
+-- ONE data_change NOTIFICATION PER STATEMENT
+-- File: migrations/016_statement_notify_triggers.sql
+-- ============================================================
+--
+-- interaction_notify_trigger and event_notify_trigger fired FOR EACH ROW, so
+-- a backfill, bulk cleanup or large DELETE queued one pg_notify per row:
+-- the notification queue filled up and every SSE client refetched once per
+-- row. They are replaced by statement-level triggers that read the
+-- statement's transition tables and send a single notification.
+--
+-- The data_change contract is unchanged for existing consumers (sse_stream,
+-- the web app, the API's caches): table, action (INSERT/UPDATE/DELETE),
+-- timestamp, and ts_min/ts_max spanning every old and new row timestamp.
+-- New keys: count (rows affected) and ids (the affected ids, only when
+-- there are at most 100 so the payload stays far below pg_notify's 8000-byte
+-- limit). Statements that affect no rows send nothing.
+--
+-- This supersedes the per-transaction suppression from migration 013: the
+-- bulk edit endpoint and trash archival no longer need to silence the row
+-- trigger and notify by hand.
+--
+-- Rollback: 016_statement_notify_triggers_rollback.sql
+
+-- 1. Shared by interactions and events (both have id and timestamp). The
+--    transition tables are old_rows (UPDATE, DELETE) and new_rows (INSERT,
+--    UPDATE); PL/pgSQL only resolves the one the branch taken uses.
+CREATE OR REPLACE FUNCTION notify_statement_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    max_ids CONSTANT INTEGER := 100;
+    changed INTEGER;
+    first_ts TIMESTAMPTZ;
+    last_ts TIMESTAMPTZ;
+    changed_ids JSON;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*), MIN(timestamp), MAX(timestamp) INTO changed, first_ts, last_ts FROM old_rows;
+        IF changed BETWEEN 1 AND max_ids THEN
+            SELECT json_agg(id) INTO changed_ids FROM old_rows;
+        END IF;
+    ELSE
+        SELECT COUNT(*), MIN(timestamp), MAX(timestamp) INTO changed, first_ts, last_ts FROM new_rows;
+        IF changed BETWEEN 1 AND max_ids THEN
+            SELECT json_agg(id) INTO changed_ids FROM new_rows;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            -- An edit can move a row in time: cover where it was too
+            SELECT LEAST(first_ts, MIN(timestamp)), GREATEST(last_ts, MAX(timestamp))
+            INTO first_ts, last_ts FROM old_rows;
+        END IF;
+    END IF;
+
+    IF changed = 0 THEN
+        RETURN NULL;
+    END IF;
+
+    PERFORM pg_notify('data_change', json_strip_nulls(json_build_object(
+        'table', TG_TABLE_NAME,
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP,
+        'ts_min', first_ts,
+        'ts_max', last_ts,
+        'count', changed,
+        'ids', changed_ids
+    ))::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 2. Replace the row triggers. Transition tables need one trigger per event.
+--    On the partitioned interactions table these statement triggers stay on
+--    the parent and see the rows of every partition the statement touched.
+DROP TRIGGER IF EXISTS interaction_notify_trigger ON interactions;
+DROP TRIGGER IF EXISTS event_notify_trigger ON events;
+
+DROP TRIGGER IF EXISTS interaction_notify_insert ON interactions;
+CREATE TRIGGER interaction_notify_insert
+AFTER INSERT ON interactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP TRIGGER IF EXISTS interaction_notify_update ON interactions;
+CREATE TRIGGER interaction_notify_update
+AFTER UPDATE ON interactions
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP TRIGGER IF EXISTS interaction_notify_delete ON interactions;
+CREATE TRIGGER interaction_notify_delete
+AFTER DELETE ON interactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP TRIGGER IF EXISTS event_notify_insert ON events;
+CREATE TRIGGER event_notify_insert
+AFTER INSERT ON events
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP TRIGGER IF EXISTS event_notify_update ON events;
+CREATE TRIGGER event_notify_update
+AFTER UPDATE ON events
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP TRIGGER IF EXISTS event_notify_delete ON events;
+CREATE TRIGGER event_notify_delete
+AFTER DELETE ON events
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION notify_statement_change();
+
+DROP FUNCTION IF EXISTS notify_interaction_change();
+DROP FUNCTION IF EXISTS notify_event_change();
+
+-- 3. Trash archival (migration 015) no longer silences the row trigger or
+--    notifies by hand: its DELETE now notifies once per batch by itself.
+CREATE OR REPLACE FUNCTION archive_deleted_interactions(older_than INTERVAL, batch_size INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    WITH batch AS (
+        SELECT id, timestamp FROM interactions
+        WHERE deleted_at < NOW() - older_than
+        ORDER BY deleted_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM interactions i
+        USING batch b
+        WHERE i.id = b.id AND i.timestamp = b.timestamp
+        RETURNING i.*
+    )
+    INSERT INTO interactions_archive (
+        id, timestamp, staff_device, interaction_type, persona, hook,
+        sale_type, quantity, unit_price, total_amount, lead_type, objection,
+        engaged, deleted_at, notes, updated_at, seller_id
+    )
+    SELECT
+        id, timestamp, staff_device, interaction_type, persona, hook,
+        sale_type, quantity, unit_price, total_amount, lead_type, objection,
+        engaged, deleted_at, notes, updated_at, seller_id
+    FROM removed;
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,113 @@
+-- Rollback: Back to one data_change notification per row
+-- Run this to undo migrations/016_statement_notify_triggers.sql
+-- (restores the row triggers as of migration 013; bulk edits from an API at
+-- this version then notify once per row again)
+
+DROP TRIGGER IF EXISTS interaction_notify_insert ON interactions;
+DROP TRIGGER IF EXISTS interaction_notify_update ON interactions;
+DROP TRIGGER IF EXISTS interaction_notify_delete ON interactions;
+DROP TRIGGER IF EXISTS event_notify_insert ON events;
+DROP TRIGGER IF EXISTS event_notify_update ON events;
+DROP TRIGGER IF EXISTS event_notify_delete ON events;
+
+DROP FUNCTION IF EXISTS notify_statement_change();
+
+CREATE OR REPLACE FUNCTION notify_interaction_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Bulk edits notify once for the whole statement (missing_ok: unset = '')
+    IF current_setting('insights.suppress_row_notify', true) = 'on' THEN
+        RETURN COALESCE(NEW, OLD);
+    END IF;
+
+    -- OLD is NULL on INSERT and NEW on DELETE; LEAST/GREATEST skip NULLs
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'interactions',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP,
+        'ts_min', LEAST(OLD.timestamp, NEW.timestamp),
+        'ts_max', GREATEST(OLD.timestamp, NEW.timestamp)
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notify_event_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('data_change', json_build_object(
+        'table', 'events',
+        'action', TG_OP,
+        'timestamp', CURRENT_TIMESTAMP
+    )::text);
+    RETURN COALESCE(NEW, OLD);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER interaction_notify_trigger
+AFTER INSERT OR UPDATE OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION notify_interaction_change();
+
+CREATE TRIGGER event_notify_trigger
+AFTER INSERT OR UPDATE OR DELETE ON events
+FOR EACH ROW EXECUTE FUNCTION notify_event_change();
+
+-- Trash archival as of migration 015 (silences the row trigger, notifies once)
+CREATE OR REPLACE FUNCTION archive_deleted_interactions(older_than INTERVAL, batch_size INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+    first_ts TIMESTAMPTZ;
+    last_ts TIMESTAMPTZ;
+BEGIN
+    -- Rows leaving the table notify once below, not once each (migration 013)
+    PERFORM set_config('insights.suppress_row_notify', 'on', true);
+
+    WITH batch AS (
+        SELECT id, timestamp FROM interactions
+        WHERE deleted_at < NOW() - older_than
+        ORDER BY deleted_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ), removed AS (
+        DELETE FROM interactions i
+        USING batch b
+        WHERE i.id = b.id AND i.timestamp = b.timestamp
+        RETURNING i.*
+    ), archived AS (
+        INSERT INTO interactions_archive (
+            id, timestamp, staff_device, interaction_type, persona, hook,
+            sale_type, quantity, unit_price, total_amount, lead_type, objection,
+            engaged, deleted_at, notes, updated_at, seller_id
+        )
+        SELECT
+            id, timestamp, staff_device, interaction_type, persona, hook,
+            sale_type, quantity, unit_price, total_amount, lead_type, objection,
+            engaged, deleted_at, notes, updated_at, seller_id
+        FROM removed
+        RETURNING timestamp
+    )
+    SELECT COUNT(*), MIN(timestamp), MAX(timestamp) INTO moved, first_ts, last_ts
+    FROM archived;
+
+    PERFORM set_config('insights.suppress_row_notify', 'off', true);
+
+    IF moved > 0 THEN
+        PERFORM pg_notify('data_change', json_build_object(
+            'table', 'interactions',
+            'action', 'ARCHIVE',
+            'timestamp', CURRENT_TIMESTAMP,
+            'ts_min', first_ts,
+            'ts_max', last_ts,
+            'count', moved
+        )::text);
+    END IF;
+
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. data_change is sent once per row again.';
+END $$;
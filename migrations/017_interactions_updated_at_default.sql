@@ -0,0 +1,28 @@
+-- ============================================================
+-- SNAPSHOT EXPORT: STAMP updated_at ON INSERT
+-- File: migrations/017_interactions_updated_at_default.sql
+-- ============================================================
+--
+-- GET /api/export/snapshot?since=... (and scripts/export_snapshot.py) pulls
+-- only the interactions whose updated_at is later than the previous pull.
+-- updated_at was NULL until a row was first edited (002's BEFORE UPDATE
+-- trigger), so a new tap - and a backdated or replayed one, whose timestamp
+-- is older than the previous pull - never showed up in an incremental pull.
+-- New rows now get updated_at = NOW() when they are inserted, and an index
+-- serves the "updated_at > $1" scan.
+--
+-- Rows inserted before this migration keep updated_at NULL; the first full
+-- snapshot (no since) exports them.
+--
+-- The index is built with a plain CREATE INDEX (CONCURRENTLY is not
+-- supported on a partitioned table), which blocks writes while it builds:
+-- run this between booth days.
+--
+-- Rollback: 017_interactions_updated_at_default_rollback.sql
+
+-- 1. Inserts are stamped; edits keep being stamped by the trigger from 002
+ALTER TABLE interactions ALTER COLUMN updated_at SET DEFAULT NOW();
+
+-- 2. Incremental snapshot scan
+CREATE INDEX IF NOT EXISTS idx_interactions_updated_at ON interactions (updated_at);
+
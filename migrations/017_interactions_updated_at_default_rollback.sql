@@ -0,0 +1,13 @@
+-- Rollback: Stop stamping updated_at on insert
+-- Run this to undo migrations/017_interactions_updated_at_default.sql
+-- (rows inserted meanwhile keep their updated_at; incremental snapshots
+-- miss new rows again after this)
+
+DROP INDEX IF EXISTS idx_interactions_updated_at;
+
+ALTER TABLE interactions ALTER COLUMN updated_at DROP DEFAULT;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. updated_at is NULL on insert again.';
+END $$;
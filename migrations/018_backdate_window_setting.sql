@@ -0,0 +1,57 @@
+-- ============================================================
+-- CLOSED-DAY SNAPSHOTS: SHARE THE EDITABLE WINDOW WITH THE API
+-- File: migrations/018_backdate_window_setting.sql
+-- ============================================================
+--
+-- 009's trigger hard-coded the editable window (NOW() - 30 days) that
+-- MAX_BACKDATE_DAYS sets in the API. Changing one without the other would
+-- let edits to days the API still treats as open skip invalidation, or
+-- clear snapshots of days that cannot change. The window now lives in
+-- app_settings: the API writes max_backdate_days on startup and the
+-- trigger reads it on every edit to an old row.
+--
+-- Rollback: 018_backdate_window_setting_rollback.sql
+
+-- 1. Settings both the API and the triggers read
+CREATE TABLE IF NOT EXISTS app_settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+INSERT INTO app_settings (name, value) VALUES ('max_backdate_days', '30')
+ON CONFLICT (name) DO NOTHING;
+
+-- 2. 009's trigger function, with the horizon from app_settings
+CREATE OR REPLACE FUNCTION invalidate_daily_summaries()
+RETURNS TRIGGER AS $$
+DECLARE
+    horizon TIMESTAMPTZ := NOW() - make_interval(days => COALESCE(
+        (SELECT value::int FROM app_settings WHERE name = 'max_backdate_days'), 30
+    ));
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.timestamp, OLD.deleted_at IS NULL, OLD.engaged, OLD.persona, OLD.hook,
+        OLD.sale_type, OLD.quantity, OLD.unit_price, OLD.total_amount,
+        OLD.lead_type, OLD.objection, OLD.seller_id)
+       IS NOT DISTINCT FROM
+       (NEW.timestamp, NEW.deleted_at IS NULL, NEW.engaged, NEW.persona, NEW.hook,
+        NEW.sale_type, NEW.quantity, NEW.unit_price, NEW.total_amount,
+        NEW.lead_type, NEW.objection, NEW.seller_id) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL AND OLD.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (OLD.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (OLD.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'INSERT') AND NEW.deleted_at IS NULL AND NEW.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (NEW.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (NEW.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,42 @@
+-- Rollback: Hard-code the editable window in the snapshot trigger again
+-- Run this to undo migrations/018_backdate_window_setting.sql
+-- (roll the API back first: it writes app_settings on startup)
+
+CREATE OR REPLACE FUNCTION invalidate_daily_summaries()
+RETURNS TRIGGER AS $$
+DECLARE
+    horizon TIMESTAMPTZ := NOW() - INTERVAL '30 days';
+BEGIN
+    IF TG_OP = 'UPDATE' AND
+       (OLD.timestamp, OLD.deleted_at IS NULL, OLD.engaged, OLD.persona, OLD.hook,
+        OLD.sale_type, OLD.quantity, OLD.unit_price, OLD.total_amount,
+        OLD.lead_type, OLD.objection, OLD.seller_id)
+       IS NOT DISTINCT FROM
+       (NEW.timestamp, NEW.deleted_at IS NULL, NEW.engaged, NEW.persona, NEW.hook,
+        NEW.sale_type, NEW.quantity, NEW.unit_price, NEW.total_amount,
+        NEW.lead_type, NEW.objection, NEW.seller_id) THEN
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.deleted_at IS NULL AND OLD.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (OLD.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (OLD.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    IF TG_OP IN ('UPDATE', 'INSERT') AND NEW.deleted_at IS NULL AND NEW.timestamp < horizon THEN
+        DELETE FROM daily_summaries
+        WHERE day BETWEEN (NEW.timestamp AT TIME ZONE 'UTC')::date - 1
+                      AND (NEW.timestamp AT TIME ZONE 'UTC')::date + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TABLE IF EXISTS app_settings;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. The trigger uses a fixed 30-day window again.';
+END $$;
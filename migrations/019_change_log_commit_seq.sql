@@ -0,0 +1,87 @@
+-- ============================================================
+-- SEQUENCE THE CHANGE LOG AT COMMIT, NOT PER ROW
+-- File: migrations/019_change_log_commit_seq.sql
+-- ============================================================
+--
+-- 011 drew seq in the row trigger under a transaction-level advisory lock,
+-- so the lock was held from a transaction's first logged write until its
+-- commit: one long transaction (a bulk edit, a restore, a statement run by
+-- hand in psql) stalled every booth tap behind it.
+--
+-- Now the row trigger appends the entry without locking, under a negative
+-- provisional seq from its own sequence (more negative = written later). A
+-- deferred constraint trigger on change_log runs at commit and, under the
+-- same advisory lock, renumbers all of the transaction's pending entries
+-- from the real sequence in one UPDATE. The lock is held only from that
+-- UPDATE to the end of the commit, so seq order is still commit order and a
+-- client cursor never passes an entry that becomes visible later.
+--
+-- Pending entries are invisible to other sessions and every committed entry
+-- has a positive seq, so GET /api/changes and the column store's catch-up
+-- ("seq > $1", MAX(seq)) are unchanged.
+--
+-- Rollback: 019_change_log_commit_seq_rollback.sql
+
+-- 1. Provisional numbers for entries not yet committed
+CREATE SEQUENCE IF NOT EXISTS change_log_pending_seq;
+
+-- 2. Row trigger: append without locking and flag the transaction as having
+--    pending entries (transaction-local setting)
+CREATE OR REPLACE FUNCTION record_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_key TEXT;
+    old_key TEXT;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_key := to_jsonb(OLD) ->> TG_ARGV[1];
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_key := to_jsonb(NEW) ->> TG_ARGV[1];
+    END IF;
+
+    -- A delete, or an update that changed the key, leaves a tombstone
+    IF old_key IS NOT NULL AND old_key IS DISTINCT FROM new_key THEN
+        INSERT INTO change_log (seq, table_name, row_key, op)
+        VALUES (-nextval('change_log_pending_seq'), TG_ARGV[0], old_key, 'D');
+    END IF;
+    IF new_key IS NOT NULL THEN
+        INSERT INTO change_log (seq, table_name, row_key, op)
+        VALUES (-nextval('change_log_pending_seq'), TG_ARGV[0], new_key, 'U');
+    END IF;
+    PERFORM set_config('change_log.pending', 'on', TRUE);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 3. Commit-time numbering. Fires once per pending entry; the first call
+--    numbers them all and clears the flag, the rest return immediately.
+CREATE OR REPLACE FUNCTION sequence_change_log()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('change_log.pending', TRUE) IS DISTINCT FROM 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    -- Serialize numbering until commit so seq order = commit order
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    -- Other transactions' pending entries are not visible here
+    UPDATE change_log c
+    SET seq = p.seq
+    FROM (
+        SELECT seq AS pending, nextval('change_log_seq_seq') AS seq
+        FROM (SELECT seq FROM change_log WHERE seq < 0 ORDER BY seq DESC) o
+    ) p
+    WHERE c.seq = p.pending;
+
+    PERFORM set_config('change_log.pending', 'off', TRUE);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS change_log_sequence ON change_log;
+CREATE CONSTRAINT TRIGGER change_log_sequence
+    AFTER INSERT ON change_log
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION sequence_change_log();
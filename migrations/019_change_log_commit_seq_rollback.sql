@@ -0,0 +1,40 @@
+-- Rollback: Draw change_log seq in the row trigger again
+-- Run this to undo migrations/019_change_log_commit_seq.sql
+
+DROP TRIGGER IF EXISTS change_log_sequence ON change_log;
+DROP FUNCTION IF EXISTS sequence_change_log();
+
+-- Back to 011's trigger: lock from the first logged write to commit
+CREATE OR REPLACE FUNCTION record_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    new_key TEXT;
+    old_key TEXT;
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        old_key := to_jsonb(OLD) ->> TG_ARGV[1];
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        new_key := to_jsonb(NEW) ->> TG_ARGV[1];
+    END IF;
+
+    -- Serialize log writers until commit so seq order = commit order
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    -- A delete, or an update that changed the key, leaves a tombstone
+    IF old_key IS NOT NULL AND old_key IS DISTINCT FROM new_key THEN
+        INSERT INTO change_log (table_name, row_key, op) VALUES (TG_ARGV[0], old_key, 'D');
+    END IF;
+    IF new_key IS NOT NULL THEN
+        INSERT INTO change_log (table_name, row_key, op) VALUES (TG_ARGV[0], new_key, 'U');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP SEQUENCE IF EXISTS change_log_pending_seq;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. change_log seq drawn per row again.';
+END $$;
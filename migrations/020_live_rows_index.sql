@@ -0,0 +1,27 @@
+-- ============================================================
+-- BROWSE COUNT: INDEX THE LIVE ROWS
+-- File: migrations/020_live_rows_index.sql
+-- ============================================================
+--
+-- 007 dropped idx_interactions_deleted_at as superseded by the live and
+-- trash indexes, but the unfiltered transaction browser count
+-- ("SELECT COUNT(*) FROM interactions WHERE deleted_at IS NULL", no date
+-- range) used it for an index-only scan. Without it the count falls back
+-- to a sequential scan of every partition and GET /api/interactions/browse
+-- got slower (21 ms -> 36-41 ms p50 in scripts/bench.py).
+--
+-- This brings it back as a partial index over live rows only: every key is
+-- NULL, so btree deduplication keeps it small, and deleted rows (already
+-- covered by idx_interactions_trash) are left out.
+--
+-- The index is built with a plain CREATE INDEX (CONCURRENTLY is not
+-- supported on a partitioned table), which blocks writes while it builds:
+-- run this between booth days.
+--
+-- Rollback: 020_live_rows_index_rollback.sql
+
+CREATE INDEX IF NOT EXISTS idx_interactions_live_rows
+ON interactions (deleted_at)
+WHERE deleted_at IS NULL;
+
+ANALYZE interactions;
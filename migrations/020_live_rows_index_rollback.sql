@@ -0,0 +1,10 @@
+-- Rollback: Drop the live rows index
+-- Run this to undo migrations/020_live_rows_index.sql
+-- (the unfiltered browse count goes back to a sequential scan)
+
+DROP INDEX IF EXISTS idx_interactions_live_rows;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. idx_interactions_live_rows dropped.';
+END $$;
@@ -0,0 +1,39 @@
+-- ============================================================
+-- CHANGE LOG: NUMBER PENDING ENTRIES WITHOUT SCANNING THE LOG
+-- File: migrations/021_change_log_sequence_scan.sql
+-- ============================================================
+--
+-- sequence_change_log() (migration 019) runs at every commit that logged a
+-- change. Its UPDATE joined the pending entries to change_log on seq alone,
+-- so the planner hashed the pending entries and scanned the whole log to
+-- find them: commit time grew with the log (21 ms per booth tap at 107k
+-- entries on the bench database, where a tap used to take under 1 ms).
+-- The renumbered side is now restricted to seq < 0 as well, so both sides
+-- are small scans of change_log_pkey whatever the size of the log.
+--
+-- Rollback: 021_change_log_sequence_scan_rollback.sql
+
+CREATE OR REPLACE FUNCTION sequence_change_log()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('change_log.pending', TRUE) IS DISTINCT FROM 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    -- Serialize numbering until commit so seq order = commit order
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    -- Other transactions' pending entries are not visible here. Both sides
+    -- read only the negative range of change_log_pkey
+    UPDATE change_log c
+    SET seq = p.seq
+    FROM (
+        SELECT seq AS pending, nextval('change_log_seq_seq') AS seq
+        FROM (SELECT seq FROM change_log WHERE seq < 0 ORDER BY seq DESC) o
+    ) p
+    WHERE c.seq = p.pending AND c.seq < 0;
+
+    PERFORM set_config('change_log.pending', 'off', TRUE);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,32 @@
+-- Rollback: Renumber pending change_log entries with 019's join
+-- Run this to undo migrations/021_change_log_sequence_scan.sql
+-- (commit time grows with the log again)
+
+CREATE OR REPLACE FUNCTION sequence_change_log()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF current_setting('change_log.pending', TRUE) IS DISTINCT FROM 'on' THEN
+        RETURN NULL;
+    END IF;
+
+    -- Serialize numbering until commit so seq order = commit order
+    PERFORM pg_advisory_xact_lock(hashtext('change_log'));
+
+    -- Other transactions' pending entries are not visible here
+    UPDATE change_log c
+    SET seq = p.seq
+    FROM (
+        SELECT seq AS pending, nextval('change_log_seq_seq') AS seq
+        FROM (SELECT seq FROM change_log WHERE seq < 0 ORDER BY seq DESC) o
+    ) p
+    WHERE c.seq = p.pending;
+
+    PERFORM set_config('change_log.pending', 'off', TRUE);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. sequence_change_log() joins on seq alone again.';
+END $$;
@@ -0,0 +1,123 @@
+-- ============================================================
+-- ONE ROW PER INTERACTION ID, ACROSS PARTITIONS AND THE ARCHIVE
+-- File: migrations/022_interaction_id_registry.sql
+-- ============================================================
+--
+-- Since 008 the primary key of interactions is (id, timestamp): a
+-- partitioned table's unique constraints must include the partition key, so
+-- nothing stops two rows from sharing an id. Server-generated ids never
+-- clash, but a client_id becomes the row id (INTERACTION_CLAIM_INSERT_QUERY,
+-- the ingest journal), and the idempotency key that normally catches a
+-- resend is only kept IDEMPOTENCY_KEY_RETENTION_HOURS. A resend after that,
+-- or a client_id equal to an existing row's id, stored a second row: PATCH
+-- then edited both, and once both were deleted
+-- archive_deleted_interactions() failed on interactions_archive_pkey and
+-- the trash archive stalled.
+--
+-- interaction_ids holds every id in interactions (archived = FALSE) or
+-- interactions_archive (archived = TRUE), kept by statement-level triggers
+-- on both tables. Its primary key is the global uniqueness guarantee: an
+-- insert whose id already exists in either table fails with
+-- unique_violation, which the API answers with 409.
+--
+-- The key is DEFERRABLE INITIALLY DEFERRED because archiving and restoring
+-- move a row in one statement: for a moment the id is registered for both
+-- tables, and each trigger only removes the entry for its own table. The
+-- check therefore runs when the transaction commits (for the API's
+-- single-statement inserts, at the end of the statement).
+--
+-- Ids are never updated, and an UPDATE that moves a row to another
+-- partition fires neither the INSERT nor the DELETE statement trigger of
+-- interactions, so only inserts, deletes and TRUNCATE are tracked.
+--
+-- Run with psql between booth days: the backfill holds a lock that blocks
+-- writes to both tables until it commits.
+--
+-- Rollback: 022_interaction_id_registry_rollback.sql
+
+BEGIN;
+
+LOCK TABLE interactions, interactions_archive IN SHARE ROW EXCLUSIVE MODE;
+
+-- 0. Ids stored twice already have to be resolved by hand first.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT id FROM (
+            SELECT id FROM interactions
+            UNION ALL
+            SELECT id FROM interactions_archive
+        ) ids
+        GROUP BY id
+        HAVING COUNT(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'interactions/interactions_archive store some ids more than once; remove the duplicates before adding the id registry';
+    END IF;
+END $$;
+
+-- 1. The registry
+CREATE TABLE IF NOT EXISTS interaction_ids (
+    id UUID PRIMARY KEY DEFERRABLE INITIALLY DEFERRED,
+    archived BOOLEAN NOT NULL
+);
+
+INSERT INTO interaction_ids (id, archived)
+SELECT id, FALSE FROM interactions
+UNION ALL
+SELECT id, TRUE FROM interactions_archive;
+
+-- 2. Kept in step with both tables. TG_ARGV[0] is 'true' on the archive.
+CREATE OR REPLACE FUNCTION register_interaction_ids()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO interaction_ids (id, archived)
+        SELECT id, TG_ARGV[0]::boolean FROM new_rows;
+    ELSIF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM interaction_ids WHERE archived = TG_ARGV[0]::boolean;
+    ELSE
+        DELETE FROM interaction_ids r
+        USING old_rows o
+        WHERE r.id = o.id AND r.archived = TG_ARGV[0]::boolean;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS interactions_register_ids ON interactions;
+CREATE TRIGGER interactions_register_ids
+AFTER INSERT ON interactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('false');
+
+DROP TRIGGER IF EXISTS interactions_unregister_ids ON interactions;
+CREATE TRIGGER interactions_unregister_ids
+AFTER DELETE ON interactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('false');
+
+DROP TRIGGER IF EXISTS interactions_archive_register_ids ON interactions_archive;
+CREATE TRIGGER interactions_archive_register_ids
+AFTER INSERT ON interactions_archive
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('true');
+
+DROP TRIGGER IF EXISTS interactions_archive_unregister_ids ON interactions_archive;
+CREATE TRIGGER interactions_archive_unregister_ids
+AFTER DELETE ON interactions_archive
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('true');
+
+DROP TRIGGER IF EXISTS interactions_truncate_ids ON interactions;
+CREATE TRIGGER interactions_truncate_ids
+AFTER TRUNCATE ON interactions
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('false');
+
+DROP TRIGGER IF EXISTS interactions_archive_truncate_ids ON interactions_archive;
+CREATE TRIGGER interactions_archive_truncate_ids
+AFTER TRUNCATE ON interactions_archive
+FOR EACH STATEMENT EXECUTE FUNCTION register_interaction_ids('true');
+
+COMMIT;
+
+ANALYZE interaction_ids;
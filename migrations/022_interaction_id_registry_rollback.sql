@@ -0,0 +1,19 @@
+-- Rollback: Remove the interaction id registry
+-- Run this to undo migrations/022_interaction_id_registry.sql
+-- (ids are unique per (id, timestamp) only again; roll the API back first)
+
+DROP TRIGGER IF EXISTS interactions_register_ids ON interactions;
+DROP TRIGGER IF EXISTS interactions_unregister_ids ON interactions;
+DROP TRIGGER IF EXISTS interactions_archive_register_ids ON interactions_archive;
+DROP TRIGGER IF EXISTS interactions_archive_unregister_ids ON interactions_archive;
+DROP TRIGGER IF EXISTS interactions_truncate_ids ON interactions;
+DROP TRIGGER IF EXISTS interactions_archive_truncate_ids ON interactions_archive;
+
+DROP FUNCTION IF EXISTS register_interaction_ids();
+
+DROP TABLE IF EXISTS interaction_ids;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. interaction_ids dropped.';
+END $$;
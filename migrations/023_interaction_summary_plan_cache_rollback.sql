@@ -0,0 +1,115 @@
+-- Rollback: Plan interaction_summary() on every call again
+-- Run this to undo migrations/023_interaction_summary_plan_cache.sql
+-- (restores the LANGUAGE sql definition from 009)
+
+CREATE OR REPLACE FUNCTION interaction_summary(range_start TIMESTAMPTZ, range_end TIMESTAMPTZ)
+RETURNS JSONB
+LANGUAGE sql STABLE
+AS $$
+    WITH grouped AS (
+        SELECT
+            CASE
+                WHEN GROUPING(seller_id) = 0 AND GROUPING(hook) = 0 THEN 'seller_hook'
+                WHEN GROUPING(seller_id) = 0 AND GROUPING(persona) = 0 THEN 'seller_persona'
+                WHEN GROUPING(seller_id) = 0 THEN 'seller'
+                WHEN GROUPING(is_sale) = 0 THEN 'lead_outcome'
+                WHEN GROUPING(sale_type) = 0 THEN 'sale_type'
+                WHEN GROUPING(persona) = 0 THEN 'persona'
+                WHEN GROUPING(hook) = 0 THEN 'hook'
+                WHEN GROUPING(objection) = 0 THEN 'objection'
+                WHEN GROUPING(lead_type) = 0 THEN 'lead_type'
+                ELSE 'total'
+            END AS grouping_set,
+            sale_type, persona, hook, objection, lead_type, is_sale, seller_id,
+            COUNT(*) AS n,
+            COUNT(*) FILTER (WHERE engaged = TRUE) AS n_engaged,
+            COUNT(*) FILTER (WHERE engaged = FALSE) AS n_walk_by,
+            COUNT(*) FILTER (WHERE is_sale) AS n_sale,
+            COALESCE(SUM(total_amount) FILTER (WHERE is_sale), 0) AS sale_revenue,
+            COALESCE(SUM(total_amount) FILTER (WHERE engaged = TRUE), 0) AS engaged_revenue,
+            COALESCE(SUM(
+                CASE
+                    WHEN sale_type = 'single' THEN quantity
+                    WHEN sale_type = 'bundle_3' THEN 3
+                    WHEN sale_type = 'full_year' THEN 12
+                    ELSE 0
+                END
+            ) FILTER (WHERE is_sale), 0) AS boxes,
+            COUNT(*) FILTER (WHERE unit_price = 990) AS price_990,
+            COUNT(*) FILTER (WHERE unit_price = 1290) AS price_1290
+        FROM (
+            SELECT engaged, persona, hook, sale_type, quantity, unit_price,
+                   total_amount, lead_type, objection, seller_id,
+                   (sale_type IS NOT NULL AND sale_type <> 'none') AS is_sale
+            FROM interactions
+            WHERE timestamp >= range_start AND timestamp < range_end
+              AND deleted_at IS NULL
+        ) live
+        GROUP BY GROUPING SETS (
+            (), (sale_type), (persona), (hook), (objection), (lead_type),
+            (is_sale, lead_type), (seller_id), (seller_id, hook), (seller_id, persona)
+        )
+    )
+    SELECT jsonb_build_object(
+        'visitors', t.n,
+        'conversations', t.n_engaged,
+        'walk_bys', t.n_walk_by,
+        'sales_count', t.n_sale,
+        'revenue', t.sale_revenue,
+        'boxes', t.boxes,
+        'price_990', t.price_990,
+        'price_1290', t.price_1290,
+        'product_mix', COALESCE((
+            SELECT jsonb_object_agg(sale_type, n_sale) FROM grouped
+            WHERE grouping_set = 'sale_type' AND n_sale > 0), '{}'::jsonb),
+        'personas', COALESCE((
+            SELECT jsonb_object_agg(persona, n_sale) FROM grouped
+            WHERE grouping_set = 'persona' AND persona IS NOT NULL AND n_sale > 0), '{}'::jsonb),
+        'hooks', COALESCE((
+            SELECT jsonb_object_agg(hook, n) FROM grouped
+            WHERE grouping_set = 'hook' AND hook IS NOT NULL), '{}'::jsonb),
+        'objections', COALESCE((
+            SELECT jsonb_object_agg(objection, n) FROM grouped
+            WHERE grouping_set = 'objection' AND objection IS NOT NULL), '{}'::jsonb),
+        'leads', COALESCE((
+            SELECT jsonb_object_agg(lead_type, n) FROM grouped
+            WHERE grouping_set = 'lead_type' AND lead_type IS NOT NULL), '{}'::jsonb),
+        -- Sankey: engaged rows by outcome ('unset' = conversation with no sale_type)
+        'engaged_sales', COALESCE((
+            SELECT jsonb_object_agg(
+                COALESCE(sale_type, 'unset'),
+                jsonb_build_object('count', n_engaged, 'revenue', engaged_revenue)
+            ) FROM grouped
+            WHERE grouping_set = 'sale_type' AND n_engaged > 0), '{}'::jsonb),
+        -- Sankey: "sale_with_line", "no_sale_with_email", ...
+        'lead_outcomes', COALESCE((
+            SELECT jsonb_object_agg(
+                CASE WHEN is_sale THEN 'sale' ELSE 'no_sale' END || '_with_' || lead_type, n_engaged
+            ) FROM grouped
+            WHERE grouping_set = 'lead_outcome' AND lead_type IS NOT NULL AND n_engaged > 0), '{}'::jsonb),
+        -- By-seller: totals plus hook/persona counts among that seller's sales
+        'sellers', COALESCE((
+            SELECT jsonb_object_agg(s.seller_id, jsonb_build_object(
+                'engaged', s.n_engaged,
+                'sales', s.n_sale,
+                'revenue', s.sale_revenue,
+                'hooks', COALESCE((
+                    SELECT jsonb_object_agg(h.hook, h.n_sale) FROM grouped h
+                    WHERE h.grouping_set = 'seller_hook' AND h.seller_id = s.seller_id
+                      AND h.hook IS NOT NULL AND h.n_sale > 0), '{}'::jsonb),
+                'personas', COALESCE((
+                    SELECT jsonb_object_agg(p.persona, p.n_sale) FROM grouped p
+                    WHERE p.grouping_set = 'seller_persona' AND p.seller_id = s.seller_id
+                      AND p.persona IS NOT NULL AND p.n_sale > 0), '{}'::jsonb)
+            ))
+            FROM grouped s
+            WHERE s.grouping_set = 'seller' AND s.seller_id IS NOT NULL), '{}'::jsonb)
+    )
+    FROM grouped t
+    WHERE t.grouping_set = 'total'
+$$;
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Rollback complete. interaction_summary() is a SQL function again.';
+END $$;
@@ -0,0 +1,337 @@
+-- ============================================================
+-- EMBEDDED SQLITE SCHEMA (single-laptop booths)
+-- File: migrations/sqlite/001_schema.sql
+-- ============================================================
+--
+-- The schema of Postgres migrations 002-016 for DATABASE_URL=sqlite:///...
+-- (api/sqlite_store.py). The API applies the files in this directory on
+-- startup, each once, tracked in PRAGMA user_version; no psql step.
+--
+-- Same tables, columns and constraints, with these differences:
+--
+--   * TIMESTAMPTZ values are UTC text in one fixed-width format
+--     ('2026-01-31 09:15:00.123456+00:00'), so comparing text compares
+--     times; BOOLEAN is 0/1, UUID is text. NOW() is registered by the API.
+--   * interactions is a single table: no monthly partitions (008).
+--   * data_change events (005/010/016): row triggers call notify_change(),
+--     which the API folds into one event per statement. The triggers need
+--     the API's connection: write to this file through the API, not the
+--     sqlite3 shell.
+--   * updated_at is set by the API's UPDATE statements; SQLite triggers
+--     cannot change the row being written (002's BEFORE UPDATE trigger).
+--   * Notes search (014): an FTS5 index instead of tsvector + pg_trgm. FTS5
+--     needs a stable integer rowid, which interactions (keyed by UUID) does
+--     not have, so interaction_notes keeps one per interaction with notes.
+--   * daily_summaries (009), change_log (011) and trash archival (015) keep
+--     their tables and triggers; what the Postgres functions did is done by
+--     the API (the sqlite_* helpers in api/main.py).
+--
+-- Rollback: delete the database file (it only ever holds this schema).
+
+-- 1. Sellers and devices (PRD, 003)
+CREATE TABLE IF NOT EXISTS sellers (
+    id VARCHAR(50) PRIMARY KEY,
+    display_name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00'),
+    is_active BOOLEAN DEFAULT TRUE
+);
+
+CREATE INDEX IF NOT EXISTS idx_sellers_active ON sellers (is_active) WHERE is_active = TRUE;
+
+-- Default sellers, as seeded by 003
+INSERT INTO sellers (id, display_name) VALUES
+    ('tanwa', 'Tanwa'),
+    ('veerapat', 'Veerapat')
+ON CONFLICT (id) DO UPDATE SET display_name = excluded.display_name;
+
+CREATE TABLE IF NOT EXISTS staff (
+    device_name VARCHAR(100) PRIMARY KEY,
+    display_name VARCHAR(100) NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00'),
+    active_seller VARCHAR(50) REFERENCES sellers(id)
+);
+
+-- 2. Interactions (PRD, 002, 003, 006). id defaults to a random (v4) UUID.
+CREATE TABLE IF NOT EXISTS interactions (
+    id UUID PRIMARY KEY NOT NULL DEFAULT (lower(
+        hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4' || substr(hex(randomblob(2)), 2) || '-'
+        || substr('89ab', 1 + abs(random()) % 4, 1) || substr(hex(randomblob(2)), 2) || '-' || hex(randomblob(6))
+    )),
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00'),
+    staff_device VARCHAR(100) NOT NULL REFERENCES staff(device_name),
+    interaction_type VARCHAR(20) NOT NULL
+        CHECK (interaction_type IN ('walk_by', 'conversation')),
+    persona VARCHAR(20)
+        CHECK (persona IN ('parent', 'gift_buyer', 'expat', 'future_parent')),
+    hook VARCHAR(20)
+        CHECK (hook IN ('physical_kits', 'big_garden', 'signage')),
+    sale_type VARCHAR(20)
+        CHECK (sale_type IN ('none', 'single', 'bundle_3', 'full_year')),
+    quantity INTEGER DEFAULT 1,
+    unit_price INTEGER,
+    total_amount INTEGER,
+    lead_type VARCHAR(20)
+        CHECK (lead_type IN ('line', 'email', 'instagram', 'none')),
+    objection VARCHAR(50),
+    engaged BOOLEAN DEFAULT FALSE,
+    deleted_at TIMESTAMPTZ,
+    notes TEXT,
+    updated_at TIMESTAMPTZ,
+    seller_id VARCHAR(50) REFERENCES sellers(id)
+);
+
+-- Query indexes (007)
+CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON interactions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_interactions_live ON interactions (timestamp) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_seller ON interactions (seller_id, timestamp) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_interactions_staff ON interactions (staff_device);
+CREATE INDEX IF NOT EXISTS idx_interactions_trash ON interactions (deleted_at DESC) WHERE deleted_at IS NOT NULL;
+
+-- 3. Event tags (004)
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TIMESTAMPTZ DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00'),
+    description TEXT NOT NULL,
+    staff_device VARCHAR(100),
+    seller_id VARCHAR(50) REFERENCES sellers(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp DESC);
+
+-- 4. data_change events, one per statement (016). notify_change(table,
+--    action, id, timestamp, previous timestamp) is provided by the API.
+CREATE TRIGGER IF NOT EXISTS interaction_notify_insert AFTER INSERT ON interactions
+BEGIN
+    SELECT notify_change('interactions', 'INSERT', NEW.id, NEW.timestamp, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS interaction_notify_update AFTER UPDATE ON interactions
+BEGIN
+    SELECT notify_change('interactions', 'UPDATE', NEW.id, NEW.timestamp, OLD.timestamp);
+END;
+
+CREATE TRIGGER IF NOT EXISTS interaction_notify_delete AFTER DELETE ON interactions
+BEGIN
+    SELECT notify_change('interactions', 'DELETE', OLD.id, OLD.timestamp, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_notify_insert AFTER INSERT ON events
+BEGIN
+    SELECT notify_change('events', 'INSERT', NEW.id, NEW.timestamp, NULL);
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_notify_update AFTER UPDATE ON events
+BEGIN
+    SELECT notify_change('events', 'UPDATE', NEW.id, NEW.timestamp, OLD.timestamp);
+END;
+
+CREATE TRIGGER IF NOT EXISTS event_notify_delete AFTER DELETE ON events
+BEGIN
+    SELECT notify_change('events', 'DELETE', OLD.id, OLD.timestamp, NULL);
+END;
+
+-- 5. Closed-day snapshots (009). A write to a row older than the editable
+--    window drops the snapshots of its UTC day and the days either side.
+CREATE TABLE IF NOT EXISTS daily_summaries (
+    day DATE PRIMARY KEY,
+    timezone TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    finalized_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00')
+);
+
+CREATE TRIGGER IF NOT EXISTS interactions_invalidate_daily_summaries_insert AFTER INSERT ON interactions
+WHEN NEW.deleted_at IS NULL
+ AND NEW.timestamp < strftime('%Y-%m-%d %H:%M:%f', 'now', '-30 days') || '000+00:00'
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE day BETWEEN date(NEW.timestamp, '-1 day') AND date(NEW.timestamp, '+1 day');
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_invalidate_daily_summaries_update AFTER UPDATE ON interactions
+WHEN (OLD.timestamp, OLD.deleted_at IS NULL, OLD.engaged, OLD.persona, OLD.hook,
+      OLD.sale_type, OLD.quantity, OLD.unit_price, OLD.total_amount,
+      OLD.lead_type, OLD.objection, OLD.seller_id)
+     IS NOT
+     (NEW.timestamp, NEW.deleted_at IS NULL, NEW.engaged, NEW.persona, NEW.hook,
+      NEW.sale_type, NEW.quantity, NEW.unit_price, NEW.total_amount,
+      NEW.lead_type, NEW.objection, NEW.seller_id)
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE OLD.deleted_at IS NULL
+      AND OLD.timestamp < strftime('%Y-%m-%d %H:%M:%f', 'now', '-30 days') || '000+00:00'
+      AND day BETWEEN date(OLD.timestamp, '-1 day') AND date(OLD.timestamp, '+1 day');
+    DELETE FROM daily_summaries
+    WHERE NEW.deleted_at IS NULL
+      AND NEW.timestamp < strftime('%Y-%m-%d %H:%M:%f', 'now', '-30 days') || '000+00:00'
+      AND day BETWEEN date(NEW.timestamp, '-1 day') AND date(NEW.timestamp, '+1 day');
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_invalidate_daily_summaries_delete AFTER DELETE ON interactions
+WHEN OLD.deleted_at IS NULL
+ AND OLD.timestamp < strftime('%Y-%m-%d %H:%M:%f', 'now', '-30 days') || '000+00:00'
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE day BETWEEN date(OLD.timestamp, '-1 day') AND date(OLD.timestamp, '+1 day');
+END;
+
+-- 6. Change log (011). SQLite has one writer at a time, so seq order is
+--    commit order without 011's advisory lock. AUTOINCREMENT: a seq is
+--    never reused after compaction removes the newest entries.
+CREATE TABLE IF NOT EXISTS change_log (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_key TEXT NOT NULL,
+    op CHAR(1) NOT NULL CHECK (op IN ('U', 'D')),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00')
+);
+
+CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log (table_name, row_key, seq);
+
+CREATE TABLE IF NOT EXISTS change_log_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    pruned_through INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO change_log_horizon (id, pruned_through) VALUES (TRUE, 0);
+
+CREATE TRIGGER IF NOT EXISTS interactions_change_log_insert AFTER INSERT ON interactions
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('interactions', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_change_log_update AFTER UPDATE ON interactions
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op)
+    SELECT 'interactions', OLD.id, 'D' WHERE OLD.id IS NOT NEW.id;
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('interactions', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_change_log_delete AFTER DELETE ON interactions
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('interactions', OLD.id, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_change_log_insert AFTER INSERT ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('events', CAST(NEW.id AS TEXT), 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_change_log_update AFTER UPDATE ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op)
+    SELECT 'events', CAST(OLD.id AS TEXT), 'D' WHERE OLD.id IS NOT NEW.id;
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('events', CAST(NEW.id AS TEXT), 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS events_change_log_delete AFTER DELETE ON events
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('events', CAST(OLD.id AS TEXT), 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sellers_change_log_insert AFTER INSERT ON sellers
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('sellers', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sellers_change_log_update AFTER UPDATE ON sellers
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op)
+    SELECT 'sellers', OLD.id, 'D' WHERE OLD.id IS NOT NEW.id;
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('sellers', NEW.id, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS sellers_change_log_delete AFTER DELETE ON sellers
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('sellers', OLD.id, 'D');
+END;
+
+CREATE TRIGGER IF NOT EXISTS staff_change_log_insert AFTER INSERT ON staff
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('staff', NEW.device_name, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS staff_change_log_update AFTER UPDATE ON staff
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op)
+    SELECT 'staff', OLD.device_name, 'D' WHERE OLD.device_name IS NOT NEW.device_name;
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('staff', NEW.device_name, 'U');
+END;
+
+CREATE TRIGGER IF NOT EXISTS staff_change_log_delete AFTER DELETE ON staff
+BEGIN
+    INSERT INTO change_log (table_name, row_key, op) VALUES ('staff', OLD.device_name, 'D');
+END;
+
+-- 7. Idempotent creates (012)
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    response TEXT NOT NULL,  -- JSON
+    created_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00'),
+    PRIMARY KEY (scope, key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys (created_at);
+
+-- 8. Notes search (014): English stemming like to_tsvector('english', ...)
+CREATE TABLE IF NOT EXISTS interaction_notes (
+    note_id INTEGER PRIMARY KEY,
+    interaction_id UUID NOT NULL UNIQUE,
+    notes TEXT NOT NULL
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS interaction_notes_fts USING fts5(
+    notes, content = 'interaction_notes', content_rowid = 'note_id', tokenize = 'porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS interaction_notes_fts_insert AFTER INSERT ON interaction_notes
+BEGIN
+    INSERT INTO interaction_notes_fts (rowid, notes) VALUES (NEW.note_id, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS interaction_notes_fts_delete AFTER DELETE ON interaction_notes
+BEGIN
+    INSERT INTO interaction_notes_fts (interaction_notes_fts, rowid, notes) VALUES ('delete', OLD.note_id, OLD.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_notes_insert AFTER INSERT ON interactions
+WHEN NEW.notes IS NOT NULL
+BEGIN
+    INSERT INTO interaction_notes (interaction_id, notes) VALUES (NEW.id, NEW.notes);
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_notes_update AFTER UPDATE OF id, notes ON interactions
+BEGIN
+    DELETE FROM interaction_notes WHERE interaction_id = OLD.id;
+    INSERT INTO interaction_notes (interaction_id, notes)
+    SELECT NEW.id, NEW.notes WHERE NEW.notes IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS interactions_notes_delete AFTER DELETE ON interactions
+BEGIN
+    DELETE FROM interaction_notes WHERE interaction_id = OLD.id;
+END;
+
+-- 9. Trash archive (015)
+CREATE TABLE IF NOT EXISTS interactions_archive (
+    id UUID PRIMARY KEY,
+    timestamp TIMESTAMPTZ NOT NULL,
+    staff_device VARCHAR(100) NOT NULL,
+    interaction_type VARCHAR(20) NOT NULL,
+    persona VARCHAR(20),
+    hook VARCHAR(20),
+    sale_type VARCHAR(20),
+    quantity INTEGER,
+    unit_price INTEGER,
+    total_amount INTEGER,
+    lead_type VARCHAR(20),
+    objection VARCHAR(50),
+    engaged BOOLEAN,
+    deleted_at TIMESTAMPTZ NOT NULL,
+    notes TEXT,
+    updated_at TIMESTAMPTZ,
+    seller_id VARCHAR(50),
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now') || '000+00:00')
+);
+
+CREATE INDEX IF NOT EXISTS idx_interactions_archive_deleted_at ON interactions_archive (deleted_at DESC);
@@ -0,0 +1,10 @@
+-- ============================================================
+-- SNAPSHOT EXPORT: INCREMENTAL SCAN INDEX (SQLite)
+-- File: migrations/sqlite/002_updated_at_index.sql
+-- ============================================================
+--
+-- Postgres migration 017 for embedded mode. SQLite cannot change a column
+-- default in place, so the API's INSERT statements set updated_at = NOW()
+-- themselves; this only adds the index behind "updated_at > $1".
+
+CREATE INDEX IF NOT EXISTS idx_interactions_updated_at ON interactions (updated_at);
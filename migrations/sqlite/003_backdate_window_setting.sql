@@ -0,0 +1,62 @@
+-- ============================================================
+-- CLOSED-DAY SNAPSHOTS: SHARE THE EDITABLE WINDOW WITH THE API (SQLite)
+-- File: migrations/sqlite/003_backdate_window_setting.sql
+-- ============================================================
+--
+-- Postgres migration 018 for embedded mode: the snapshot triggers read the
+-- editable window from app_settings (written by the API on startup from
+-- MAX_BACKDATE_DAYS) instead of a hard-coded 30 days. SQLite cannot
+-- replace a trigger in place, so they are dropped and created again.
+
+CREATE TABLE IF NOT EXISTS app_settings (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+INSERT INTO app_settings (name, value) VALUES ('max_backdate_days', '30')
+ON CONFLICT (name) DO NOTHING;
+
+-- Start of the editable window, in the stored TIMESTAMPTZ format
+CREATE VIEW IF NOT EXISTS editable_window AS
+SELECT strftime('%Y-%m-%d %H:%M:%f', 'now', '-' || COALESCE(
+    (SELECT CAST(value AS INTEGER) FROM app_settings WHERE name = 'max_backdate_days'), 30
+) || ' days') || '000+00:00' AS horizon;
+
+DROP TRIGGER IF EXISTS interactions_invalidate_daily_summaries_insert;
+DROP TRIGGER IF EXISTS interactions_invalidate_daily_summaries_update;
+DROP TRIGGER IF EXISTS interactions_invalidate_daily_summaries_delete;
+
+CREATE TRIGGER interactions_invalidate_daily_summaries_insert AFTER INSERT ON interactions
+WHEN NEW.deleted_at IS NULL
+ AND NEW.timestamp < (SELECT horizon FROM editable_window)
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE day BETWEEN date(NEW.timestamp, '-1 day') AND date(NEW.timestamp, '+1 day');
+END;
+
+CREATE TRIGGER interactions_invalidate_daily_summaries_update AFTER UPDATE ON interactions
+WHEN (OLD.timestamp, OLD.deleted_at IS NULL, OLD.engaged, OLD.persona, OLD.hook,
+      OLD.sale_type, OLD.quantity, OLD.unit_price, OLD.total_amount,
+      OLD.lead_type, OLD.objection, OLD.seller_id)
+     IS NOT
+     (NEW.timestamp, NEW.deleted_at IS NULL, NEW.engaged, NEW.persona, NEW.hook,
+      NEW.sale_type, NEW.quantity, NEW.unit_price, NEW.total_amount,
+      NEW.lead_type, NEW.objection, NEW.seller_id)
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE OLD.deleted_at IS NULL
+      AND OLD.timestamp < (SELECT horizon FROM editable_window)
+      AND day BETWEEN date(OLD.timestamp, '-1 day') AND date(OLD.timestamp, '+1 day');
+    DELETE FROM daily_summaries
+    WHERE NEW.deleted_at IS NULL
+      AND NEW.timestamp < (SELECT horizon FROM editable_window)
+      AND day BETWEEN date(NEW.timestamp, '-1 day') AND date(NEW.timestamp, '+1 day');
+END;
+
+CREATE TRIGGER interactions_invalidate_daily_summaries_delete AFTER DELETE ON interactions
+WHEN OLD.deleted_at IS NULL
+ AND OLD.timestamp < (SELECT horizon FROM editable_window)
+BEGIN
+    DELETE FROM daily_summaries
+    WHERE day BETWEEN date(OLD.timestamp, '-1 day') AND date(OLD.timestamp, '+1 day');
+END;
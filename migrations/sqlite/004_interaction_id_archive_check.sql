@@ -0,0 +1,17 @@
+-- ============================================================
+-- ONE ROW PER INTERACTION ID, ACROSS THE ARCHIVE (SQLite)
+-- File: migrations/sqlite/004_interaction_id_archive_check.sql
+-- ============================================================
+--
+-- Postgres migration 022 for embedded mode. interactions.id is already the
+-- primary key here, so only the archive is left: an interaction whose id
+-- belongs to an archived one is refused with the same "UNIQUE constraint
+-- failed" error the key raises (the API answers 409).
+-- restore_archived_interaction takes the row out of the archive before it
+-- inserts it back, so a restore passes.
+
+CREATE TRIGGER IF NOT EXISTS interactions_archived_id BEFORE INSERT ON interactions
+WHEN EXISTS (SELECT 1 FROM interactions_archive WHERE id = NEW.id)
+BEGIN
+    SELECT RAISE(ABORT, 'UNIQUE constraint failed: interactions_archive.id');
+END;
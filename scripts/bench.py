@@ -0,0 +1,401 @@
+"""Synthetic-dataset benchmark for the Insights API.
+
+Seeds a scratch database with realistic booth traffic, then times raw inserts
+and the read endpoints through the real FastAPI app (in-process, no network),
+including the column store analytics against the SQL pivot.
+
+    BENCH_DATABASE_URL=postgresql://postgres:pw@localhost:5432/insights_bench \
+        python scripts/bench.py --rows 200000 --days 120
+
+The target database must already have the schema and migrations applied.
+It is TRUNCATED before seeding - never point this at production.
+
+A sqlite:/// URL benchmarks the embedded mode instead; the file is created
+and migrated if needed:
+
+    BENCH_DATABASE_URL=sqlite:////tmp/insights_bench.db python scripts/bench.py
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import asyncpg
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+sys.path.insert(0, API_DIR)
+import sqlite_store  # noqa: E402
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+SQLITE_BENCH = (BENCH_DATABASE_URL or "").startswith("sqlite:")
+database = sqlite_store if SQLITE_BENCH else asyncpg
+QUERY_COUNT = {"count": 0}  # Statements sent by the app (see load_app)
+
+DEVICES = ["sisia", "darling-nikki", "black-sweat"]
+SELLERS = ["tanwa", "veerapat", "guest"]
+PERSONAS = ["parent", "gift_buyer", "expat", "future_parent"]
+HOOKS = ["physical_kits", "big_garden", "signage"]
+OBJECTIONS = ["too_expensive", "not_interested", "no_time", "already_have",
+              "need_to_think", "language_barrier", "other"]
+EVENTS = ["demo started", "rain started", "lunch rush", "stock refilled"]
+NOTES = ["asked about the garden kit", "wants the bundle for her nephew",
+         "will come back after lunch", "interested in the full year subscription",
+         "price too high for two kids", "asked about delivery to Chiang Mai",
+         "follow up on LINE next week", "gift wrapping request",
+         "teacher, asked about school discounts", "already has the physical kits"]
+
+INSERT_SQL = """
+    INSERT INTO interactions (
+        staff_device, interaction_type, engaged, persona, hook,
+        sale_type, quantity, unit_price, total_amount,
+        lead_type, objection, seller_id, timestamp, notes, deleted_at
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14, $15)
+"""
+
+
+def synthetic_row(rng: random.Random, ts: datetime) -> tuple:
+    """One interaction with roughly the mix seen at a real fair."""
+    device = rng.choice(DEVICES)
+    seller = rng.choice(SELLERS)
+    deleted_at = ts + timedelta(hours=1) if rng.random() < 0.03 else None
+    notes = rng.choice(NOTES) if rng.random() < 0.05 else None
+
+    if rng.random() < 0.6:
+        return (device, "walk_by", False, None, None, None, 1, None, None,
+                None, None, seller, ts, notes, deleted_at)
+
+    persona = rng.choice(PERSONAS)
+    hook = rng.choice(HOOKS)
+    roll = rng.random()
+    quantity, unit_price, total, objection = 1, None, None, None
+    if roll < 0.55:
+        sale_type = "none"
+        objection = rng.choice(OBJECTIONS)
+    elif roll < 0.85:
+        sale_type = "single"
+        quantity = rng.randint(1, 3)
+        unit_price = rng.choice([990, 1290])
+        total = quantity * unit_price
+    elif roll < 0.95:
+        sale_type, total = "bundle_3", 2690
+    else:
+        sale_type, total = "full_year", 4990
+    lead = rng.choice(["line", "email", "instagram"]) if rng.random() < 0.25 else None
+    return (device, "conversation", True, persona, hook, sale_type, quantity,
+            unit_price, total, lead, objection, seller, ts, notes, deleted_at)
+
+
+async def seed(conn: asyncpg.Connection, rows: int, days: int, seed_value: int):
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(days=days)
+
+    if SQLITE_BENCH:
+        # No TRUNCATE; the embedded schema has every table
+        for table in ["interactions", "events", "interactions_archive", "change_log"]:
+            await conn.execute(f"DELETE FROM {table}")
+        await conn.execute("DELETE FROM sqlite_sequence WHERE name = 'change_log'")
+        await conn.execute("UPDATE change_log_horizon SET pruned_through = 0")
+    else:
+        await conn.execute("TRUNCATE interactions, events")
+        # Trash archive (migration 015)
+        if await conn.fetchval("SELECT to_regclass('interactions_archive') IS NOT NULL"):
+            await conn.execute("TRUNCATE interactions_archive")
+        # Change log (migration 011): start from an empty log at seq 0
+        if await conn.fetchval("SELECT to_regclass('change_log') IS NOT NULL"):
+            await conn.execute("TRUNCATE change_log RESTART IDENTITY")
+            await conn.execute("UPDATE change_log_horizon SET pruned_through = 0")
+    for device in DEVICES:
+        await conn.execute(
+            "INSERT INTO staff (device_name, display_name) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+            device, device.title()
+        )
+    for seller in SELLERS:
+        await conn.execute(
+            "INSERT INTO sellers (id, display_name) VALUES ($1, $2) ON CONFLICT DO NOTHING",
+            seller, seller.title()
+        )
+
+    # Partitioned schema (migration 008): make sure every seeded month exists
+    if not SQLITE_BENCH and await conn.fetchval("SELECT to_regproc('ensure_interaction_partitions') IS NOT NULL"):
+        await conn.execute("SELECT ensure_interaction_partitions(3, 'interactions', $1)", start)
+
+    span = (now - start).total_seconds()
+    timestamps = sorted(start + timedelta(seconds=rng.random() * span) for _ in range(rows))
+    batch = []
+    for ts in timestamps:
+        batch.append(synthetic_row(rng, ts))
+        if len(batch) == 5000:
+            await conn.executemany(INSERT_SQL, batch)
+            batch.clear()
+    if batch:
+        await conn.executemany(INSERT_SQL, batch)
+
+    events = [(start + timedelta(seconds=rng.random() * span), rng.choice(EVENTS))
+              for _ in range(max(days * 3, 10))]
+    await conn.executemany(
+        "INSERT INTO events (timestamp, description) VALUES ($1, $2)", events
+    )
+    await analyze(conn, "interactions")
+    await analyze(conn, "events")
+
+
+async def analyze(conn, table: str):
+    """Refresh planner statistics (and, in Postgres, the visibility map)."""
+    await conn.execute(f"ANALYZE {table}" if SQLITE_BENCH else f"VACUUM ANALYZE {table}")
+
+
+async def bench_inserts(conn: asyncpg.Connection, count: int) -> list:
+    """Time single-row inserts the way create_interaction issues them."""
+    rng = random.Random(1)
+    timings = []
+    for _ in range(count):
+        row = synthetic_row(rng, datetime.now(timezone.utc))
+        started = time.perf_counter()
+        await conn.execute(INSERT_SQL, *row)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def load_app():
+    """Import api/main.py against the bench database, counting its queries.
+
+    Every pooled connection gets a query logger, so a benchmark can report
+    how many statements (database round trips) a request cost.
+    """
+    if "main" in sys.modules:
+        return sys.modules["main"], QUERY_COUNT
+
+    os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+    import main
+
+    queries = QUERY_COUNT
+    create_pool = main.database.create_pool
+
+    def counting_pool(*args, init=None, **kwargs):
+        def count(record):
+            # Not the pool's own reset statement on release
+            if "RESET ALL" not in record.query:
+                queries["count"] += 1
+
+        async def counting_init(conn):
+            conn.add_query_logger(count)
+            if init is not None:
+                await init(conn)
+        return create_pool(*args, init=counting_init, **kwargs)
+
+    main.database.create_pool = counting_pool
+    return main, queries
+
+
+async def bench_endpoints(repeat: int) -> dict:
+    """Time the read endpoints through the real app with an ASGI transport."""
+    import httpx
+
+    main, _ = load_app()
+
+    paths = [
+        "/api/stats?period=today",
+        "/api/stats?period=week",
+        "/api/stats?period=all",
+        "/api/analytics/sankey?period=week",
+        "/api/analytics/sankey?period=all",
+        "/api/analytics/by-seller?period=week",
+        "/api/analytics/by-seller?period=all",
+        "/api/analytics/pivot?period=week&dims=persona,hook&cube=true",
+        "/api/analytics/pivot?dims=seller_id,day&measures=sales,revenue&limit=1000",
+        "/api/analytics/timeseries?bucket=5m&period=today",
+        "/api/analytics/timeseries?bucket=1h&period=week",
+        "/api/analytics/timeseries?bucket=1d",
+        "/api/analytics/event-impact?limit=500",
+        "/api/sellers",
+        "/api/timeline?limit=50",
+        "/api/interactions/browse?limit=50",
+        "/api/interactions/browse?limit=50&sale_types=single,bundle_3",
+        "/api/interactions/browse?limit=50&q=delivery",
+        "/api/interactions/search?q=garden%20kit&limit=20",
+        "/api/interactions/trash?limit=50",
+        "/api/changes?since=0&limit=500",
+    ]
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for path in paths:
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+                results[path] = timings
+    return results
+
+
+async def bench_dashboard(repeat: int) -> dict:
+    """One /api/dashboard call vs the three concurrent calls it replaces."""
+    import httpx
+
+    main, queries = load_app()
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for period in ["today", "week", "all"]:
+                separate = [
+                    f"/api/stats?period={period}",
+                    f"/api/analytics/sankey?period={period}",
+                    f"/api/analytics/by-seller?period={period}",
+                ]
+                combined = [f"/api/dashboard?period={period}&panels=stats,sankey,sellers"]
+                for label, paths in [(f"3 calls ({period})", separate), (f"/api/dashboard ({period})", combined)]:
+                    timings = []
+                    before = queries["count"]
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        responses = await asyncio.gather(*(client.get(path) for path in paths))
+                        timings.append((time.perf_counter() - started) * 1000)
+                        for response in responses:
+                            response.raise_for_status()
+                    results[label] = (timings, len(paths), (queries["count"] - before) / repeat)
+    return results
+
+
+def pivot_matches(pivot: dict, crosstab: dict) -> bool:
+    """Every pivot row equals its cross-tab cell, and no other cell has traffic."""
+    from fastapi.encoders import jsonable_encoder
+
+    pivot, crosstab = jsonable_encoder(pivot), jsonable_encoder(crosstab)
+    dims, measures = crosstab["dims"], crosstab["measures"]
+    positions = {name: {label: i for i, label in enumerate(crosstab["labels"][name])} for name in dims}
+    seen = set()
+    for row in pivot["rows"]:
+        cell = tuple(positions[name][row[name]] for name in dims)
+        seen.add(cell)
+        for measure in measures:
+            value = crosstab["values"][measure]
+            for i in cell:
+                value = value[i]
+            if value != row[measure]:
+                return False
+    visitors = crosstab["values"]["visitors"]
+    for _ in dims[1:]:
+        visitors = [v for nested in visitors for v in nested]
+    return sum(visitors) == sum(row["visitors"] for row in pivot["rows"])
+
+
+async def bench_column_store(repeat: int) -> dict:
+    """The column store endpoints, against the SQL pivot for the same cross-tabs.
+
+    The pivot's result cache is cleared before every call, so both sides
+    compute their answer each time.
+    """
+    import httpx
+
+    main, _ = load_app()
+    crosstabs = [
+        "dims=persona,hook,hour_of_day&measures=visitors,sales,revenue,conversion",
+        "dims=seller_id,day&measures=visitors,conversations,sales,revenue,boxes,avg_per_sale",
+        "dims=interaction_type,weekday&measures=visitors,walk_bys,engaged_rate,overall_conversion",
+    ]
+    others = [
+        "/api/analytics/rolling?window=1h&step=15m&period=week",
+        "/api/analytics/rolling?window=1d&step=2h&by=persona&measures=conversion",
+        "/api/analytics/conversion-ci?dims=persona,hook",
+        "/api/analytics/conversion-ci?dims=seller_id,hour_of_day&resamples=1000",
+    ]
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            store = await main.interaction_columns.current()
+            results["build"] = (time.perf_counter() - started, len(store), store.nbytes)
+
+            for query in crosstabs:
+                answers = {}
+                for endpoint in ["pivot", "crosstab"]:
+                    path = f"/api/analytics/{endpoint}?{query}" + ("&limit=1000" if endpoint == "pivot" else "")
+                    timings = []
+                    for _ in range(repeat):
+                        main.result_cache.invalidate()
+                        started = time.perf_counter()
+                        response = await client.get(path)
+                        timings.append((time.perf_counter() - started) * 1000)
+                        response.raise_for_status()
+                    answers[endpoint] = response.json()
+                    results[path] = timings
+                results[query] = pivot_matches(answers["pivot"], answers["crosstab"])
+
+            for path in others:
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    response.raise_for_status()
+                results[path] = timings
+    return results
+
+
+def summarize(label: str, timings: list):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1] if len(timings) >= 20 else timings[-1]
+    print(f"{label:<60} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms")
+
+
+async def main_async(args):
+    if not BENCH_DATABASE_URL:
+        sys.exit("BENCH_DATABASE_URL is required")
+
+    if SQLITE_BENCH:
+        await sqlite_store.migrate(BENCH_DATABASE_URL, os.path.join(API_DIR, "..", "migrations", "sqlite"))
+    conn = await database.connect(BENCH_DATABASE_URL)
+    try:
+        if not args.skip_seed:
+            started = time.perf_counter()
+            await seed(conn, args.rows, args.days, args.seed)
+            print(f"Seeded {args.rows} rows over {args.days} days in {time.perf_counter() - started:.1f}s")
+        summarize("INSERT interactions (single row)", await bench_inserts(conn, args.inserts))
+        # Settle the visibility map like autovacuum would, so index-only
+        # scans are measured the same way on every run
+        await analyze(conn, "interactions")
+    finally:
+        await conn.close()
+
+    for path, timings in (await bench_endpoints(args.repeat)).items():
+        summarize(f"GET {path}", timings)
+
+    print("Dashboard panels (stats + sankey + by-seller):")
+    for label, (timings, requests, queries) in (await bench_dashboard(args.repeat)).items():
+        summarize(f"  {label}: {requests} request(s), {queries:.0f} queries", timings)
+
+    print("Column store (uncached SQL pivot vs in-memory cross-tab):")
+    results = await bench_column_store(args.repeat)
+    seconds, rows, nbytes = results.pop("build")
+    print(f"  built from {rows} rows in {seconds * 1000:.0f} ms, {nbytes / 2 ** 20:.1f} MiB "
+          f"({nbytes / max(rows, 1) * 1_000_000 / 2 ** 20:.0f} MiB per million rows)")
+    for key, value in results.items():
+        if isinstance(value, bool):
+            print(f"  same answer as the pivot: {'yes' if value else 'NO'} ({key})")
+        else:
+            summarize(f"  GET {key}", value)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--inserts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--skip-seed", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main_async(parse_args()))
@@ -0,0 +1,135 @@
+"""Event-loop latency of the Insights API while report jobs run.
+
+Starts uvicorn as a child process on a seeded database, probes /api/health
+while idle, then again while a batch of month-long reports renders on the
+worker pool, and prints the probe latency next to each job's timings:
+
+    BENCH_DATABASE_URL=postgresql://postgres:pw@localhost:5432/insights_bench \
+        python scripts/bench_reports.py --jobs 6
+    BENCH_DATABASE_URL=sqlite:////tmp/insights_bench.db python scripts/bench_reports.py
+
+render_ms is what each job would have blocked the event loop for had it
+rendered in the request handler. Seed the database with bench.py first.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+
+async def probe(client: httpx.AsyncClient, until) -> list:
+    """Round trips of /api/health, one every 20 ms, until until() is true."""
+    timings = []
+    while not until():
+        started = time.perf_counter()
+        (await client.get("/api/health")).raise_for_status()
+        timings.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.02)
+    return timings
+
+
+def summarize(label: str, timings: list):
+    timings = sorted(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+    print(f"{label:<32} p50 {statistics.median(timings):7.1f} ms   p99 {p99:7.1f} ms   "
+          f"max {timings[-1]:7.1f} ms   ({len(timings)} probes)")
+
+
+async def run(args, base_url: str):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        idle_until = time.perf_counter() + args.idle
+        summarize("/api/health, idle", await probe(client, lambda: time.perf_counter() > idle_until))
+
+        # Distinct month-long ranges, so no job is answered from the cache
+        last = date.fromisoformat(args.last_day)
+        jobs = []
+        for i in range(args.jobs):
+            end_day = last - timedelta(days=i)
+            body = {"day": (end_day - timedelta(days=args.days - 1)).isoformat(), "end_day": end_day.isoformat()}
+            response = await client.post("/api/reports", json=body)
+            response.raise_for_status()
+            jobs.append(response.json())
+
+        pending = {job["id"] for job in jobs}
+        finished = {}
+
+        async def poll():
+            while pending:
+                await asyncio.sleep(0.2)
+                for job_id in list(pending):
+                    job = (await client.get(f"/api/reports/{job_id}")).json()
+                    if job["status"] in ("done", "failed"):
+                        finished[job_id] = job
+                        pending.discard(job_id)
+
+        started = time.perf_counter()
+        timings, _ = await asyncio.gather(probe(client, lambda: not pending), poll())
+        elapsed = time.perf_counter() - started
+        summarize(f"/api/health, {args.jobs} jobs running", timings)
+        print(f"{args.jobs} reports of {args.days} days in {elapsed:.1f}s:")
+        for job in jobs:
+            job = finished[job["id"]]
+            if job["status"] != "done":
+                print(f"  {job['day']}..{job['end_day']}  FAILED: {job['error']}")
+                continue
+            print(f"  {job['day']}..{job['end_day']}  {job['summary']['totals']['visitors']:6} rows   "
+                  f"pull {job['pull_ms']:5} ms   render {job.get('render_ms', 0):5} ms   "
+                  f"loop lag max {job['loop_lag_max_ms']} ms")
+        print(f"event_loop_lag (last minute): {(await client.get('/api/metrics')).json()['event_loop_lag']}")
+
+
+def main(args):
+    if not BENCH_DATABASE_URL:
+        sys.exit("BENCH_DATABASE_URL is required")
+
+    with tempfile.TemporaryDirectory() as reports_dir:
+        env = {**os.environ, "DATABASE_URL": BENCH_DATABASE_URL, "REPORTS_DIR": reports_dir,
+               "REPORT_WORKERS": str(args.workers)}
+        process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", API_DIR,
+             "--host", "127.0.0.1", "--port", str(args.port), "--log-level", "warning"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            deadline = time.perf_counter() + 60
+            while True:
+                if process.poll() is not None:
+                    sys.exit(f"API exited with status {process.returncode} during startup")
+                if time.perf_counter() > deadline:
+                    sys.exit("API not healthy after 60s")
+                try:
+                    if httpx.get(f"{base_url}/api/health").status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.05)
+            asyncio.run(run(args, base_url))
+        finally:
+            process.terminate()
+            process.wait()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--days", type=int, default=31, help="Days per report")
+    parser.add_argument("--last-day", default=date.today().isoformat(), help="Last day of the newest report")
+    parser.add_argument("--workers", type=int, default=2, help="REPORT_WORKERS for the API")
+    parser.add_argument("--idle", type=float, default=3, help="Seconds of idle probes first")
+    parser.add_argument("--port", type=int, default=8798)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,156 @@
+"""Startup time and memory of the Insights API on a given database.
+
+Starts uvicorn as a child process, times it until /api/health answers and
+until /api/ready does, and reads its resident memory then and after a round
+of read endpoints:
+
+    BENCH_DATABASE_URL=postgresql://postgres:pw@localhost:5432/insights_bench \
+        python scripts/bench_startup.py
+    BENCH_DATABASE_URL=sqlite:////tmp/insights_bench.db python scripts/bench_startup.py
+
+The API is not ready until it has read the Tailscale status; where there is
+no tailscaled, --fake-tailscale serves a canned one on a temporary socket.
+
+Linux only (memory comes from /proc). Seed the database with bench.py first
+for realistic numbers after the warm-up.
+"""
+import argparse
+import json
+import os
+import socketserver
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import httpx
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL")
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+
+WARMUP_PATHS = [
+    "/api/stats?period=all",
+    "/api/analytics/sankey?period=week",
+    "/api/analytics/by-seller?period=week",
+    "/api/analytics/pivot?period=week&dims=persona,hook&cube=true",
+    "/api/analytics/timeseries?bucket=1h&period=week",
+    "/api/interactions/browse?limit=50",
+    "/api/timeline?limit=50",
+]
+
+
+class FakeTailscaleStatus(BaseHTTPRequestHandler):
+    """Answers every request with a status of one peer."""
+    body = json.dumps({
+        "Self": {"HostName": "bench-host", "TailscaleIPs": ["100.64.0.1"]},
+        "Peer": {"nodekey:bench": {"HostName": "bench-phone", "TailscaleIPs": ["100.64.0.2"]}},
+    }).encode()
+
+    def address_string(self):
+        return "tailscaled"  # Unix sockets have no client address
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def fake_tailscale(path: str):
+    """Serve FakeTailscaleStatus on the Unix socket path, in a daemon thread."""
+    server = socketserver.ThreadingUnixStreamServer(path, FakeTailscaleStatus)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_for(client: httpx.Client, path: str, process, started: float, timeout: float):
+    """Poll path every 20 ms until it answers 200; returns its body."""
+    while True:
+        if process.poll() is not None:
+            sys.exit(f"API exited with status {process.returncode} during startup")
+        if time.perf_counter() - started > timeout:
+            sys.exit(f"{path} not 200 after {timeout:.0f}s: {client.get(path).text}")
+        try:
+            response = client.get(path)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+
+
+def rss_mb(pid: int) -> float:
+    """Resident set size of pid in MiB."""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_once(port: int, timeout: float, env: dict) -> tuple:
+    """Start the API, return (seconds to healthy, to ready, time_to_ready_ms it
+    reports, RSS at ready, RSS after warm-up)."""
+    env = {**os.environ, **env, "DATABASE_URL": BENCH_DATABASE_URL}
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", API_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            wait_for(client, "/api/health", process, started, timeout)
+            healthy = time.perf_counter() - started
+            reported = wait_for(client, "/api/ready", process, started, timeout)["time_to_ready_ms"]
+            ready = time.perf_counter() - started
+            rss_ready = rss_mb(process.pid)
+            for path in WARMUP_PATHS:
+                client.get(path).raise_for_status()
+            rss_warm = rss_mb(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+    return healthy, ready, reported, rss_ready, rss_warm
+
+
+def main(args):
+    if not BENCH_DATABASE_URL:
+        sys.exit("BENCH_DATABASE_URL is required")
+
+    with tempfile.TemporaryDirectory() as socket_dir:
+        env = {}
+        if args.fake_tailscale:
+            env["TAILSCALE_SOCKET"] = os.path.join(socket_dir, "tailscaled.sock")
+            server = fake_tailscale(env["TAILSCALE_SOCKET"])
+        runs = [run_once(args.port, args.timeout, env) for _ in range(args.runs)]
+        if args.fake_tailscale:
+            server.shutdown()
+    scheme = BENCH_DATABASE_URL.split(":", 1)[0]
+    print(f"{scheme}: {args.runs} starts")
+    print(f"  time to healthy      p50 {statistics.median(r[0] for r in runs) * 1000:8.0f} ms")
+    print(f"  time to ready        p50 {statistics.median(r[1] for r in runs) * 1000:8.0f} ms   "
+          f"(reported {statistics.median(r[2] for r in runs):.0f} ms)")
+    print(f"  RSS when ready       p50 {statistics.median(r[3] for r in runs):8.1f} MiB")
+    print(f"  RSS after warm-up    p50 {statistics.median(r[4] for r in runs):8.1f} MiB")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--fake-tailscale", action="store_true",
+                        help="Serve a canned Tailscale status instead of using tailscaled")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,79 @@
+"""Write a columnar snapshot of the interactions for offline analysis.
+
+The same file GET /api/export/snapshot serves, written straight from the
+database - point DATABASE_URL at the read replica to keep the primary free:
+
+    DATABASE_URL=postgresql://postgres:pw@persistence:5432/lumicello_insights \
+        python scripts/export_snapshot.py --format parquet -o booth.parquet
+    DATABASE_URL=sqlite:////data/booth.db python scripts/export_snapshot.py --format duckdb -o booth.duckdb
+
+Nightly pulls only fetch what changed since the previous run when given a
+state file; merge each file into the previous ones by id (newest wins):
+
+    python scripts/export_snapshot.py --state nightly.since -o "changes-$(date +%F).parquet"
+
+Without --state or --since the snapshot is full. Requires pyarrow (and
+duckdb for --format duckdb).
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+API_DIR = os.path.join(os.path.dirname(__file__), "..", "api")
+sys.path.insert(0, API_DIR)
+import main  # noqa: E402
+
+
+async def export(export_format: str, since, output: str):
+    """Write the snapshot to output; returns the since for the next pull."""
+    conn = await main.database.connect(main.DATABASE_URL)
+    partial = output + ".partial"
+    try:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            through = await main.export_watermark(conn, since)
+            with open(partial, "wb") as f:
+                async for data in main.export_snapshot_chunks(conn, export_format, since, through):
+                    f.write(data)
+        os.replace(partial, output)
+    finally:
+        await conn.close()
+        if os.path.exists(partial):
+            os.unlink(partial)
+    return through
+
+
+def main_cli(args):
+    since = args.since
+    if since is None and args.state and os.path.exists(args.state):
+        with open(args.state) as f:
+            since = f.read().strip() or None
+    since_dt = None
+    if since:
+        since_dt = datetime.fromisoformat(since.replace('Z', '+00:00'))
+        if since_dt.tzinfo is None:
+            sys.exit("since must include a timezone offset")
+
+    through = asyncio.run(export(args.format, since_dt, args.output))
+
+    kind = f"changes since {since_dt.isoformat()}" if since_dt else "full snapshot"
+    print(f"{args.output}: {kind}, {os.path.getsize(args.output):,} bytes")
+    if through:
+        print(f"next since: {through.isoformat()}")
+        if args.state:
+            with open(args.state, "w") as f:
+                f.write(through.isoformat() + "\n")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--format", choices=list(main.EXPORT_FORMATS), default="parquet")
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--since", help="ISO 8601 timestamp; only rows updated after it")
+    parser.add_argument("--state", help="File holding the since of the next pull; read, then updated")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main_cli(parse_args())
@@ -0,0 +1,200 @@
+"""Chaos test of the write-behind ingest journal (INGEST_JOURNAL_PATH).
+
+Starts the API with a journal in a temporary directory, posts N booth taps
+with client_ids from concurrent clients, stops the database mid-load, starts
+it again, SIGKILLs the API while it drains and restarts it on the same
+journal. Then waits for the journal to drain and checks that every tap is in
+interactions exactly once:
+
+    CHAOS_DATABASE_URL=postgresql://postgres:pw@localhost:5432/insights_chaos \
+        python scripts/journal_chaos.py \
+            --db-stop "docker stop insights-postgres" \
+            --db-start "docker start insights-postgres"
+
+--db-stop and --db-start are shell commands; with a local cluster they can
+be "pg_ctl -D <datadir> stop -m immediate" and "pg_ctl -D <datadir> start -w".
+Use a scratch database: the taps are left in it. Exits 1 if any tap is
+missing or duplicated.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import asyncpg
+import httpx
+
+from bench_startup import API_DIR, fake_tailscale
+
+CHAOS_DATABASE_URL = os.environ.get("CHAOS_DATABASE_URL")
+DEVICE_IP = "100.64.0.2"  # bench-phone in the fake Tailscale status
+
+
+def start_api(port: int, env: dict, log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", API_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT
+    )
+
+
+async def wait_healthy(client: httpx.AsyncClient, process, timeout: float):
+    """Poll /api/health until it answers 200 (it does while the database is down)."""
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if process.poll() is not None:
+            sys.exit(f"API exited with status {process.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    sys.exit(f"API not healthy after {timeout:.0f}s")
+
+
+def run_command(command: str):
+    print(f"  $ {command}")
+    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f"command failed ({result.returncode}): {result.stderr.strip()}")
+
+
+class Load:
+    """N taps from `concurrency` clients; a tap is retried until acknowledged."""
+
+    def __init__(self, client: httpx.AsyncClient, count: int, concurrency: int):
+        self.client = client
+        self.client_ids = [str(uuid.uuid4()) for _ in range(count)]
+        self.concurrency = concurrency
+        self.acknowledged = 0
+        self.retries = 0
+
+    async def tap(self, i: int, client_id: str):
+        body = {
+            "interaction_type": "conversation" if i % 3 else "walk_by",
+            "persona": "parent" if i % 3 else None,
+            "sale_type": "single" if i % 3 == 1 else None,
+            "unit_price": 990 if i % 3 == 1 else None,
+            "client_id": client_id,
+        }
+        while True:
+            try:
+                response = await self.client.post(
+                    "/api/interactions", json=body, headers={"X-Forwarded-For": DEVICE_IP}
+                )
+                if response.status_code == 200:
+                    self.acknowledged += 1
+                    return
+                if response.status_code < 500:
+                    sys.exit(f"tap rejected: {response.status_code} {response.text}")
+            except httpx.TransportError:
+                pass  # API being restarted
+            self.retries += 1
+            await asyncio.sleep(0.1)
+
+    async def run(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(i, client_id):
+            async with semaphore:
+                await self.tap(i, client_id)
+
+        await asyncio.gather(*(limited(i, c) for i, c in enumerate(self.client_ids)))
+
+
+async def ingest_stats(client: httpx.AsyncClient) -> dict:
+    return (await client.get("/api/metrics")).json()["ingest"]
+
+
+async def main(args):
+    if not CHAOS_DATABASE_URL or not CHAOS_DATABASE_URL.startswith("postgres"):
+        sys.exit("CHAOS_DATABASE_URL (a postgresql:// URL) is required")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        env = {
+            "DATABASE_URL": CHAOS_DATABASE_URL,
+            "INGEST_JOURNAL_PATH": os.path.join(work_dir, "journal.log"),
+            "TAILSCALE_SOCKET": os.path.join(work_dir, "tailscaled.sock"),
+        }
+        server = fake_tailscale(env["TAILSCALE_SOCKET"])
+        log = open(os.path.join(work_dir, "api.log"), "ab")
+        api = start_api(args.port, env, log)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=10) as client:
+                await wait_healthy(client, api, args.timeout)
+                load = Load(client, args.taps, args.concurrency)
+                started = time.monotonic()
+                load_task = asyncio.create_task(load.run())
+
+                await asyncio.sleep(args.stop_after)
+                print(f"t={time.monotonic() - started:.1f}s stopping the database "
+                      f"({load.acknowledged} taps acknowledged)")
+                run_command(args.db_stop)
+                await asyncio.sleep(args.outage)
+                print(f"t={time.monotonic() - started:.1f}s during the outage: {await ingest_stats(client)}")
+                print(f"t={time.monotonic() - started:.1f}s starting the database")
+                run_command(args.db_start)
+
+                await asyncio.sleep(args.kill_after)
+                print(f"t={time.monotonic() - started:.1f}s SIGKILL the API mid-drain: "
+                      f"{await ingest_stats(client)}")
+                api.send_signal(signal.SIGKILL)
+                api.wait()
+                api = start_api(args.port, env, log)
+                await wait_healthy(client, api, args.timeout)
+                print(f"t={time.monotonic() - started:.1f}s API restarted: {await ingest_stats(client)}")
+
+                await load_task
+                print(f"t={time.monotonic() - started:.1f}s load done: {load.acknowledged} taps "
+                      f"acknowledged, {load.retries} retries")
+
+                deadline = time.monotonic() + args.timeout
+                while (stats := await ingest_stats(client))["depth"] > 0:
+                    if time.monotonic() > deadline:
+                        sys.exit(f"journal not drained after {args.timeout:.0f}s: {stats}")
+                    await asyncio.sleep(0.1)
+                print(f"t={time.monotonic() - started:.1f}s drained: {stats}")
+        finally:
+            api.terminate()
+            api.wait()
+            log.close()
+            server.shutdown()
+
+    conn = await asyncpg.connect(CHAOS_DATABASE_URL)
+    try:
+        rows = await conn.fetch(
+            "SELECT id::text, COUNT(*) AS n FROM interactions WHERE id = ANY($1::uuid[]) GROUP BY id",
+            load.client_ids
+        )
+    finally:
+        await conn.close()
+    missing = len(load.client_ids) - len(rows)
+    duplicated = sum(1 for row in rows if row["n"] > 1)
+    print(f"{len(load.client_ids)} taps: {len(rows)} stored, {missing} missing, {duplicated} duplicated")
+    if missing or duplicated:
+        sys.exit(1)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-stop", required=True, help="Shell command that stops the database")
+    parser.add_argument("--db-start", required=True, help="Shell command that starts it again")
+    parser.add_argument("--taps", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--stop-after", type=float, default=1.0, help="Seconds of load before the stop")
+    parser.add_argument("--outage", type=float, default=4.0, help="Seconds the database stays down")
+    parser.add_argument("--kill-after", type=float, default=0.5,
+                        help="Seconds after the restart before the API is killed")
+    parser.add_argument("--port", type=int, default=8798)
+    parser.add_argument("--timeout", type=float, default=60)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
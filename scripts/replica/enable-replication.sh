@@ -0,0 +1,4 @@
+#!/bin/sh
+# Runs once on the primary's first start (docker-entrypoint-initdb.d):
+# allow the replica container to open a streaming replication connection.
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
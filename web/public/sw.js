@@ -0,0 +1,130 @@
+// Service worker: keeps the app usable when the venue network drops.
+//
+// - App shell (index.html and the hashed build assets) is cached so the app
+//   still opens offline.
+// - GET /api/session, /api/sellers and /api/stats are stale-while-revalidate:
+//   the last response is served at once and refreshed in the background.
+//   When the refreshed copy differs, open pages get it as an 'api-update'
+//   message so they are not left showing the stale one.
+// - Any other method on /api/session or /api/sellers drops those cached
+//   reads, so the read after a seller change is never answered from the
+//   cache.
+// - Everything else (other API calls, the SSE stream) goes to the network.
+//
+// Taps are not queued here: the page keeps its own IndexedDB outbox
+// (App.jsx), which also works where Background Sync is unavailable.
+
+const SHELL_CACHE = 'insights-shell-v1'
+const API_CACHE = 'insights-api-v1'
+const SWR_PATHS = ['/api/session', '/api/sellers', '/api/stats']
+const INVALIDATING_PATHS = ['/api/session', '/api/sellers']
+
+self.addEventListener('install', (event) => {
+  event.waitUntil(
+    caches.open(SHELL_CACHE)
+      .then(cache => cache.addAll(['/', '/manifest.json', '/icon-192.png']))
+      .then(() => self.skipWaiting())
+  )
+})
+
+self.addEventListener('activate', (event) => {
+  const current = [SHELL_CACHE, API_CACHE]
+  event.waitUntil(
+    caches.keys()
+      .then(keys => Promise.all(keys.filter(k => !current.includes(k)).map(k => caches.delete(k))))
+      .then(() => self.clients.claim())
+  )
+})
+
+const matches = (path, prefixes) =>
+  prefixes.some(prefix => path === prefix || path.startsWith(prefix + '/'))
+
+self.addEventListener('fetch', (event) => {
+  const request = event.request
+  const url = new URL(request.url)
+  if (url.origin !== self.location.origin) return
+
+  if (url.pathname.startsWith('/api/')) {
+    if (request.method === 'GET' && matches(url.pathname, SWR_PATHS)) {
+      event.respondWith(staleWhileRevalidate(event))
+    } else if (request.method !== 'GET' && matches(url.pathname, INVALIDATING_PATHS)) {
+      event.respondWith(invalidatingWrite(request))
+    }
+    return
+  }
+
+  if (request.method !== 'GET') return
+  if (request.mode === 'navigate') {
+    event.respondWith(networkFirstShell(request))
+  } else if (url.pathname.startsWith('/assets/')) {
+    event.respondWith(cacheFirst(request))
+  }
+})
+
+// Hashed file names never change content, so a cached copy is always good
+async function cacheFirst(request) {
+  const cache = await caches.open(SHELL_CACHE)
+  const cached = await cache.match(request)
+  if (cached) return cached
+  const response = await fetch(request)
+  if (response.ok) cache.put(request, response.clone())
+  return response
+}
+
+// index.html names the current build's assets: prefer the network
+async function networkFirstShell(request) {
+  const cache = await caches.open(SHELL_CACHE)
+  try {
+    const response = await fetch(request)
+    if (response.ok) cache.put('/', response.clone())
+    return response
+  } catch (err) {
+    const cached = await cache.match('/')
+    if (cached) return cached
+    throw err
+  }
+}
+
+async function staleWhileRevalidate(event) {
+  const request = event.request
+  const cache = await caches.open(API_CACHE)
+  const cached = await cache.match(request)
+
+  const refresh = fetch(request).then(async (response) => {
+    if (!response.ok) return response
+    const body = await response.clone().text()
+    const previous = cached ? await cached.clone().text() : null
+    await cache.put(request, response.clone())
+    if (cached && body !== previous) {
+      await broadcast({ type: 'api-update', url: request.url, data: JSON.parse(body) })
+    }
+    return response
+  })
+
+  if (!cached) return refresh
+  // Keep the worker alive until the background refresh is stored
+  event.waitUntil(refresh.catch(() => {}))
+  return cached
+}
+
+// Dropped before and after the write, so neither the page's next read nor
+// a refresh already in flight leaves the pre-write copy in the cache
+async function invalidatingWrite(request) {
+  await dropCachedReads(INVALIDATING_PATHS)
+  const response = await fetch(request)
+  await dropCachedReads(INVALIDATING_PATHS)
+  return response
+}
+
+async function dropCachedReads(prefixes) {
+  const cache = await caches.open(API_CACHE)
+  const requests = await cache.keys()
+  await Promise.all(requests
+    .filter(request => matches(new URL(request.url).pathname, prefixes))
+    .map(request => cache.delete(request)))
+}
+
+async function broadcast(message) {
+  const clients = await self.clients.matchAll({ type: 'window' })
+  clients.forEach(client => client.postMessage(message))
+}
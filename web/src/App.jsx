@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback, useMemo } from 'react'
+import { useState, useEffect, useCallback, useMemo, useRef } from 'react'
 import './App.css'
 
 const API_BASE = '/api'
@@ -39,20 +39,246 @@ const formatRelativeTime = (isoString) => {
   return `${diffDays}d ago`
 }
 
+// Last ETag and parsed body per GET endpoint. An unchanged response (304,
+// or the same ETag from the service worker's cache) returns the very same
+// object, so setting it as state again does not re-render
+const MAX_CONDITIONAL_ENTRIES = 50
+const conditionalCache = new Map()
+
 // API helper
 async function api(endpoint, options = {}) {
+  const isGet = !options.method || options.method === 'GET'
+  const previous = isGet ? conditionalCache.get(endpoint) : undefined
   const res = await fetch(`${API_BASE}${endpoint}`, {
     ...options,
     headers: {
       'Content-Type': 'application/json',
+      ...(previous && { 'If-None-Match': previous.etag }),
       ...options.headers
     }
   })
+  const etag = res.headers.get('ETag')
+  if (previous && (res.status === 304 || (res.ok && etag === previous.etag))) {
+    return previous.data
+  }
   if (!res.ok) {
     const error = await res.json().catch(() => ({ detail: 'Request failed' }))
-    throw new Error(error.detail || 'Request failed')
+    const err = new Error(error.detail || 'Request failed')
+    err.status = res.status
+    throw err
+  }
+  const data = await res.json()
+  if (isGet && etag) {
+    conditionalCache.delete(endpoint)
+    conditionalCache.set(endpoint, { etag, data })
+    if (conditionalCache.size > MAX_CONDITIONAL_ENTRIES) {
+      conditionalCache.delete(conditionalCache.keys().next().value)
+    }
+  }
+  return data
+}
+
+// Client-generated id for creates. crypto.randomUUID needs a secure
+// context, which plain-HTTP Tailscale addresses are not
+const newClientId = () => {
+  if (crypto.randomUUID) return crypto.randomUUID()
+  const b = crypto.getRandomValues(new Uint8Array(16))
+  b[6] = (b[6] & 0x0f) | 0x40
+  b[8] = (b[8] & 0x3f) | 0x80
+  const hex = [...b].map(x => x.toString(16).padStart(2, '0')).join('')
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`
+}
+
+// POST a new record, retrying network failures and 5xx with the same
+// client_id so the server stores it once however many attempts get through
+async function createWithRetry(endpoint, payload, attempts = 4) {
+  const body = JSON.stringify({ client_id: newClientId(), ...payload })
+  for (let attempt = 1; ; attempt++) {
+    try {
+      return await api(endpoint, { method: 'POST', body })
+    } catch (err) {
+      const retryable = err.status === undefined || err.status >= 500
+      if (!retryable || attempt >= attempts) throw err
+      await new Promise(resolve => setTimeout(resolve, 500 * 2 ** (attempt - 1)))
+    }
+  }
+}
+
+// Outbox for taps: a new interaction is written to IndexedDB and
+// acknowledged at once, then sent in tap order in the background, backing
+// off while the network is down. Each entry keeps its client_id, so a send
+// that reached the server before the connection dropped is stored once.
+const OUTBOX_DB = 'insights-outbox'
+const OUTBOX_STORE = 'taps'
+const OUTBOX_MAX_DELAY = 30000
+// Sent later than this after the tap, the tap's own time is sent with it
+const OUTBOX_BACKDATE_AFTER_MS = 60000
+
+const outbox = {
+  db: null,
+  count: 0,
+  listeners: new Set(),
+  flushing: false,
+  retryTimeout: null,
+  retryDelay: 1000
+}
+
+function openOutbox() {
+  if (!outbox.db) {
+    outbox.db = new Promise((resolve, reject) => {
+      const request = indexedDB.open(OUTBOX_DB, 1)
+      request.onupgradeneeded = () => {
+        request.result.createObjectStore(OUTBOX_STORE, { keyPath: 'seq', autoIncrement: true })
+      }
+      request.onsuccess = () => resolve(request.result)
+      request.onerror = () => reject(request.error)
+    })
+    outbox.db.catch(() => { outbox.db = null })
+  }
+  return outbox.db
+}
+
+// One IndexedDB request in its own transaction, resolved once committed
+async function outboxRequest(mode, operation) {
+  const db = await openOutbox()
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(OUTBOX_STORE, mode)
+    const request = operation(tx.objectStore(OUTBOX_STORE))
+    tx.oncomplete = () => resolve(request.result)
+    tx.onerror = () => reject(tx.error)
+    tx.onabort = () => reject(tx.error)
+  })
+}
+
+async function refreshOutboxCount() {
+  outbox.count = await outboxRequest('readonly', store => store.count())
+  outbox.listeners.forEach(listener => listener(outbox.count))
+}
+
+// Resolves once the tap is stored on the device (not on the server)
+async function enqueueInteraction(payload) {
+  await outboxRequest('readwrite', store => store.add({
+    endpoint: '/interactions',
+    payload,
+    queued_at: Date.now()
+  }))
+  await refreshOutboxCount()
+  // While backing off, the tap waits for the scheduled retry
+  if (!outbox.retryTimeout) flushOutbox()
+}
+
+async function flushOutbox() {
+  if (outbox.flushing) return
+  outbox.flushing = true
+  clearTimeout(outbox.retryTimeout)
+  outbox.retryTimeout = null
+  try {
+    for (;;) {
+      const entry = await outboxRequest('readonly', store => store.openCursor())
+        .then(cursor => cursor?.value)
+      if (!entry) break
+
+      const payload = { ...entry.payload }
+      if (!payload.timestamp && Date.now() - entry.queued_at > OUTBOX_BACKDATE_AFTER_MS) {
+        payload.timestamp = new Date(entry.queued_at).toISOString()
+      }
+      try {
+        await api(entry.endpoint, { method: 'POST', body: JSON.stringify(payload) })
+      } catch (err) {
+        const retryable = err.status === undefined || err.status >= 500 || err.status === 408 || err.status === 429
+        if (retryable) {
+          outbox.retryTimeout = setTimeout(flushOutbox, outbox.retryDelay)
+          outbox.retryDelay = Math.min(outbox.retryDelay * 2, OUTBOX_MAX_DELAY)
+          return
+        }
+        // Rejected (e.g. unknown device): retrying cannot help, and a stuck
+        // entry would hold back every tap after it
+        console.error('Outbox: dropping rejected tap:', err.message, payload)
+      }
+      await outboxRequest('readwrite', store => store.delete(entry.seq))
+      await refreshOutboxCount()
+      outbox.retryDelay = 1000
+    }
+  } catch (err) {
+    console.error('Outbox: flush failed:', err)
+  } finally {
+    outbox.flushing = false
+  }
+}
+
+// Number of taps stored on this device but not yet on the server
+function useOutboxCount() {
+  const [count, setCount] = useState(outbox.count)
+  useEffect(() => {
+    outbox.listeners.add(setCount)
+    const flushNow = () => {
+      outbox.retryDelay = 1000
+      flushOutbox()
+    }
+    window.addEventListener('online', flushNow)
+    refreshOutboxCount().then(flushOutbox).catch(err => console.warn('Outbox unavailable:', err))
+    return () => {
+      outbox.listeners.delete(setCount)
+      window.removeEventListener('online', flushNow)
+    }
+  }, [])
+  return count
+}
+
+// Log a tap through the outbox; without IndexedDB (some private browsing
+// modes) fall back to sending it directly, under the same client_id in case
+// the entry was stored after all
+async function logInteraction(payload) {
+  const tap = { ...payload, client_id: newClientId() }
+  try {
+    await enqueueInteraction(tap)
+  } catch (err) {
+    console.warn('Outbox unavailable, sending directly:', err)
+    await createWithRetry('/interactions', tap)
   }
-  return res.json()
+}
+
+// A busy booth sends a data_change per tap to every open screen. Changes are
+// collected per panel and refreshed once the burst settles (at most
+// REFRESH_MAX_WAIT_MS after the first), and not at all while the tab is
+// hidden: it catches up when shown again
+const REFRESH_DEBOUNCE_MS = 500
+const REFRESH_MAX_WAIT_MS = 2000
+
+// Panels a data_change can make stale. A new interaction is never in the trash
+function affectedPanels(change) {
+  if (change.table === 'interactions') {
+    return change.action === 'INSERT' ? ['stats', 'browse'] : ['stats', 'browse', 'trash']
+  }
+  if (change.table === 'events') return ['timeline']
+  return []
+}
+
+function createChangeBatcher(refresh, debounceMs = REFRESH_DEBOUNCE_MS, maxWaitMs = REFRESH_MAX_WAIT_MS) {
+  const pending = new Set()
+  let timer = null
+  let firstChangeAt = null
+
+  const flush = () => {
+    clearTimeout(timer)
+    timer = null
+    if (document.hidden || pending.size === 0) return
+    const panels = new Set(pending)
+    pending.clear()
+    firstChangeAt = null
+    refresh(panels)
+  }
+
+  const add = (change) => {
+    affectedPanels(change).forEach(panel => pending.add(panel))
+    if (pending.size === 0 || document.hidden) return
+    const now = Date.now()
+    firstChangeAt ??= now
+    clearTimeout(timer)
+    timer = setTimeout(flush, Math.max(0, Math.min(debounceMs, firstChangeAt + maxWaitMs - now)))
+  }
+
+  return { add, flush, cancel: () => clearTimeout(timer) }
 }
 
 // Real-time updates hook using Server-Sent Events
@@ -61,6 +287,7 @@ function useRealtimeUpdates(onDataChange) {
     let eventSource = null
     let reconnectTimeout = null
     let reconnectAttempts = 0
+    let disconnected = false
     const maxReconnectDelay = 30000 // 30 seconds max
 
     const connect = () => {
@@ -74,6 +301,12 @@ function useRealtimeUpdates(onDataChange) {
       eventSource.onopen = () => {
         console.log('SSE: Connected for real-time updates')
         reconnectAttempts = 0 // Reset on successful connection
+        // Changes made while disconnected were never notified
+        if (disconnected) {
+          disconnected = false
+          onDataChange({ table: 'interactions', action: 'RESYNC' })
+          onDataChange({ table: 'events', action: 'RESYNC' })
+        }
       }
 
       eventSource.onmessage = (event) => {
@@ -94,6 +327,7 @@ function useRealtimeUpdates(onDataChange) {
       eventSource.onerror = (err) => {
         console.log('SSE: Connection error, will reconnect...')
         eventSource.close()
+        disconnected = true
 
         // Exponential backoff for reconnection
         const delay = Math.min(1000 * Math.pow(2, reconnectAttempts), maxReconnectDelay)
@@ -169,7 +403,7 @@ function App() {
   const loadStats = useCallback(async (period = 'today') => {
     try {
       const data = await api(`/stats?period=${period}`)
-      setStats(prev => ({ ...prev, [period]: data }))
+      setStats(prev => prev?.[period] === data ? prev : { ...prev, [period]: data })
     } catch (err) {
       console.error('Failed to load stats:', err)
     }
@@ -186,13 +420,15 @@ function App() {
     }
   }, [statsPeriod, stats, loadStats])
 
-  // Load seller stats
-  const loadSellerStats = useCallback(async (period = 'today') => {
+  // Load every stats-screen panel (stats, sankey, sellers) in one request
+  const loadDashboard = useCallback(async (period = 'today') => {
     try {
-      const data = await api(`/analytics/by-seller?period=${period}`)
-      setSellerStats(data)
+      const data = await api(`/dashboard?period=${period}&panels=stats,sankey,sellers`)
+      setStats(prev => prev?.[period] === data.stats ? prev : { ...prev, [period]: data.stats })
+      setSankeyData(data.sankey)
+      setSellerStats(data.sellers)
     } catch (err) {
-      console.error('Failed to load seller stats:', err)
+      console.error('Failed to load dashboard:', err)
     }
   }, [])
 
@@ -214,7 +450,7 @@ function App() {
       if (!hasFilters && offset === 0) {
         // Use timeline API to include events when no filters
         const data = await api(`/timeline?limit=50&offset=${offset}`)
-        setBrowseData({
+        setBrowseData(prev => prev?.records === data.items ? prev : {
           total: data.items.length,
           records: data.items,
           has_more: data.has_more
@@ -226,6 +462,7 @@ function App() {
         if (filters.sale_types) params.set('sale_types', filters.sale_types)
         if (filters.personas) params.set('personas', filters.personas)
         if (filters.seller_ids) params.set('seller_ids', filters.seller_ids)
+        if (filters.q) params.set('q', filters.q)
         params.set('offset', offset)
         params.set('limit', 50)
 
@@ -247,30 +484,76 @@ function App() {
     }
   }, [])
 
-  // Handle real-time data changes from SSE
-  const handleDataChange = useCallback((change) => {
-    // Refresh stats when interactions change
-    if (change.table === 'interactions') {
-      loadStats(statsPeriod)
-      // If on browse screen, refresh the list
+  // Refresh what the current screen shows of the panels a batch of changes
+  // made stale. Home's stats ribbon is refreshed when home is shown again
+  const statsStale = useRef(false)
+  const refreshPanels = useRef(null)
+  useEffect(() => {
+    refreshPanels.current = (panels) => {
+      if (panels.has('stats')) {
+        if (screen === 'stats') {
+          loadDashboard(statsPeriod)
+        } else if (screen === 'home') {
+          loadStats(statsPeriod)
+        } else {
+          statsStale.current = true
+        }
+      }
       if (screen === 'browse') {
-        loadBrowseData(browseFilters)
+        const unfiltered = Object.keys(browseFilters).length === 0
+        if (panels.has('browse') || (panels.has('timeline') && unfiltered)) {
+          loadBrowseData(browseFilters)
+        }
       }
-      // If on trash screen, refresh trash
-      if (screen === 'trash') {
+      if (screen === 'trash' && panels.has('trash')) {
         loadTrashData()
       }
     }
-    // Refresh timeline when events change
-    if (change.table === 'events') {
-      if (screen === 'browse' && Object.keys(browseFilters).length === 0) {
-        loadBrowseData({})
-      }
+  }, [statsPeriod, screen, browseFilters, loadStats, loadDashboard, loadBrowseData, loadTrashData])
+
+  useEffect(() => {
+    if (screen === 'home' && statsStale.current) {
+      statsStale.current = false
+      loadStats(statsPeriod)
+    }
+  }, [screen, statsPeriod, loadStats])
+
+  // Handle real-time data changes from SSE, coalesced per panel
+  const changeBatcher = useMemo(() => createChangeBatcher(panels => refreshPanels.current?.(panels)), [])
+  useEffect(() => {
+    const onVisible = () => {
+      if (!document.hidden) changeBatcher.flush()
+    }
+    document.addEventListener('visibilitychange', onVisible)
+    return () => {
+      document.removeEventListener('visibilitychange', onVisible)
+      changeBatcher.cancel()
     }
-  }, [statsPeriod, screen, browseFilters, loadStats, loadBrowseData, loadTrashData])
+  }, [changeBatcher])
 
   // Subscribe to real-time updates
-  useRealtimeUpdates(handleDataChange)
+  useRealtimeUpdates(changeBatcher.add)
+
+  // Taps logged on this device but not yet sent
+  const pendingTaps = useOutboxCount()
+
+  // The service worker answered a read from its cache and has since
+  // fetched a newer copy (public/sw.js)
+  useEffect(() => {
+    if (!navigator.serviceWorker) return
+    const onMessage = (event) => {
+      if (event.data?.type !== 'api-update') return
+      const url = new URL(event.data.url)
+      if (url.pathname === '/api/session') {
+        setSession(event.data.data)
+      } else if (url.pathname === '/api/stats') {
+        const period = url.searchParams.get('period') || 'today'
+        setStats(prev => ({ ...prev, [period]: event.data.data }))
+      }
+    }
+    navigator.serviceWorker.addEventListener('message', onMessage)
+    return () => navigator.serviceWorker.removeEventListener('message', onMessage)
+  }, [])
 
   // Select seller
   const selectSeller = async (sellerId) => {
@@ -297,14 +580,10 @@ function App() {
   // Quick walk-by log
   const logWalkBy = async () => {
     try {
-      await api('/interactions', {
-        method: 'POST',
-        body: JSON.stringify({
-          interaction_type: 'walk_by'
-        })
+      await logInteraction({
+        interaction_type: 'walk_by'
       })
       setConfirmation({ type: 'walk_by' })
-      loadStats()
       setTimeout(() => {
         setConfirmation(null)
       }, 1200)
@@ -365,13 +644,9 @@ function App() {
         payload.timestamp = data.customTimestamp
       }
 
-      await api('/interactions', {
-        method: 'POST',
-        body: JSON.stringify(payload)
-      })
+      await logInteraction(payload)
 
       showConfirmation(data)
-      loadStats()
       setFlowData({}) // Clear flow data including custom timestamp
     } catch (err) {
       alert('Failed to save: ' + err.message)
@@ -388,17 +663,24 @@ function App() {
     }, 1500)
   }
 
-  // Update interaction (notes, delete)
-  const updateInteraction = async (id, updates) => {
+  // Update interaction (notes, delete). If-Match names the version this
+  // copy was loaded at; the server refuses (412) if it was edited since
+  const updateInteraction = async (interaction, updates) => {
     try {
-      const data = await api(`/interactions/${id}`, {
+      const data = await api(`/interactions/${interaction.id}`, {
         method: 'PATCH',
+        headers: { 'If-Match': `"${interaction.updated_at || 0}"` },
         body: JSON.stringify(updates)
       })
       // Refresh browse data
       loadBrowseData(browseFilters)
       return data
     } catch (err) {
+      if (err.status === 412) {
+        alert('This interaction was changed on another device. Showing the latest version - please make your change again.')
+        loadBrowseData(browseFilters)
+        return
+      }
       alert('Failed to update: ' + err.message)
     }
   }
@@ -417,10 +699,7 @@ function App() {
   // Log event
   const logEvent = async (description) => {
     try {
-      await api('/events', {
-        method: 'POST',
-        body: JSON.stringify({ description })
-      })
+      await createWithRetry('/events', { description })
       setEventModal(false)
       setConfirmation({ type: 'event', description })
       setTimeout(() => setConfirmation(null), 1200)
@@ -449,10 +728,7 @@ function App() {
           onCyclePeriod={cyclePeriod}
           onConversation={startConversation}
           onWalkBy={logWalkBy}
-          onViewStats={() => {
-            loadSellerStats(statsPeriod)
-            setScreen('stats')
-          }}
+          onViewStats={() => setScreen('stats')}
           onLogEvent={() => setEventModal(true)}
           onPastLog={() => setCustomTimestampModal({ type: 'choose' })}
         />
@@ -464,12 +740,11 @@ function App() {
           statsPeriod={statsPeriod}
           onPeriodChange={(p) => {
             setStatsPeriod(p)
-            if (!stats?.[p]) loadStats(p)
+            loadDashboard(p)
           }}
           sellerStats={sellerStats}
           sankeyData={sankeyData}
-          onLoadSellerStats={loadSellerStats}
-          onLoadSankey={loadSankeyData}
+          onLoad={loadDashboard}
           onBack={() => setScreen('home')}
           onBrowse={() => {
             loadBrowseData({})
@@ -626,11 +901,17 @@ function App() {
 
       {confirmation && <ConfirmationOverlay data={confirmation} flowData={flowData} />}
 
+      {pendingTaps > 0 && (
+        <div className="outbox-indicator" role="status">
+          {pendingTaps} {pendingTaps === 1 ? 'tap' : 'taps'} waiting to sync
+        </div>
+      )}
+
       {notesModal && (
         <NotesModal
           interaction={notesModal}
           onSave={async (notes) => {
-            await updateInteraction(notesModal.id, { notes })
+            await updateInteraction(notesModal, { notes })
             setNotesModal(null)
             // Refresh selected interaction
             const updated = await api(`/interactions/${notesModal.id}`)
@@ -644,7 +925,7 @@ function App() {
         <DeleteModal
           interaction={deleteModal}
           onConfirm={async () => {
-            await updateInteraction(deleteModal.id, { deleted: true })
+            await updateInteraction(deleteModal, { deleted: true })
             setDeleteModal(null)
             setSelectedInteraction(null)
             setScreen('browse')
@@ -665,7 +946,7 @@ function App() {
           interaction={editModal}
           onSave={async (updates) => {
             try {
-              await updateInteraction(editModal.id, updates)
+              await updateInteraction(editModal, updates)
               setEditModal(null)
               // Refresh selected interaction
               const updated = await api(`/interactions/${editModal.id}`)
@@ -885,18 +1166,12 @@ function HomeScreen({ session, staff, stats, statsPeriod, onCyclePeriod, onConve
 }
 
 // Stats Screen (Updated with Phase 2 & 3)
-function StatsScreen({ stats, statsPeriod, onPeriodChange, sellerStats, sankeyData, onLoadSellerStats, onLoadSankey, onBack, onBrowse, onSankey, onConfig }) {
+function StatsScreen({ stats, statsPeriod, onPeriodChange, sellerStats, sankeyData, onLoad, onBack, onBrowse, onSankey, onConfig }) {
   const data = stats?.[statsPeriod]
 
-  const handlePeriodChange = (p) => {
-    onPeriodChange(p)
-    onLoadSellerStats(p)
-    onLoadSankey(p)
-  }
-
-  // Load sankey data on mount
+  // Load all panels on mount (also after returning from the Sankey screen)
   useEffect(() => {
-    onLoadSankey(statsPeriod)
+    onLoad(statsPeriod)
   }, [])
 
   const totalPriceSales = (data?.price_validation?.price_990 || 0) + (data?.price_validation?.price_1290 || 0)
@@ -909,9 +1184,9 @@ function StatsScreen({ stats, statsPeriod, onPeriodChange, sellerStats, sankeyDa
       </header>
 
       <div className="period-tabs">
-        <button className={`tab ${statsPeriod === 'today' ? 'active' : ''}`} onClick={() => handlePeriodChange('today')}>Today</button>
-        <button className={`tab ${statsPeriod === 'week' ? 'active' : ''}`} onClick={() => handlePeriodChange('week')}>Week</button>
-        <button className={`tab ${statsPeriod === 'all' ? 'active' : ''}`} onClick={() => handlePeriodChange('all')}>All</button>
+        <button className={`tab ${statsPeriod === 'today' ? 'active' : ''}`} onClick={() => onPeriodChange('today')}>Today</button>
+        <button className={`tab ${statsPeriod === 'week' ? 'active' : ''}`} onClick={() => onPeriodChange('week')}>Week</button>
+        <button className={`tab ${statsPeriod === 'all' ? 'active' : ''}`} onClick={() => onPeriodChange('all')}>All</button>
       </div>
 
       <div className="stats-content">
@@ -1036,6 +1311,7 @@ function StatsScreen({ stats, statsPeriod, onPeriodChange, sellerStats, sankeyDa
 // Transaction Browser Screen (Phase 2)
 function BrowseScreen({ data, filters, sellers, onFiltersChange, onLoadMore, onSelect, onBack, onTrash }) {
   const [activeFilters, setActiveFilters] = useState(filters)
+  const [searchText, setSearchText] = useState(filters.q || '')
 
   const toggleFilter = (key, value) => {
     const newFilters = { ...activeFilters }
@@ -1055,9 +1331,17 @@ function BrowseScreen({ data, filters, sellers, onFiltersChange, onLoadMore, onS
 
   const clearFilters = () => {
     setActiveFilters({})
+    setSearchText('')
     onFiltersChange({})
   }
 
+  // Notes search runs on Enter (or when the box is cleared), not per keystroke
+  const applySearch = (text) => {
+    const newFilters = { ...activeFilters, q: text.trim() || undefined }
+    setActiveFilters(newFilters)
+    onFiltersChange(newFilters)
+  }
+
   const isActive = (key, value) => {
     if (key === 'engaged') return activeFilters.engaged === value
     return activeFilters[key]?.split(',').includes(value)
@@ -1072,6 +1356,21 @@ function BrowseScreen({ data, filters, sellers, onFiltersChange, onLoadMore, onS
       </header>
 
       <div className="filter-section">
+        <div className="filter-row">
+          <span className="filter-label">NOTES</span>
+          <input
+            className="filter-search"
+            type="search"
+            placeholder="Search notes…"
+            value={searchText}
+            onChange={e => {
+              setSearchText(e.target.value)
+              if (!e.target.value && activeFilters.q) applySearch('')
+            }}
+            onKeyDown={e => e.key === 'Enter' && applySearch(searchText)}
+          />
+        </div>
+
         <div className="filter-row">
           <span className="filter-label">TYPE</span>
           <button className={`filter-chip ${isActive('engaged', true) ? 'active' : ''}`} onClick={() => toggleFilter('engaged', true)}>Engaged</button>